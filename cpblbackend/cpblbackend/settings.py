@@ -96,7 +96,8 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.TokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
-    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend']
+    'DEFAULT_FILTER_BACKENDS': ['django_filters.rest_framework.DjangoFilterBackend'],
+    'DEFAULT_PAGINATION_CLASS': 'fantasy.pagination.KeysetPagination',
 }
 
 SITE_ID = 1
@@ -168,6 +169,46 @@ DATABASES = {
     }
 }
 
+# Caches
+# The scraper and the management commands invalidate cached data (standings, matchup
+# scores, and the response cache's data version) from their own processes, so every cache
+# is shared with the web workers. CACHE_BACKEND picks 'file' (the default, under
+# BASE_DIR/cache, shared by the processes of one host), 'redis' (several hosts, at
+# CACHE_REDIS_URL) or 'locmem' (a single process only).
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'file': 'django.core.cache.backends.filebased.FileBasedCache',
+    'redis': 'django.core.cache.backends.redis.RedisCache',
+}
+CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'file')
+CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379')
+
+
+def cache_location(alias, redis_db):
+    return {
+        'locmem': alias,
+        'file': os.path.join(BASE_DIR, 'cache', alias),
+        'redis': f'{CACHE_REDIS_URL}/{redis_db}',
+    }[CACHE_BACKEND]
+
+
+CACHES = {
+    # Standings and matchup scores, evicted by key when their totals change
+    'default': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': cache_location('default', 0),
+    },
+    # Rendered API responses of the scraped reference data (teams, players, games, stat lines)
+    'responses': {
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': cache_location('responses', 1),
+        # Entries are never stale, a new data version just stops them from being read
+        'TIMEOUT': 60 * 60 * 24,
+    },
+}
+# How long clients may reuse a cached response before revalidating it with its ETag
+RESPONSE_CACHE_MAX_AGE = 60 * 5
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -212,6 +253,12 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Box score scraper backend: 'selenium' renders pages in headless Chrome,
+# 'http' fetches them with a pooled requests.Session (no browser needed)
+SCRAPER_BACKEND = os.environ.get('SCRAPER_BACKEND', 'selenium')
+# SQLite cache of raw scraped pages, set to an empty string to disable
+SCRAPER_CACHE_PATH = os.environ.get('SCRAPER_CACHE_PATH', os.path.join(BASE_DIR, 'scraper_cache.sqlite3'))
+
 # If you're not using HTTPS in development, temporarily override the secure settings
 if DEBUG:
     CSRF_COOKIE_SECURE = False
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class FantasyConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'fantasy'
+
+    def ready(self):
+        # Connects the model signals that keep derived totals and caches coherent
+        from . import invalidation  # noqa: F401
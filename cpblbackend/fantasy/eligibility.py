@@ -0,0 +1,109 @@
+import datetime
+
+from django.db.models import Count
+
+from .models import GameStats, Player
+
+HITTER_POSITIONS = ['1B', '2B', '3B', 'SS', 'C', 'LF', 'CF', 'RF', 'OF', 'DH']
+# A position needs MIN_GAMES games, or MIN_SHARE of the player's games and at least MIN_SHARE_GAMES
+MIN_GAMES = 20
+MIN_SHARE = 0.25
+MIN_SHARE_GAMES = 5
+MIN_STARTS = 5
+MIN_RELIEF_APPEARANCES = 8
+
+
+def eligible_positions(position_counts, total_games, starts, relief_appearances, primary_position=None):
+    """
+    Applies the eligibility rules to one player's season counts.
+
+    Args:
+        position_counts: {position code: stat lines at the position}
+        total_games: distinct games the player appeared in
+        starts, relief_appearances: pitching appearances
+        primary_position: Player.position, which is always kept
+    """
+    eligible = []
+    for position in HITTER_POSITIONS:
+        count = position_counts.get(position, 0)
+        if count >= MIN_GAMES or (count >= MIN_SHARE_GAMES and count / total_games >= MIN_SHARE):
+            eligible.append(position)
+
+    if starts >= MIN_STARTS:
+        eligible += ['SP', 'P']
+    if relief_appearances >= MIN_RELIEF_APPEARANCES:
+        eligible += ['RP', 'P']
+
+    # Derived slots
+    if '1B' in eligible or '3B' in eligible:
+        eligible.append('CI')
+    if '2B' in eligible or 'SS' in eligible:
+        eligible.append('MI')
+    if any(position in eligible for position in ['1B', '2B', '3B', 'SS']):
+        eligible.append('IF')
+    if any(position in eligible for position in ['LF', 'CF', 'RF']):
+        eligible.append('OF')
+    eligible.append('UTIL')
+
+    if primary_position and primary_position not in eligible:
+        eligible.append(primary_position)
+    # P and OF can be reached twice
+    return list(dict.fromkeys(eligible))
+
+
+def season_counts(season_year, player_ids=None):
+    """
+    Returns {player id: (position counts, games, starts, relief appearances)} for a season,
+    from two grouped queries over its game lines.
+    """
+    lines = GameStats.objects.filter(
+        game_date__gte=datetime.date(season_year, 1, 1), game_date__lte=datetime.date(season_year, 12, 31)
+    )
+    if player_ids is not None:
+        lines = lines.filter(player_id__in=player_ids)
+
+    counts = {
+        player_id: ({}, games, 0, 0)
+        for player_id, games in lines.values_list('player_id').annotate(games=Count('game_id', distinct=True)).order_by()
+    }
+    # Positions are parsed at ingest, see GameStats.positions
+    grouped = lines.values_list('player_id', 'positions', 'started').annotate(lines=Count('id')).order_by()
+    for player_id, positions, started, line_count in grouped:
+        position_counts, games, starts, relief_appearances = counts[player_id]
+        if started is not None:
+            if started:
+                starts += line_count
+            else:
+                relief_appearances += line_count
+            counts[player_id] = (position_counts, games, starts, relief_appearances)
+        for position in positions:
+            position_counts[position] = position_counts.get(position, 0) + line_count
+    return counts
+
+
+def update_eligibility(season_year=None, player_ids=None):
+    """
+    Recomputes the eligible positions of every player (or the given players) from a
+    season's game lines (default the previous season) and stores the changed ones with
+    one bulk_update. Players without a game that season keep their eligibility.
+
+    Returns {player id: eligible positions} for the players who played.
+    """
+    from .invalidation import players_changed
+
+    season_year = season_year or datetime.date.today().year - 1
+    counts = season_counts(season_year, player_ids)
+
+    eligibility = {}
+    changed = []
+    for player in Player.objects.filter(id__in=counts).only('id', 'position', 'eligible_positions'):
+        position_counts, games, starts, relief_appearances = counts[player.id]
+        eligible = eligible_positions(position_counts, games, starts, relief_appearances, player.position)
+        eligibility[player.id] = eligible
+        if player.eligible_positions != eligible:
+            player.eligible_positions = eligible
+            changed.append(player)
+
+    Player.objects.bulk_update(changed, ['eligible_positions'], batch_size=1000)
+    players_changed([player.id for player in changed])
+    return eligibility
@@ -0,0 +1,192 @@
+import csv
+import io
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import GameStats, STAT_KEYS
+
+# Columns of every exported game line; the stats dict is flattened into STAT_KEYS for the tabular formats
+LINE_FIELDS = {
+    "id": "id",
+    "game_id": "game_id",
+    "game_number": "game__game_number",
+    "date": "game_date",
+    "player_id": "player_id",
+    "acnt": "player__acnt",
+    "player_name": "player__name",
+    "role": "role",
+    "position": "position",
+}
+CHUNK_SIZE = 2000
+CONTENT_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+    "parquet": "application/vnd.apache.parquet",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def export_lines(season=None, start=None, end=None, role=None):
+    """
+    Yields every game line of a season or date range as a flat dict, read through a
+    server-side cursor in chunks so memory stays constant however many lines match.
+    """
+    lines = GameStats.objects.order_by('game_date', 'id')
+    if season:
+        lines = lines.filter(game_date__year=season)
+    if start:
+        lines = lines.filter(game_date__gte=start)
+    if end:
+        lines = lines.filter(game_date__lte=end)
+    if role:
+        lines = lines.filter(role=role)
+
+    values = lines.values_list(*LINE_FIELDS.values(), 'stats')
+    for row in values.iterator(chunk_size=CHUNK_SIZE):
+        line = dict(zip(LINE_FIELDS, row[:-1]))
+        line["stats"] = row[-1]
+        yield line
+
+
+def flatten(line):
+    stats = line["stats"]
+    return [line[column] for column in LINE_FIELDS] + [stats.get(stat) for stat in STAT_KEYS]
+
+
+def batched(lines, size=CHUNK_SIZE):
+    batch = []
+    for line in lines:
+        batch.append(line)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def ndjson_chunks(lines):
+    for batch in batched(lines):
+        yield "".join(json.dumps(line, cls=DjangoJSONEncoder) + "\n" for line in batch).encode()
+
+
+def csv_chunks(lines):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(list(LINE_FIELDS) + STAT_KEYS)
+    for batch in batched(lines):
+        writer.writerows(flatten(line) for line in batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    # Only the header is left over when nothing matched
+    if buffer.getvalue():
+        yield buffer.getvalue().encode()
+
+
+class ChunkSink(io.RawIOBase):
+    """Write-only file object that hands written bytes back to a generator instead of keeping them."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def arrow_schema():
+    import pyarrow as pa
+
+    return pa.schema(
+        [
+            ("id", pa.int64()), ("game_id", pa.int64()), ("game_number", pa.int32()), ("date", pa.date32()),
+            ("player_id", pa.int64()), ("acnt", pa.string()), ("player_name", pa.string()),
+            ("role", pa.string()), ("position", pa.string()),
+        ]
+        + [(stat, pa.float64()) for stat in STAT_KEYS]
+    )
+
+
+def arrow_batches(lines, schema):
+    import pyarrow as pa
+
+    for batch in batched(lines):
+        columns = list(zip(*(flatten(line) for line in batch)))
+        yield pa.RecordBatch.from_arrays(
+            [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+        )
+
+
+def parquet_chunks(lines):
+    """Writes one Parquet row group per chunk of lines; needs the optional pyarrow dependency."""
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema()
+    sink = ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression="zstd") as writer:
+        for record_batch in arrow_batches(lines, schema):
+            writer.write_batch(record_batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def arrow_chunks(lines):
+    """Writes an Arrow IPC stream, one record batch per chunk of lines; needs pyarrow."""
+    import pyarrow as pa
+
+    schema = arrow_schema()
+    sink = ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for record_batch in arrow_batches(lines, schema):
+            writer.write_batch(record_batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+EXPORT_FORMATS = {
+    "ndjson": ndjson_chunks,
+    "csv": csv_chunks,
+    "parquet": parquet_chunks,
+    "arrow": arrow_chunks,
+}
+
+
+def gzip_chunks(chunks):
+    """Gzips a stream of byte chunks on the fly."""
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def export_chunks(export_format, lines, gzip=False):
+    """
+    Returns a generator of the encoded bytes of lines in the given format.
+
+    Raises ValueError for an unknown format and ImportError when the format needs
+    pyarrow and it isn't installed.
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format {export_format}, expected one of {', '.join(EXPORT_FORMATS)}.")
+    if export_format in ["parquet", "arrow"]:
+        import pyarrow  # noqa: F401  Fail before the response starts streaming
+
+    chunks = (chunk for chunk in EXPORT_FORMATS[export_format](lines) if chunk)
+    return gzip_chunks(chunks) if gzip else chunks
@@ -0,0 +1,146 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+
+from .leaderboards import decode_cursor, encode_cursor
+from .models import (
+    BATTING_STAT_KEYS, PITCHING_STAT_KEYS, FantasyRoster, PlayerDailyTotals, PlayerRollingStat, RoleChoices,
+    calculate_rate_stats,
+)
+from .standings import LOWER_IS_BETTER, RATE_DENOMINATORS
+
+ROLLING_WINDOWS = [7, 14, 30]
+ROLLING_CATEGORIES = {
+    RoleChoices.BATTER: BATTING_STAT_KEYS + ["OBP", "SLG", "OPS"],
+    RoleChoices.PITCHER: PITCHING_STAT_KEYS,
+}
+DEFAULT_CATEGORY = {RoleChoices.BATTER: "OPS", RoleChoices.PITCHER: "SO"}
+MAX_LIMIT = 200
+
+
+def add_batting_rates(stats):
+    """Adds OBP, SLG and OPS to a dict of summed batting stats."""
+    on_base_chances = stats.get("AB", 0) + stats.get("BB", 0) + stats.get("HBP", 0) + stats.get("SF", 0)
+    on_base = stats.get("H", 0) + stats.get("BB", 0) + stats.get("HBP", 0)
+    total_bases = (
+        stats.get("H", 0) + stats.get("2B", 0) + 2 * stats.get("3B", 0) + 3 * stats.get("HR", 0)
+    )
+    stats["OBP"] = on_base / on_base_chances if on_base_chances else 0
+    stats["SLG"] = total_bases / stats["AB"] if stats.get("AB") else 0
+    stats["OPS"] = stats["OBP"] + stats["SLG"]
+    return stats
+
+
+def refresh_rolling_stats(date=None, player_ids=None):
+    """
+    Rewrites the rolling stats of every player (or the given players) for the windows
+    ending on date (default today), two running-total lookups per window and role.
+
+    A player only gets rows for the roles played during the window, and no row for a
+    rate without a denominator (an ERA without innings), so neither sorts as a perfect 0.
+
+    Returns the number of rows written.
+    """
+    date = date or datetime.date.today()
+
+    rows = []
+    for days in ROLLING_WINDOWS:
+        start = date - datetime.timedelta(days=days - 1)
+        for role, categories in ROLLING_CATEGORIES.items():
+            totals = PlayerDailyTotals.window(player_ids, start, date, [role])
+            for player_id, stats in totals.items():
+                if not any(stats.values()):
+                    # Last line was before the window
+                    continue
+                calculate_rate_stats(stats, role)
+                if role == RoleChoices.BATTER:
+                    add_batting_rates(stats)
+                rows.extend(
+                    PlayerRollingStat(
+                        player_id=player_id, role=role, days=days, category=category,
+                        value=stats.get(category, 0), date=date,
+                    )
+                    for category in categories
+                    if category not in RATE_DENOMINATORS or stats.get(RATE_DENOMINATORS[category])
+                )
+
+    with transaction.atomic():
+        # Replaced rather than upserted, so players who stopped playing drop out
+        stale = PlayerRollingStat.objects.all()
+        if player_ids is not None:
+            stale = stale.filter(player_id__in=player_ids)
+        stale.delete()
+        PlayerRollingStat.objects.bulk_create(rows, batch_size=5000)
+    return len(rows)
+
+
+def free_agents(league, role=RoleChoices.BATTER, category=None, days=14, position=None, descending=None,
+                limit=50, cursor=None):
+    """
+    Returns one page of the players nobody in the league has on an active roster, sorted
+    by a rolling stat, as {"results": [...], "next": cursor}.
+
+    The search reads the rolling stat rows in index order, anti-joined against the
+    league's open roster stints and filtered on the GIN indexed eligible_positions, and
+    is keyset paginated on (value, player id).
+
+    Raises ValueError for an unknown role, window, category or cursor.
+    """
+    if role not in ROLLING_CATEGORIES:
+        raise ValueError(f"Unknown role {role}.")
+    if days not in ROLLING_WINDOWS:
+        raise ValueError(f"Unknown window {days}, expected one of {', '.join(map(str, ROLLING_WINDOWS))}.")
+    category = category or DEFAULT_CATEGORY[role]
+    if category not in ROLLING_CATEGORIES[role]:
+        raise ValueError(f"Unknown {role} category {category}.")
+    if descending is None:
+        descending = category not in LOWER_IS_BETTER
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    today = datetime.date.today()
+    rostered = FantasyRoster.objects.filter(
+        Q(end_date__isnull=True) | Q(end_date__gt=today),
+        player_id=OuterRef('player_id'),
+        fantasy_team__league=league,
+    )
+    rows = PlayerRollingStat.objects.filter(role=role, days=days, category=category).filter(~Exists(rostered))
+    if position:
+        rows = rows.filter(player__eligible_positions__contains=[position])
+    if cursor:
+        value, player_id = decode_cursor(cursor)
+        beyond = Q(value__lt=value) if descending else Q(value__gt=value)
+        rows = rows.filter(beyond | Q(value=value, player_id__gt=player_id))
+    rows = list(
+        rows.order_by('-value' if descending else 'value', 'player_id')
+        .select_related('player__team')[:limit + 1]
+    )
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].value, rows[-1].player_id)
+
+    stats = {}
+    for player_id, stat, value in PlayerRollingStat.objects.filter(
+        player_id__in=[row.player_id for row in rows], role=role, days=days
+    ).values_list('player_id', 'category', 'value'):
+        stats.setdefault(player_id, {})[stat] = value
+
+    return {
+        "category": category,
+        "days": days,
+        "date": rows[0].date if rows else None,
+        "results": [
+            {
+                "player": row.player_id,
+                "name": row.player.name,
+                "team": row.player.team.name,
+                "eligible_positions": row.player.eligible_positions,
+                "value": row.value,
+                "stats": stats.get(row.player_id, {}),
+            }
+            for row in rows
+        ],
+        "next": next_cursor,
+    }
@@ -0,0 +1,171 @@
+from django.db import transaction
+
+from .models import (
+    Team, Player, Game, GameStats, BattingLine, PitchingLine, BattingSeasonTotals, PitchingSeasonTotals,
+    PlayerDailyTotals, RoleChoices,
+)
+from .invalidation import game_lines_changed, players_changed
+from .stat_deltas import StatDeltaAccumulator, accumulate, stat_line_delta
+
+
+class GameLoader:
+    """
+    Bulk loader for parsed box scores.
+
+    Takes parsed games (see scraper/game_scraper.py parse_game) and writes all teams,
+    players, games, stat lines and typed lines with a handful of set-based upserts per
+    batch instead of one round trip per row. Team and player ids are cached for the
+    lifetime of the loader, so a season backfill only upserts players that are new or
+    have changed team.
+
+    A parsed game is a dict:
+        {
+            "game_number": 12, "date": date(2024, 4, 2),
+            "home_team": "Rakuten Monkeys", "away_team": "CTBC Brothers",
+            "sha256": "...",  # optional, stored as Game.source_sha256
+            "lines": [
+                {"team": "Rakuten Monkeys", "acnt": "0000001234", "name": "...", "indigenous_name": None,
+                 "role": "batter", "position": "RF (LF)", "stats": {"AB": 4, ...}},
+                ...
+            ],
+        }
+
+    Every stored line's change is added to the players' daily running totals and
+    applied as a delta to the roster, team and matchup period totals in the batch's own
+    transaction, so a run failing later can't lose the changes of batches already
+    stored. The season leaderboard totals of the batch's players are refreshed, and the
+    invalidation bus refreshes eligibility and cached responses once the batch commits.
+    """
+
+    def __init__(self):
+        self.deltas = StatDeltaAccumulator()
+        self.team_ids = {}  # name -> Team id
+        self.players = {}  # acnt -> (Player id, team id, name, indigenous name)
+
+    def load(self, parsed_games):
+        """Upserts a batch of parsed games in one transaction and returns the stored GameStats."""
+        if not parsed_games:
+            return []
+
+        with transaction.atomic():
+            self._load_teams(parsed_games)
+            self._load_players(parsed_games)
+            games = self._load_games(parsed_games)
+            stored = self._load_stats(parsed_games, games)
+            self.deltas.apply()
+        return stored
+
+    def _load_teams(self, parsed_games):
+        names = set()
+        for parsed in parsed_games:
+            names.update([parsed["home_team"], parsed["away_team"]])
+            names.update(line["team"] for line in parsed["lines"])
+        missing = names - self.team_ids.keys()
+        if not missing:
+            return
+
+        # Team names aren't unique in the schema, so look them up before creating
+        for team_id, name in Team.objects.filter(name__in=missing).values_list('id', 'name'):
+            self.team_ids.setdefault(name, team_id)
+        created = Team.objects.bulk_create([
+            Team(name=name) for name in missing if name not in self.team_ids
+        ])
+        for team in created:
+            self.team_ids[team.name] = team.id
+
+    def _load_players(self, parsed_games):
+        changed = {}
+        for parsed in parsed_games:
+            for line in parsed["lines"]:
+                current = (self.team_ids[line["team"]], line["name"], line["indigenous_name"])
+                cached = self.players.get(line["acnt"])
+                if cached is None or cached[1:] != current:
+                    changed[line["acnt"]] = current
+        if not changed:
+            return
+
+        # Only look up the players this run hasn't seen yet; the rest are known to exist
+        unseen = [acnt for acnt in changed if acnt not in self.players]
+        existing = set(Player.objects.filter(acnt__in=unseen).values_list('acnt', flat=True))
+        for acnt in unseen:
+            if acnt not in existing:
+                print("Created new Player", changed[acnt][1], acnt)
+
+        players = Player.objects.bulk_create(
+            [
+                Player(acnt=acnt, team_id=team_id, name=name, indigenous_name=indigenous_name, position="Unknown")
+                for acnt, (team_id, name, indigenous_name) in changed.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['acnt'],
+            # position is only a placeholder for new players, the profile scraper owns it
+            update_fields=['team', 'name', 'indigenous_name'],
+        )
+        for player in players:
+            self.players[player.acnt] = (player.id, player.team_id, player.name, player.indigenous_name)
+        players_changed([player.id for player in players])
+
+    def _load_games(self, parsed_games):
+        unique_games = {
+            (parsed["game_number"], parsed["date"]): Game(
+                game_number=parsed["game_number"],
+                date=parsed["date"],
+                home_team_id=self.team_ids[parsed["home_team"]],
+                away_team_id=self.team_ids[parsed["away_team"]],
+                source_sha256=parsed.get("sha256", ""),
+            )
+            for parsed in parsed_games
+        }
+        games = Game.objects.bulk_create(
+            list(unique_games.values()),
+            update_conflicts=True,
+            unique_fields=['game_number', 'date'],
+            update_fields=['home_team', 'away_team', 'source_sha256'],
+        )
+        return {(game.game_number, game.date): game for game in games}
+
+    def _load_stats(self, parsed_games, games):
+        # Later lines for the same (game, player, role) win, as they did with update_or_create
+        rows = {}
+        for parsed in parsed_games:
+            game = games[(parsed["game_number"], parsed["date"])]
+            for line in parsed["lines"]:
+                player_id = self.players[line["acnt"]][0]
+                row = GameStats(
+                    game=game, game_date=game.date, player_id=player_id,
+                    role=line["role"], position=line["position"], stats=line["stats"],
+                )
+                row.parse_position()
+                rows[(game.id, player_id, line["role"])] = row
+
+        previous = {
+            (game_id, player_id, role): stats
+            for game_id, player_id, role, stats in GameStats.objects.filter(
+                game_id__in=[game.id for game in games.values()]
+            ).values_list('game_id', 'player_id', 'role', 'stats')
+        }
+
+        stored = GameStats.objects.bulk_create(
+            list(rows.values()),
+            update_conflicts=True,
+            unique_fields=['game', 'player', 'role'],
+            update_fields=['position', 'positions', 'started', 'stats', 'game_date'],
+        )
+
+        batting = [row for row in stored if row.role == RoleChoices.BATTER]
+        pitching = [row for row in stored if row.role == RoleChoices.PITCHER]
+        BattingLine.sync(batting)
+        PitchingLine.sync(pitching)
+        BattingSeasonTotals.refresh({(row.player_id, row.game_date.year) for row in batting})
+        PitchingSeasonTotals.refresh({(row.player_id, row.game_date.year) for row in pitching})
+
+        daily = {}
+        for key, row in rows.items():
+            self.deltas.add(row.player_id, row.role, row.game_date, previous.get(key, {}), row.stats)
+            delta = stat_line_delta(previous.get(key, {}), row.stats)
+            if delta:
+                accumulate(daily.setdefault((row.player_id, row.role, row.game_date), {}), delta)
+        PlayerDailyTotals.add_deltas(daily)
+        # The roster and team totals get these changes as deltas, the rest is refreshed on commit
+        game_lines_changed({(row.player_id, row.game_date) for row in rows.values()}, refresh_totals=False)
+        return stored
@@ -0,0 +1,215 @@
+import datetime
+import threading
+
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .models import (
+    FantasyRoster, FantasyTeam, Game, GameStats, MatchupPeriod, Player, PlayerDailyTotals, RoleChoices, Team,
+    sum_roster_stats,
+)
+
+_local = threading.local()
+
+
+def pending():
+    if not hasattr(_local, "pending"):
+        _local.pending = empty_pending()
+        _local.dispatching = False
+    return _local.pending
+
+
+def empty_pending():
+    return {
+        "player_dates": set(),
+        "daily_totals": set(),
+        "season_totals": set(),
+        "rosters": set(),
+        "teams": set(),
+        "leagues": set(),
+        "eligibility": set(),
+        "responses": False,
+    }
+
+
+def mark(player_dates=(), daily_totals=(), season_totals=(), rosters=(), teams=(), leagues=(), eligibility=(),
+         responses=False):
+    """
+    Records changed keys and schedules a dispatch for when the current transaction commits.
+
+    Model signals and the bulk write paths (which send none) mark game lines by (player,
+    date), players' running and (role, player, season) season totals, roster entries,
+    fantasy teams, leagues and players. Marks made inside one transaction are coalesced
+    per thread, and once it commits a single dispatch refreshes every key once: the
+    players' daily running totals and season totals, the roster stats of the stints
+    covering the changed lines and the matchup periods containing them, then their teams'
+    total_stats, the leagues' cached standings and matchups, the eligibility of players
+    whose previous season changed and finally one response cache version bump.
+
+    Outside a transaction every mark is dispatched right away, so wrap bulk work in
+    transaction.atomic() to have it collapse into one refresh.
+    """
+    keys = pending()
+    keys["player_dates"].update(player_dates)
+    keys["daily_totals"].update(daily_totals)
+    keys["season_totals"].update(season_totals)
+    keys["rosters"].update(roster_id for roster_id in rosters if roster_id)
+    keys["teams"].update(team_id for team_id in teams if team_id)
+    keys["leagues"].update(leagues)
+    keys["eligibility"].update(eligibility)
+    keys["responses"] |= responses
+    # A dispatch in progress picks up marks made by its own writes
+    if not _local.dispatching:
+        # Scheduled on every mark: callbacks of a rolled back savepoint are dropped,
+        # and the ones after the first find nothing left to do
+        transaction.on_commit(dispatch)
+
+
+def game_lines_changed(player_dates, refresh_totals=True):
+    """
+    Marks changed game lines, given as (player id, game date) pairs.
+
+    Args:
+        refresh_totals: Recompute the roster and team totals covering the lines. Pass
+            False when the change is already applied as deltas (see StatDeltaAccumulator).
+    """
+    player_dates = set(player_dates)
+    eligibility_year = datetime.date.today().year - 1
+    mark(
+        player_dates=player_dates if refresh_totals else (),
+        eligibility={player_id for player_id, date in player_dates if date.year == eligibility_year},
+        responses=True,
+    )
+
+
+def players_changed(player_ids):
+    """Marks players whose profile changed, which only affects the cached responses."""
+    if player_ids:
+        mark(responses=True)
+
+
+def dispatch():
+    """Refreshes everything marked since the last dispatch, each key once."""
+    pending()
+    if _local.dispatching:
+        return
+    _local.dispatching = True
+    try:
+        while any(pending().values()):
+            keys = _local.pending
+            _local.pending = empty_pending()
+            try:
+                refresh(keys)
+            except Exception:
+                # Put back for the dispatch after the next commit to retry
+                mark(**keys)
+                raise
+    finally:
+        _local.dispatching = False
+
+
+def refresh(keys):
+    from .eligibility import update_eligibility
+    from .leaderboards import SEASON_TOTALS
+    from .matchups import invalidate_matchups, refresh_period_stats
+    from .response_cache import bump_data_version
+    from .standings import invalidate_standings
+
+    with transaction.atomic():
+        if keys["daily_totals"]:
+            PlayerDailyTotals.rebuild(keys["daily_totals"])
+        for role, model in SEASON_TOTALS.items():
+            player_seasons = {(player_id, season) for line_role, player_id, season in keys["season_totals"] if line_role == role}
+            if player_seasons:
+                model.refresh(player_seasons)
+
+        if keys["player_dates"] or keys["rosters"]:
+            rosters = FantasyRoster.objects.filter(id__in=keys["rosters"])
+            if keys["player_dates"]:
+                rosters |= FantasyRoster.objects.covering(keys["player_dates"])
+            for roster in rosters.order_by('id').update_stats():
+                keys["teams"].add(roster.fantasy_team_id)
+
+            if keys["player_dates"]:
+                # The head-to-head totals of the periods the changed lines were played in
+                in_period = Q()
+                for date in {date for _, date in keys["player_dates"]}:
+                    in_period |= Q(start_date__lte=date, end_date__gt=date)
+                refresh_period_stats(list(
+                    MatchupPeriod.objects.filter(in_period, league__fantasyteam__in=keys["teams"] - {None})
+                    .select_related('league').distinct()
+                ))
+        keys["teams"].discard(None)
+
+        if keys["teams"]:
+            teams = list(FantasyTeam.objects.filter(id__in=keys["teams"]).select_for_update().order_by('id'))
+            spots_by_team = {}
+            # Bench and injured list spots don't count towards the team totals
+            for roster in FantasyRoster.objects.filter(fantasy_team__in=teams).exclude(position__in=['BN', 'IL']):
+                spots_by_team.setdefault(roster.fantasy_team_id, []).append(roster)
+            for team in teams:
+                team.total_stats = sum_roster_stats(spots_by_team.get(team.id, []))
+                keys["leagues"].add(team.league_id)
+            FantasyTeam.objects.bulk_update(teams, ['total_stats'])
+
+        if keys["leagues"]:
+            invalidate_standings(keys["leagues"])
+            invalidate_matchups(MatchupPeriod.objects.filter(league_id__in=keys["leagues"]).values_list('id', flat=True))
+
+        if keys["eligibility"]:
+            # Marks the changed players' responses, which the dispatch loop then bumps
+            update_eligibility(player_ids=keys["eligibility"])
+
+    if keys["responses"]:
+        bump_data_version()
+
+
+@receiver(post_save, sender=GameStats)
+@receiver(post_delete, sender=GameStats)
+def game_stats_changed(sender, instance, **kwargs):
+    # The ingester writes in bulk, keeping the typed lines and derived totals itself
+    roles = [instance.role]
+    if kwargs.get("created") is not None and instance.sync_stat_line():
+        # The line changed role, the season totals of its old role lose it
+        roles = RoleChoices.values
+    mark(
+        daily_totals=[instance.player_id],
+        season_totals=[(role, instance.player_id, instance.game_date.year) for role in roles],
+    )
+    game_lines_changed([(instance.player_id, instance.game_date)])
+
+
+@receiver(pre_save, sender=FantasyRoster)
+def remember_roster_team(sender, instance, **kwargs):
+    # A roster entry moved to another team changes the totals of both
+    if instance.pk and not kwargs.get("raw"):
+        instance._previous_team_id = (
+            FantasyRoster.objects.filter(pk=instance.pk).values_list('fantasy_team_id', flat=True).first()
+        )
+
+
+@receiver(post_save, sender=FantasyRoster)
+def roster_saved(sender, instance, update_fields=None, **kwargs):
+    teams = [instance.fantasy_team_id, getattr(instance, "_previous_team_id", None)]
+    if update_fields is not None and set(update_fields) <= {"stats"}:
+        # Only the stored stats changed, the stint itself didn't
+        mark(teams=teams)
+    else:
+        mark(rosters=[instance.pk], teams=teams)
+
+
+@receiver(post_delete, sender=FantasyRoster)
+def roster_deleted(sender, instance, **kwargs):
+    mark(teams=[instance.fantasy_team_id])
+
+
+@receiver(post_save, sender=Player)
+@receiver(post_delete, sender=Player)
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+@receiver(post_save, sender=Game)
+@receiver(post_delete, sender=Game)
+def reference_data_changed(sender, **kwargs):
+    mark(responses=True)
@@ -0,0 +1,180 @@
+import base64
+import binascii
+import json
+
+from django.db.models import F, Q
+
+from .models import BattingSeasonTotals, PitchingSeasonTotals, Player, PlayerDailyTotals, RoleChoices, RATE_STAT_KEYS
+from .standings import LOWER_IS_BETTER, RATE_DENOMINATORS
+
+SEASON_TOTALS = {
+    RoleChoices.BATTER: BattingSeasonTotals,
+    RoleChoices.PITCHER: PitchingSeasonTotals,
+}
+DEFAULT_CATEGORY = {RoleChoices.BATTER: "HR", RoleChoices.PITCHER: "SO"}
+# Columns stored in a different unit than the scraped stat
+COLUMN_SCALE = {"IP": 3}
+MAX_LIMIT = 200
+
+
+def encode_cursor(value, player_id):
+    return base64.urlsafe_b64encode(json.dumps([value, player_id]).encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        value, player_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Invalid cursor.")
+    return value, player_id
+
+
+def scaled(value, stat):
+    """Converts a stored column to the scraped stat's unit; undefined rates stay None."""
+    return None if value is None else value / COLUMN_SCALE.get(stat, 1)
+
+
+def past_cursor(value, player_id, after, descending):
+    """Whether a (value, player id) entry comes after the cursor, undefined (None) values sorting last."""
+    after_value, after_player = after
+    if after_value is None:
+        return value is None and player_id > after_player
+    if value is None:
+        return True
+    beyond = value < after_value if descending else value > after_value
+    return beyond or (value == after_value and player_id > after_player)
+
+
+def leaderboard(role, category=None, season=None, start=None, end=None, descending=None,
+                qualifiers=None, team=None, position=None, limit=50, cursor=None):
+    """
+    Returns one page of the leaderboard of a category as {"results": [...], "next": cursor}.
+
+    Season leaderboards are read in order from the materialized season totals; with a
+    date window (start and end) the totals come from the players' daily running totals.
+    Pages are keyset paginated on (value, player id). Rates without a denominator (an
+    ERA without outs) are None and rank last in either order.
+
+    Args:
+        qualifiers: {category: minimum}, e.g. {"AB": 100}
+        team: CPBL team id
+        position: fantasy position the player must be eligible at
+
+    Raises ValueError for an unknown role, category or cursor.
+    """
+    model = SEASON_TOTALS.get(role)
+    if model is None:
+        raise ValueError(f"Unknown role {role}.")
+    category = category or DEFAULT_CATEGORY[role]
+    qualifiers = qualifiers or {}
+    for stat in [category, *qualifiers]:
+        if stat not in model.CATEGORY_FIELDS:
+            raise ValueError(f"Unknown {role} category {stat}.")
+    if descending is None:
+        descending = category not in LOWER_IS_BETTER
+    limit = max(1, min(limit, MAX_LIMIT))
+    after = decode_cursor(cursor) if cursor else None
+
+    if start or end:
+        rows = window_leaderboard(role, category, start, end, descending, qualifiers, team, position, limit, after)
+    else:
+        rows = season_leaderboard(model, category, season, descending, qualifiers, team, position, limit, after)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].pop("sort_value"), rows[-1]["player"])
+    for row in rows:
+        row.pop("sort_value", None)
+    return {"category": category, "results": rows, "next": next_cursor}
+
+
+def season_leaderboard(model, category, season, descending, qualifiers, team, position, limit, after):
+    field = model.CATEGORY_FIELDS[category]
+    totals = model.objects.filter(season=season).select_related('player__team')
+    if team:
+        totals = totals.filter(player__team_id=team)
+    if position:
+        totals = totals.filter(player__eligible_positions__contains=[position])
+    for stat, minimum in qualifiers.items():
+        totals = totals.filter(**{f"{model.CATEGORY_FIELDS[stat]}__gte": minimum * COLUMN_SCALE.get(stat, 1)})
+
+    if after:
+        value, player_id = after
+        if value is None:
+            totals = totals.filter(**{f"{field}__isnull": True, "player_id__gt": player_id})
+        else:
+            beyond = f"{field}__lt" if descending else f"{field}__gt"
+            totals = totals.filter(
+                Q(**{beyond: value}) | Q(**{field: value, "player_id__gt": player_id}) | Q(**{f"{field}__isnull": True})
+            )
+    order = F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True)
+    totals = totals.order_by(order, 'player_id')[:limit + 1]
+
+    return [
+        {
+            "player": season_totals.player_id,
+            "name": season_totals.player.name,
+            "team": season_totals.player.team.name,
+            "season": season_totals.season,
+            "games": season_totals.games,
+            "value": scaled(getattr(season_totals, field), category),
+            "stats": {
+                stat: scaled(getattr(season_totals, stat_field), stat)
+                for stat, stat_field in model.CATEGORY_FIELDS.items()
+            },
+            "sort_value": getattr(season_totals, field),
+        }
+        for season_totals in totals
+    ]
+
+
+def window_leaderboard(role, category, start, end, descending, qualifiers, team, position, limit, after):
+    """
+    Ranks the players who played in the window in Python, from two reads of the running
+    totals of every player (or only the team's or position's players). Fine for a
+    league's worth of players, unlike the season path this doesn't stop at the page size.
+    """
+    players = Player.objects.select_related('team')
+    if team:
+        players = players.filter(team_id=team)
+    if position:
+        players = players.filter(eligible_positions__contains=[position])
+    players = players.in_bulk() if team or position else None
+
+    totals = PlayerDailyTotals.window(list(players) if players is not None else None, start, end, [role])
+    entries = []
+    for player_id, stats in totals.items():
+        # Players without a game in the window
+        if not any(value for stat, value in stats.items() if stat not in RATE_STAT_KEYS):
+            continue
+        if any((stats.get(stat) or 0) < minimum for stat, minimum in qualifiers.items()):
+            continue
+        for rate, denominator in RATE_DENOMINATORS.items():
+            if rate in stats and not stats.get(denominator):
+                stats[rate] = None
+        value = stats.get(category, 0)
+        if after and not past_cursor(value, player_id, after, descending):
+            continue
+        entries.append((value, player_id, stats))
+
+    entries.sort(key=lambda entry: (
+        entry[0] is None, 0 if entry[0] is None else -entry[0] if descending else entry[0], entry[1],
+    ))
+    entries = entries[:limit + 1]
+    if players is None:
+        players = Player.objects.select_related('team').in_bulk([player_id for _, player_id, _ in entries])
+
+    return [
+        {
+            "player": player_id,
+            "name": players[player_id].name,
+            "team": players[player_id].team.name,
+            "from": start,
+            "to": end,
+            "value": value,
+            "stats": stats,
+            "sort_value": value,
+        }
+        for value, player_id, stats in entries
+    ]
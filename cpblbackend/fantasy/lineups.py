@@ -0,0 +1,212 @@
+import numpy as np
+
+from .models import FantasyRoster, PlayerRollingStat, RoleChoices
+from .roster_moves import RESERVE_SLOTS, RosterMove, roster_slots, slot_eligible
+from .standings import LOWER_IS_BETTER, category_role, league_categories
+
+PITCHER_SLOTS = {'SP', 'RP', 'P'}
+# Rates are scored as what the player adds above an average player, weighted by playing time:
+# rate category -> (numerator stats, denominator stat, denominator scale)
+RATE_CONTRIBUTIONS = {
+    "AVG": (["H"], "AB", 1),
+    "ERA": (["ER"], "IP", 1 / 9),
+    "WHIP": (["H", "BB"], "IP", 1),
+}
+ROLLING_DAYS = 14
+# Infeasible assignments cost more than any lineup can be worth
+INFEASIBLE = 1e9
+# Ties go to filling a lineup spot rather than the bench, then to leaving players where they are
+ACTIVE_BONUS = 1e-6
+TIE_BONUS = 1e-7
+
+
+def hungarian(cost):
+    """
+    Solves the rectangular assignment problem with the Hungarian algorithm (shortest
+    augmenting paths with potentials), O(rows^2 * columns).
+
+    Returns the column assigned to each row minimizing the total cost; needs rows <= columns.
+    """
+    rows, columns = cost.shape
+    u = np.zeros(rows + 1)
+    v = np.zeros(columns + 1)
+    owner = np.zeros(columns + 1, dtype=int)  # 1-based row holding each column, 0 if free
+    way = np.zeros(columns + 1, dtype=int)
+
+    for row in range(1, rows + 1):
+        owner[0] = row
+        column = 0
+        min_slack = np.full(columns + 1, np.inf)
+        used = np.zeros(columns + 1, dtype=bool)
+        while True:
+            used[column] = True
+            current = owner[column]
+            slack = cost[current - 1] - u[current] - v[1:]
+            improved = ~used[1:] & (slack < min_slack[1:])
+            min_slack[1:][improved] = slack[improved]
+            way[1:][improved] = column
+            candidates = np.where(used[1:], np.inf, min_slack[1:])
+            next_column = int(np.argmin(candidates)) + 1
+            delta = candidates[next_column - 1]
+            u[owner[used]] += delta
+            v[used] -= delta
+            min_slack[~used] -= delta
+            column = next_column
+            if owner[column] == 0:
+                break
+        # Flip the augmenting path
+        while column:
+            previous = way[column]
+            owner[column] = owner[previous]
+            column = previous
+
+    assignment = np.empty(rows, dtype=int)
+    for column in range(1, columns + 1):
+        if owner[column]:
+            assignment[owner[column] - 1] = column - 1
+    return assignment
+
+
+def solve_lineup(players, slots, current=None):
+    """
+    Picks the lineup maximizing the players' total production.
+
+    Args:
+        players: list of (player, {"batter": score, "pitcher": score}); a player scores
+            his pitcher score in SP, RP and P slots, his batter score elsewhere and 0 on
+            the bench
+        slots: {slot: count} to fill, bench included
+        current: {player id: slot} the players hold now; among equally good lineups
+            the one moving the fewest players wins
+
+    Returns ({player id: slot}, total score). Raises ValueError when the players don't
+    fit in the slots.
+    """
+    current = current or {}
+    units = [slot for slot, count in slots.items() for _ in range(count)]
+    if len(players) > len(units):
+        raise ValueError(f"{len(players)} players don't fit in {len(units)} roster spots.")
+    if not players:
+        return {}, 0.0
+
+    score = np.zeros((len(players), len(units)))
+    value = np.zeros((len(players), len(units)))
+    for row, (player, scores) in enumerate(players):
+        for column, slot in enumerate(units):
+            if not slot_eligible(player, slot):
+                value[row, column] = -INFEASIBLE
+                continue
+            if slot not in RESERVE_SLOTS:
+                role = RoleChoices.PITCHER if slot in PITCHER_SLOTS else RoleChoices.BATTER
+                score[row, column] = scores.get(role, 0)
+            value[row, column] = (
+                score[row, column]
+                + ACTIVE_BONUS * (slot not in RESERVE_SLOTS)
+                + TIE_BONUS * (current.get(player.id) == slot)
+            )
+
+    assignment = hungarian(-value)
+    rows = np.arange(len(players))
+    if (value[rows, assignment] <= -INFEASIBLE).any():
+        raise ValueError("No legal lineup fits every player.")
+    lineup = {player.id: units[column] for (player, _), column in zip(players, assignment)}
+    return lineup, float(score[rows, assignment].sum())
+
+
+def production_scores(categories, stats_by_player):
+    """
+    Scores players by their recent stats in the league's categories: each category's
+    contribution is divided by its standard deviation over the pool, so categories weigh
+    alike, and lower-is-better categories count negatively.
+
+    Args:
+        stats_by_player: {player id: rolling stats of one role}
+
+    Returns {player id: score}.
+    """
+    if not stats_by_player or not categories:
+        return {player_id: 0.0 for player_id in stats_by_player}
+
+    player_ids = list(stats_by_player)
+    totals = {}
+    for category in categories:
+        if category in RATE_CONTRIBUTIONS:
+            stats, denominator, scale = RATE_CONTRIBUTIONS[category]
+            numerators = np.array([sum(stats_by_player[p].get(stat, 0) for stat in stats) for p in player_ids], dtype=float)
+            playing_time = np.array([stats_by_player[p].get(denominator, 0) for p in player_ids], dtype=float) * scale
+            # Against the pool's rate, so playing time only helps a better than average player
+            pool_rate = numerators.sum() / playing_time.sum() if playing_time.sum() else 0
+            totals[category] = numerators - pool_rate * playing_time
+        else:
+            totals[category] = np.array([stats_by_player[p].get(category, 0) for p in player_ids], dtype=float)
+
+    scores = np.zeros(len(player_ids))
+    for category, contribution in totals.items():
+        spread = contribution.std() or 1
+        sign = -1 if category in LOWER_IS_BETTER else 1
+        scores += sign * contribution / spread
+    return dict(zip(player_ids, scores.tolist()))
+
+
+def optimal_lineups(league, days=ROLLING_DAYS):
+    """
+    Solves the best lineup of every team in the league from the players' rolling stats,
+    loading all rosters and stats in two queries.
+
+    Players on the injured list stay there. Returns {team id: {"lineup": {player id: slot},
+    "score": total, "changes": {player id: slot}}}.
+    """
+    categories = league_categories(league)
+    roles = {
+        role: [category for category in categories if category_role(category) == role]
+        for role in (RoleChoices.BATTER, RoleChoices.PITCHER)
+    }
+    slots = {slot: count for slot, count in roster_slots(league).items() if slot != 'IL'}
+
+    rosters = list(
+        FantasyRoster.objects.filter(fantasy_team__league=league, end_date__isnull=True)
+        .exclude(position='IL')
+        .select_related('player')
+        .order_by('fantasy_team_id', 'id')
+    )
+    stats = {RoleChoices.BATTER: {}, RoleChoices.PITCHER: {}}
+    for roster in rosters:
+        for role in stats:
+            stats[role][roster.player_id] = {}
+    rolling = PlayerRollingStat.objects.filter(
+        player_id__in=[roster.player_id for roster in rosters], days=days,
+    ).values_list('player_id', 'role', 'category', 'value')
+    for player_id, role, category, value in rolling:
+        stats[role][player_id][category] = value
+
+    scores = {role: production_scores(roles[role], stats[role]) for role in stats}
+
+    by_team = {}
+    for roster in rosters:
+        by_team.setdefault(roster.fantasy_team_id, []).append(roster)
+
+    lineups = {}
+    for team_id, team_rosters in by_team.items():
+        players = [
+            (roster.player, {role: scores[role].get(roster.player_id, 0) for role in scores})
+            for roster in team_rosters
+        ]
+        lineup, score = solve_lineup(players, slots, {roster.player_id: roster.position for roster in team_rosters})
+        lineups[team_id] = {
+            "lineup": lineup,
+            "score": score,
+            "changes": {
+                roster.player_id: lineup[roster.player_id]
+                for roster in team_rosters if lineup[roster.player_id] != roster.position
+            },
+        }
+    return lineups
+
+
+def set_optimal_lineups(league, date=None, days=ROLLING_DAYS):
+    """Solves and applies the best lineup of every team in the league as one roster move (see RosterMove.lineups)."""
+    lineups = optimal_lineups(league, days)
+    changes = {team_id: lineup["changes"] for team_id, lineup in lineups.items() if lineup["changes"]}
+    if changes:
+        RosterMove(league, date).lineups(changes)
+    return lineups
@@ -0,0 +1,40 @@
+import datetime
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fantasy.exports import EXPORT_FORMATS, export_chunks, export_lines
+from fantasy.models import RoleChoices
+
+
+class Command(BaseCommand):
+    help = "Streams the game lines of a season or date range to a file as NDJSON, CSV, Parquet or Arrow."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="ndjson")
+        parser.add_argument("--season", type=int)
+        parser.add_argument("--from", dest="start", type=datetime.date.fromisoformat, help="First date (YYYY-MM-DD)")
+        parser.add_argument("--to", dest="end", type=datetime.date.fromisoformat, help="Last date (YYYY-MM-DD)")
+        parser.add_argument("--role", choices=RoleChoices.values)
+        parser.add_argument("--gzip", action="store_true", help="Gzip the output on the fly")
+        parser.add_argument("--output", "-o", help="File to write, defaults to stdout")
+
+    def handle(self, *args, **options):
+        lines = export_lines(season=options["season"], start=options["start"], end=options["end"], role=options["role"])
+        try:
+            chunks = export_chunks(options["format"], lines, gzip=options["gzip"])
+        except ImportError:
+            raise CommandError(f"{options['format']} export needs pyarrow installed")
+
+        output = open(options["output"], "wb") if options["output"] else sys.stdout.buffer
+        try:
+            size = 0
+            for chunk in chunks:
+                output.write(chunk)
+                size += len(chunk)
+        finally:
+            if options["output"]:
+                output.close()
+
+        if options["output"]:
+            self.stdout.write(self.style.SUCCESS(f"Wrote {size} bytes to {options['output']}"))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from fantasy.models import GameStats
+from fantasy.positions import fill_positions
+
+
+class Command(BaseCommand):
+    help = (
+        "Fills GameStats.positions and started from the scraped position strings. Ingested lines are "
+        "parsed automatically and migration 0026 filled the existing ones; run this after changing "
+        "the position parser."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--season", type=int, help="Only parse the lines of this season")
+        parser.add_argument(
+            "--missing", action="store_true", help="Only parse lines that have no positions yet"
+        )
+
+    def handle(self, *args, **options):
+        lines = GameStats.objects.all()
+        if options["season"]:
+            lines = lines.filter(game_date__year=options["season"])
+        if options["missing"]:
+            lines = lines.filter(positions=[])
+
+        distinct, updated = fill_positions(lines)
+        self.stdout.write(self.style.SUCCESS(
+            f"Parsed {distinct} distinct positions on {updated} game lines"
+        ))
@@ -0,0 +1,84 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from fantasy.models import FantasyRoster, FantasyTeam, sum_roster_stats
+from fantasy.standings import invalidate_standings
+
+
+def stats_match(stored, expected, tolerance=1e-6):
+    """
+    Compares two role-separated stat dicts, treating missing keys as 0 and allowing float
+    drift from IP thirds.
+    """
+    for role in set(stored) | set(expected):
+        stored_role, expected_role = stored.get(role, {}), expected.get(role, {})
+        for stat in set(stored_role) | set(expected_role):
+            if abs(stored_role.get(stat, 0) - expected_role.get(stat, 0)) > tolerance:
+                return False
+    return True
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes FantasyRoster.stats and FantasyTeam.total_stats from the full GameStats history "
+        "and reports entries whose incrementally maintained totals have drifted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--league", type=int, help="Only rebuild the teams of this fantasy league")
+        parser.add_argument(
+            "--check",
+            action="store_true",
+            help="Only report drifted totals without writing anything; exits with an error if any are found",
+        )
+
+    def handle(self, *args, **options):
+        rosters = FantasyRoster.objects.all()
+        teams = FantasyTeam.objects.all()
+        if options["league"]:
+            rosters = rosters.filter(fantasy_team__league_id=options["league"])
+            teams = teams.filter(league_id=options["league"])
+
+        with transaction.atomic():
+            stored_rosters = {roster.id: roster.stats for roster in rosters.select_for_update()}
+            fresh_rosters = rosters.calculate_stats()
+
+            drifted_rosters = [
+                roster for roster in fresh_rosters
+                if not stats_match(stored_rosters[roster.id], roster.stats)
+            ]
+
+            # Team totals only count active roster spots
+            spots_by_team = {}
+            for roster in fresh_rosters:
+                if roster.fantasy_team_id and roster.position not in ['BN', 'IL']:
+                    spots_by_team.setdefault(roster.fantasy_team_id, []).append(roster)
+
+            drifted_teams = []
+            for team in teams.select_for_update():
+                expected = sum_roster_stats(spots_by_team.get(team.id, []))
+                if not stats_match(team.total_stats, expected):
+                    team.total_stats = expected
+                    drifted_teams.append(team)
+
+            for roster in drifted_rosters:
+                self.stdout.write(f"Roster {roster.id} ({roster.player_id}) drifted")
+            for team in drifted_teams:
+                self.stdout.write(f"Fantasy team {team.id} ({team.name}) drifted")
+
+            if options["check"]:
+                if drifted_rosters or drifted_teams:
+                    raise CommandError(
+                        f"{len(drifted_rosters)} roster entries and {len(drifted_teams)} fantasy teams are out of date"
+                    )
+                self.stdout.write(self.style.SUCCESS("All fantasy totals are up to date"))
+                return
+
+            FantasyRoster.objects.bulk_update(fresh_rosters, ["stats"])
+            FantasyTeam.objects.bulk_update(drifted_teams, ["total_stats"])
+            invalidate_standings(team.league_id for team in drifted_teams)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {len(fresh_rosters)} roster entries "
+            f"({len(drifted_rosters)} drifted) and {len(drifted_teams)} fantasy teams"
+        ))
@@ -0,0 +1,21 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from fantasy.free_agents import refresh_rolling_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes every player's last 7, 14 and 30 day stats behind the free agent search. "
+        "Run nightly; scraper runs refresh them after ingesting."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--date", type=datetime.date.fromisoformat, help="Last day of the windows (YYYY-MM-DD), default today"
+        )
+
+    def handle(self, *args, **options):
+        rows = refresh_rolling_stats(options["date"])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {rows} rolling stats"))
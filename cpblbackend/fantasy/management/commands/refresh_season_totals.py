@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db.models.functions import ExtractYear
+
+from fantasy.invalidation import mark
+from fantasy.models import BattingSeasonTotals, PitchingSeasonTotals
+
+
+class Command(BaseCommand):
+    help = (
+        "Recomputes the materialized season totals behind the player leaderboards. "
+        "Ingested games refresh their players automatically; this is for lines changed outside the scraper."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--season", type=int, help="Only refresh this season")
+
+    def handle(self, *args, **options):
+        for model in [BattingSeasonTotals, PitchingSeasonTotals]:
+            lines = model.line_model.objects.all()
+            if options["season"]:
+                lines = lines.filter(game__date__year=options["season"])
+            player_seasons = set(
+                lines.values_list('player_id', ExtractYear('game__date')).distinct().order_by()
+            )
+            totals = model.refresh(player_seasons)
+            self.stdout.write(f"{model.__name__}: refreshed {len(totals)} player seasons")
+        # The leaderboard responses are cached
+        mark(responses=True)
+
+        self.stdout.write(self.style.SUCCESS("Season totals are up to date"))
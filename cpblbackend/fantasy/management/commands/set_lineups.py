@@ -0,0 +1,47 @@
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from fantasy.free_agents import ROLLING_WINDOWS
+from fantasy.lineups import ROLLING_DAYS, optimal_lineups, set_optimal_lineups
+from fantasy.models import FantasyLeague
+
+
+class Command(BaseCommand):
+    help = (
+        "Sets the best lineup of every team from the players' rolling stats. "
+        "Run nightly after refresh_rolling_stats."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--league", type=int, action="append", help="League id, repeatable; default every league")
+        parser.add_argument(
+            "--date", type=datetime.date.fromisoformat, help="Day the lineups take effect (YYYY-MM-DD), default today"
+        )
+        parser.add_argument("--days", type=int, default=ROLLING_DAYS, choices=ROLLING_WINDOWS, help="Rolling window")
+        parser.add_argument("--dry-run", action="store_true", help="Report the changes without making them")
+
+    def handle(self, *args, **options):
+        leagues = FantasyLeague.objects.order_by('id')
+        if options["league"]:
+            leagues = leagues.filter(id__in=options["league"])
+
+        failed = []
+        for league in leagues:
+            try:
+                if options["dry_run"]:
+                    lineups = optimal_lineups(league, options["days"])
+                else:
+                    lineups = set_optimal_lineups(league, options["date"], options["days"])
+            except ValueError as e:
+                # One league's illegal roster shouldn't keep the others on yesterday's lineups
+                self.stderr.write(f"{league.name}: {e}")
+                failed.append(league.name)
+                continue
+            changes = sum(len(lineup["changes"]) for lineup in lineups.values())
+            verb = "Would move" if options["dry_run"] else "Moved"
+            self.stdout.write(f"{league.name}: {verb} {changes} players across {len(lineups)} teams")
+
+        if failed:
+            raise CommandError(f"Lineups failed for {len(failed)} leagues: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS("Lineups done"))
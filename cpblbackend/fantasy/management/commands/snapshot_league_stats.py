@@ -0,0 +1,37 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from fantasy.models import FantasyLeague
+from fantasy.snapshots import snapshot_league
+
+
+class Command(BaseCommand):
+    help = (
+        "Appends the daily cumulative stat snapshots of every fantasy team up to yesterday. "
+        "Meant to run nightly; only dates after each league's last snapshot are written."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--league", type=int, help="Only snapshot this fantasy league")
+        parser.add_argument(
+            "--until",
+            type=datetime.date.fromisoformat,
+            help="Last date to snapshot (YYYY-MM-DD), defaults to yesterday",
+        )
+        parser.add_argument(
+            "--rebuild",
+            action="store_true",
+            help="Drop the existing snapshots and refill them from the league start, e.g. after stat corrections",
+        )
+
+    def handle(self, *args, **options):
+        leagues = FantasyLeague.objects.order_by('id')
+        if options["league"]:
+            leagues = leagues.filter(id=options["league"])
+
+        for league in leagues:
+            days = snapshot_league(league, until=options["until"], rebuild=options["rebuild"])
+            self.stdout.write(f"{league.name}: snapshotted {days} days")
+
+        self.stdout.write(self.style.SUCCESS("Snapshots are up to date"))
@@ -0,0 +1,211 @@
+import datetime
+
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Matchup, MatchupPeriod, TeamPeriodStats, calculate_role_rate_stats
+from .snapshots import daily_team_deltas
+from .standings import LOWER_IS_BETTER, CACHE_TIMEOUT, category_matrix, league_categories
+
+PERIOD_LENGTH = datetime.timedelta(days=7)
+
+
+def matchup_cache_key(period_id):
+    return f"fantasy:matchups:{period_id}"
+
+
+def invalidate_matchups(period_ids):
+    """Drops the cached scores of the given matchup periods once the current transaction commits."""
+    keys = [matchup_cache_key(period_id) for period_id in set(period_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def round_robin(team_ids):
+    """
+    Returns the rounds of a round robin between the teams (circle method), each a list
+    of (home, away) pairs. With an odd number of teams one team has a bye every round.
+    """
+    teams = list(team_ids)
+    if len(teams) % 2:
+        teams.append(None)
+
+    rounds = []
+    for number in range(len(teams) - 1):
+        pairs = []
+        for i in range(len(teams) // 2):
+            home, away = teams[i], teams[-1 - i]
+            if home is None or away is None:
+                continue
+            # Alternate home and away so nobody hosts every week
+            pairs.append((home, away) if number % 2 == 0 else (away, home))
+        rounds.append(pairs)
+        teams = [teams[0], teams[-1]] + teams[1:-1]
+    return rounds
+
+
+def period_totals(deltas, period, team_ids):
+    """Sums daily team deltas (see daily_team_deltas) over the period into {team_id: role-separated stats}."""
+    totals = {team_id: {} for team_id in team_ids}
+    day = period.start_date
+    while day < period.end_date:
+        for team_id, delta in deltas.get(day, {}).items():
+            for role, role_delta in delta.items():
+                role_totals = totals.setdefault(team_id, {}).setdefault(role, {})
+                for stat, change in role_delta.items():
+                    role_totals[stat] = role_totals.get(stat, 0) + change
+        day += datetime.timedelta(days=1)
+    return {team_id: calculate_role_rate_stats(stats) for team_id, stats in totals.items()}
+
+
+def refresh_period_stats(periods):
+    """
+    Recomputes the team totals of the given matchup periods from the game lines, one
+    GameStats read per league. Returns the rewritten TeamPeriodStats rows.
+    """
+    by_league = {}
+    for period in periods:
+        by_league.setdefault(period.league_id, []).append(period)
+
+    rows = []
+    with transaction.atomic():
+        for league_periods in by_league.values():
+            league = league_periods[0].league
+            deltas = daily_team_deltas(
+                league,
+                min(period.start_date for period in league_periods),
+                max(period.end_date for period in league_periods) - datetime.timedelta(days=1),
+            )
+            for period in league_periods:
+                stored = list(period.team_stats.select_for_update().order_by('id'))
+                totals = period_totals(deltas, period, [row.fantasy_team_id for row in stored])
+                for row in stored:
+                    row.stats = totals[row.fantasy_team_id]
+                rows.extend(stored)
+        TeamPeriodStats.objects.bulk_update(rows, ['stats'])
+        invalidate_matchups(period.id for period in periods)
+    return rows
+
+
+def generate_schedule(league):
+    """
+    Replaces the league's schedule with weekly matchup periods from its start to its end
+    date, cycling through a round robin of its teams, and fills every period's team totals
+    from the game lines already played.
+
+    Returns the created periods.
+    """
+    team_ids = list(league.fantasyteam_set.order_by('id').values_list('id', flat=True))
+    rounds = round_robin(team_ids)
+
+    with transaction.atomic():
+        league.matchup_periods.all().delete()
+
+        periods = []
+        start = league.start_date
+        while start <= league.end_date:
+            end = min(start + PERIOD_LENGTH, league.end_date + datetime.timedelta(days=1))
+            periods.append(MatchupPeriod(league=league, number=len(periods) + 1, start_date=start, end_date=end))
+            start = end
+        periods = MatchupPeriod.objects.bulk_create(periods)
+
+        if rounds:
+            Matchup.objects.bulk_create([
+                Matchup(period=period, home_team_id=home, away_team_id=away)
+                for index, period in enumerate(periods)
+                for home, away in rounds[index % len(rounds)]
+            ])
+
+        # Roll up every game played so far into its period in one pass over the game lines
+        deltas = daily_team_deltas(league, league.start_date, league.end_date) if periods else {}
+        period_stats = []
+        for period in periods:
+            period_stats.extend(
+                TeamPeriodStats(period=period, fantasy_team_id=team_id, stats=stats)
+                for team_id, stats in period_totals(deltas, period, team_ids).items()
+            )
+        TeamPeriodStats.objects.bulk_create(period_stats)
+        invalidate_matchups(period.id for period in periods)
+
+    return periods
+
+
+def current_period(league, date=None):
+    """Returns the league's period containing date (default today), or its last period before it."""
+    date = date or datetime.date.today()
+    return league.matchup_periods.filter(start_date__lte=date).order_by('-start_date').first()
+
+
+def score_matchups(categories, matchups, stats_by_team):
+    """
+    Scores every matchup of a period in one vectorized pass.
+
+    Args:
+        categories: scoring categories
+        matchups: list of (matchup id, home team id, away team id)
+        stats_by_team: {team id: period stats}
+
+    Returns a list with the category winners and win/loss/tie counts of each matchup.
+    """
+    if not matchups:
+        return []
+
+    home = category_matrix([stats_by_team.get(home_id, {}) for _, home_id, _ in matchups], categories)
+    away = category_matrix([stats_by_team.get(away_id, {}) for _, _, away_id in matchups], categories)
+    lower_is_better = np.array([category in LOWER_IS_BETTER for category in categories], dtype=bool)
+
+    # Orient every category so that higher wins; a rate without playing time loses
+    home_signed = np.nan_to_num(np.where(lower_is_better, -home, home), nan=-np.inf)
+    away_signed = np.nan_to_num(np.where(lower_is_better, -away, away), nan=-np.inf)
+    home_won = home_signed > away_signed
+    away_won = away_signed > home_signed
+    tied = ~(home_won | away_won)
+
+    results = []
+    for row, (matchup_id, home_id, away_id) in enumerate(matchups):
+        results.append({
+            "matchup_id": matchup_id,
+            "home_team": home_id,
+            "away_team": away_id,
+            "home_wins": int(home_won[row].sum()),
+            "away_wins": int(away_won[row].sum()),
+            "ties": int(tied[row].sum()),
+            "categories": {
+                category: {
+                    "home": None if np.isnan(home[row, column]) else float(home[row, column]),
+                    "away": None if np.isnan(away[row, column]) else float(away[row, column]),
+                    "winner": "home" if home_won[row, column] else "away" if away_won[row, column] else None,
+                }
+                for column, category in enumerate(categories)
+            },
+        })
+    return results
+
+
+def compute_period_scores(league, period):
+    categories = league_categories(league)
+    matchups = list(period.matchups.order_by('id').values_list('id', 'home_team_id', 'away_team_id'))
+    stats_by_team = dict(period.team_stats.values_list('fantasy_team_id', 'stats'))
+    return {
+        "period": period.number,
+        "start_date": period.start_date,
+        "end_date": period.end_date,
+        "categories": categories,
+        "matchups": score_matchups(categories, matchups, stats_by_team),
+    }
+
+
+def get_period_scores(league, period):
+    """
+    Returns the scores of every matchup in the period from the cache, computing them on a miss.
+
+    The default cache is shared by every process (see settings.CACHES), so evictions by
+    invalidate_matchups in the scraper or a roster move reach the web workers.
+    """
+    key = matchup_cache_key(period.id)
+    scores = cache.get(key)
+    if scores is None:
+        scores = compute_period_scores(league, period)
+        cache.set(key, scores, CACHE_TIMEOUT)
+    return scores
@@ -0,0 +1,71 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0017_fantasyleague_scoring_system'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BattingLine',
+            fields=[
+                ('game_stats', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='batting_line', serialize=False, to='fantasy.gamestats')),
+                ('ab', models.PositiveSmallIntegerField(default=0)),
+                ('r', models.PositiveSmallIntegerField(default=0)),
+                ('h', models.PositiveSmallIntegerField(default=0)),
+                ('rbi', models.PositiveSmallIntegerField(default=0)),
+                ('doubles', models.PositiveSmallIntegerField(default=0)),
+                ('triples', models.PositiveSmallIntegerField(default=0)),
+                ('hr', models.PositiveSmallIntegerField(default=0)),
+                ('gidp', models.PositiveSmallIntegerField(default=0)),
+                ('bb', models.PositiveSmallIntegerField(default=0)),
+                ('ibb', models.PositiveSmallIntegerField(default=0)),
+                ('hbp', models.PositiveSmallIntegerField(default=0)),
+                ('so', models.PositiveSmallIntegerField(default=0)),
+                ('sac', models.PositiveSmallIntegerField(default=0)),
+                ('sf', models.PositiveSmallIntegerField(default=0)),
+                ('sb', models.PositiveSmallIntegerField(default=0)),
+                ('cs', models.PositiveSmallIntegerField(default=0)),
+                ('e', models.PositiveSmallIntegerField(default=0)),
+                ('avg', models.FloatField(default=0)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batting_lines', to='fantasy.game')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batting_lines', to='fantasy.player')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['player'], include=('ab', 'h', 'r', 'rbi', 'hr', 'sb', 'bb', 'so'), name='batting_line_player_totals')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PitchingLine',
+            fields=[
+                ('game_stats', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pitching_line', serialize=False, to='fantasy.gamestats')),
+                ('outs', models.PositiveSmallIntegerField(default=0)),
+                ('bf', models.PositiveSmallIntegerField(default=0)),
+                ('np', models.PositiveSmallIntegerField(default=0)),
+                ('strikes', models.PositiveSmallIntegerField(default=0)),
+                ('h', models.PositiveSmallIntegerField(default=0)),
+                ('hr', models.PositiveSmallIntegerField(default=0)),
+                ('bb', models.PositiveSmallIntegerField(default=0)),
+                ('ibb', models.PositiveSmallIntegerField(default=0)),
+                ('hbp', models.PositiveSmallIntegerField(default=0)),
+                ('so', models.PositiveSmallIntegerField(default=0)),
+                ('wp', models.PositiveSmallIntegerField(default=0)),
+                ('bk', models.PositiveSmallIntegerField(default=0)),
+                ('r', models.PositiveSmallIntegerField(default=0)),
+                ('er', models.PositiveSmallIntegerField(default=0)),
+                ('e', models.PositiveSmallIntegerField(default=0)),
+                ('era', models.FloatField(default=0)),
+                ('whip', models.FloatField(default=0)),
+                ('game', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pitching_lines', to='fantasy.game')),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pitching_lines', to='fantasy.player')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['player'], include=('outs', 'er', 'h', 'bb', 'so'), name='pitching_line_player_totals')],
+            },
+        ),
+    ]
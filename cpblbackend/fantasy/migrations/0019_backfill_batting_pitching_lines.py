@@ -0,0 +1,54 @@
+from django.db import migrations
+
+# Frozen copies of BattingLine.STAT_FIELDS / PitchingLine.STAT_FIELDS at the time of this migration
+BATTING_FIELDS = {
+    "AB": "ab", "R": "r", "H": "h", "RBI": "rbi", "2B": "doubles", "3B": "triples",
+    "HR": "hr", "GIDP": "gidp", "BB": "bb", "IBB": "ibb", "HBP": "hbp", "SO": "so",
+    "SAC": "sac", "SF": "sf", "SB": "sb", "CS": "cs", "E": "e", "AVG": "avg",
+}
+PITCHING_FIELDS = {
+    "BF": "bf", "NP": "np", "S": "strikes", "H": "h", "HR": "hr", "BB": "bb",
+    "IBB": "ibb", "HBP": "hbp", "SO": "so", "WP": "wp", "BK": "bk", "R": "r",
+    "ER": "er", "E": "e", "ERA": "era", "WHIP": "whip",
+}
+BATCH_SIZE = 2000
+
+
+def backfill_stat_lines(apps, schema_editor):
+    GameStats = apps.get_model('fantasy', 'GameStats')
+    BattingLine = apps.get_model('fantasy', 'BattingLine')
+    PitchingLine = apps.get_model('fantasy', 'PitchingLine')
+
+    batting, pitching = [], []
+    rows = GameStats.objects.values_list('id', 'player_id', 'game_id', 'role', 'stats')
+    for game_stats_id, player_id, game_id, role, stats in rows.iterator(chunk_size=BATCH_SIZE):
+        ids = {'game_stats_id': game_stats_id, 'player_id': player_id, 'game_id': game_id}
+        if role == 'batter':
+            batting.append(BattingLine(**ids, **{field: stats.get(stat, 0) for stat, field in BATTING_FIELDS.items()}))
+        else:
+            pitching.append(PitchingLine(
+                **ids,
+                outs=round(stats.get("IP", 0) * 3),
+                **{field: stats.get(stat, 0) for stat, field in PITCHING_FIELDS.items()},
+            ))
+
+        if len(batting) >= BATCH_SIZE:
+            BattingLine.objects.bulk_create(batting)
+            batting = []
+        if len(pitching) >= BATCH_SIZE:
+            PitchingLine.objects.bulk_create(pitching)
+            pitching = []
+
+    BattingLine.objects.bulk_create(batting)
+    PitchingLine.objects.bulk_create(pitching)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0018_batting_pitching_lines'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_stat_lines, migrations.RunPython.noop),
+    ]
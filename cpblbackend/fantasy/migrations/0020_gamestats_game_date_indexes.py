@@ -0,0 +1,46 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:07
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_game_date(apps, schema_editor):
+    Game = apps.get_model('fantasy', 'Game')
+    GameStats = apps.get_model('fantasy', 'GameStats')
+    GameStats.objects.update(
+        game_date=Subquery(Game.objects.filter(id=OuterRef('game_id')).values('date')[:1])
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0019_backfill_batting_pitching_lines'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamestats',
+            name='game_date',
+            field=models.DateField(null=True),
+        ),
+        migrations.RunPython(backfill_game_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='gamestats',
+            name='game_date',
+            field=models.DateField(),
+        ),
+        migrations.AlterField(
+            model_name='game',
+            name='date',
+            field=models.DateField(db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='gamestats',
+            index=models.Index(fields=['player', 'game_date'], name='gamestats_player_date'),
+        ),
+        migrations.AddIndex(
+            model_name='gamestats',
+            index=models.Index(fields=['player', 'game'], name='gamestats_player_game'),
+        ),
+    ]
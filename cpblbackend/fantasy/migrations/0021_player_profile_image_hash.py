@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0020_gamestats_game_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='player',
+            name='profile_image_hash',
+            field=models.CharField(blank=True, max_length=64, null=True),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:17
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0021_player_profile_image_hash'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TeamStatSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('category', models.CharField(max_length=10)),
+                ('value', models.FloatField(default=0)),
+                ('fantasy_team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stat_snapshots', to='fantasy.fantasyteam')),
+                ('league', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stat_snapshots', to='fantasy.fantasyleague')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['league', 'date'], name='snapshot_league_date'), models.Index(fields=['league', 'category', 'date'], name='snapshot_league_category_date')],
+                'constraints': [models.UniqueConstraint(fields=('fantasy_team', 'category', 'date'), name='unique_team_category_date')],
+            },
+        ),
+    ]
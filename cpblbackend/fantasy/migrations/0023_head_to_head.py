@@ -0,0 +1,63 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0022_team_stat_snapshots'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='fantasyleague',
+            name='scoring_system',
+            field=models.CharField(choices=[('ROT', 'Rotisserie'), ('H2H', 'Head-to-Head')], default='ROT', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='MatchupPeriod',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveSmallIntegerField()),
+                ('start_date', models.DateField()),
+                ('end_date', models.DateField()),
+                ('league', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matchup_periods', to='fantasy.fantasyleague')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Matchup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('away_team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='away_matchups', to='fantasy.fantasyteam')),
+                ('home_team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='home_matchups', to='fantasy.fantasyteam')),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='matchups', to='fantasy.matchupperiod')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='TeamPeriodStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stats', models.JSONField(default=dict)),
+                ('fantasy_team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='period_stats', to='fantasy.fantasyteam')),
+                ('period', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='team_stats', to='fantasy.matchupperiod')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='matchupperiod',
+            index=models.Index(fields=['league', 'start_date'], name='matchup_period_league_start'),
+        ),
+        migrations.AddConstraint(
+            model_name='matchupperiod',
+            constraint=models.UniqueConstraint(fields=('league', 'number'), name='unique_league_period_number'),
+        ),
+        migrations.AddIndex(
+            model_name='teamperiodstats',
+            index=models.Index(fields=['fantasy_team', 'period'], name='team_period_stats_team'),
+        ),
+        migrations.AddConstraint(
+            model_name='teamperiodstats',
+            constraint=models.UniqueConstraint(fields=('period', 'fantasy_team'), name='unique_team_period_stats'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+RATE_STAT_KEYS = {"AVG", "ERA", "WHIP"}
+BATCH_SIZE = 2000
+
+
+def backfill_daily_totals(apps, schema_editor):
+    GameStats = apps.get_model('fantasy', 'GameStats')
+    PlayerDailyTotals = apps.get_model('fantasy', 'PlayerDailyTotals')
+
+    rows = []
+    key, total = None, {}
+    lines = GameStats.objects.order_by('player_id', 'role', 'game_date').values_list(
+        'player_id', 'role', 'game_date', 'stats'
+    )
+    for player_id, role, game_date, stats in lines.iterator(chunk_size=BATCH_SIZE):
+        if (player_id, role) != key:
+            key, total = (player_id, role), {}
+        for stat, value in stats.items():
+            if stat not in RATE_STAT_KEYS:
+                total[stat] = total.get(stat, 0) + value
+
+        # Doubleheaders: the later line of the same date replaces the row
+        if rows and (rows[-1].player_id, rows[-1].role, rows[-1].date) == (player_id, role, game_date):
+            rows[-1].stats = dict(total)
+        else:
+            rows.append(PlayerDailyTotals(player_id=player_id, role=role, date=game_date, stats=dict(total)))
+
+        if len(rows) > BATCH_SIZE:
+            PlayerDailyTotals.objects.bulk_create(rows[:-1])
+            rows = rows[-1:]
+    PlayerDailyTotals.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0023_head_to_head'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerDailyTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('batter', 'Batter'), ('pitcher', 'Pitcher')], max_length=10)),
+                ('date', models.DateField()),
+                ('stats', models.JSONField(default=dict)),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_totals', to='fantasy.player')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('player', 'role', 'date'), name='unique_player_role_date')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import ExtractYear
+
+# Frozen copies of the SUM_FIELDS at the time of this migration
+BATTING_SUM_FIELDS = [
+    "ab", "r", "h", "rbi", "doubles", "triples", "hr", "gidp", "bb", "ibb",
+    "hbp", "so", "sac", "sf", "sb", "cs", "e",
+]
+PITCHING_SUM_FIELDS = [
+    "outs", "bf", "np", "strikes", "h", "hr", "bb", "ibb", "hbp", "so", "wp", "bk", "r", "er", "e",
+]
+
+
+def season_rows(Line, sum_fields):
+    return (
+        Line.objects.values('player_id', season=ExtractYear('game__date'))
+        .annotate(games=Count('game', distinct=True), **{field: Sum(field) for field in sum_fields})
+        .order_by()
+    )
+
+
+def backfill_season_totals(apps, schema_editor):
+    BattingLine = apps.get_model('fantasy', 'BattingLine')
+    PitchingLine = apps.get_model('fantasy', 'PitchingLine')
+    BattingSeasonTotals = apps.get_model('fantasy', 'BattingSeasonTotals')
+    PitchingSeasonTotals = apps.get_model('fantasy', 'PitchingSeasonTotals')
+
+    batting = []
+    for row in season_rows(BattingLine, BATTING_SUM_FIELDS):
+        batting.append(BattingSeasonTotals(**row, avg=row['h'] / row['ab'] if row['ab'] else 0))
+    BattingSeasonTotals.objects.bulk_create(batting, batch_size=1000)
+
+    pitching = []
+    for row in season_rows(PitchingLine, PITCHING_SUM_FIELDS):
+        outs = row['outs']
+        pitching.append(PitchingSeasonTotals(
+            **row,
+            era=row['er'] * 27 / outs if outs else 0,
+            whip=(row['h'] + row['bb']) * 3 / outs if outs else 0,
+        ))
+    PitchingSeasonTotals.objects.bulk_create(pitching, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0024_player_daily_totals'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BattingSeasonTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.PositiveSmallIntegerField()),
+                ('games', models.PositiveSmallIntegerField(default=0)),
+                ('ab', models.PositiveIntegerField(default=0)),
+                ('r', models.PositiveIntegerField(default=0)),
+                ('h', models.PositiveIntegerField(default=0)),
+                ('rbi', models.PositiveIntegerField(default=0)),
+                ('doubles', models.PositiveIntegerField(default=0)),
+                ('triples', models.PositiveIntegerField(default=0)),
+                ('hr', models.PositiveIntegerField(default=0)),
+                ('gidp', models.PositiveIntegerField(default=0)),
+                ('bb', models.PositiveIntegerField(default=0)),
+                ('ibb', models.PositiveIntegerField(default=0)),
+                ('hbp', models.PositiveIntegerField(default=0)),
+                ('so', models.PositiveIntegerField(default=0)),
+                ('sac', models.PositiveIntegerField(default=0)),
+                ('sf', models.PositiveIntegerField(default=0)),
+                ('sb', models.PositiveIntegerField(default=0)),
+                ('cs', models.PositiveIntegerField(default=0)),
+                ('e', models.PositiveIntegerField(default=0)),
+                ('avg', models.FloatField(default=0)),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='batting_seasons', to='fantasy.player')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['season', '-hr', 'player'], name='batting_season_hr'), models.Index(fields=['season', '-r', 'player'], name='batting_season_r'), models.Index(fields=['season', '-rbi', 'player'], name='batting_season_rbi'), models.Index(fields=['season', '-sb', 'player'], name='batting_season_sb'), models.Index(fields=['season', '-h', 'player'], name='batting_season_h'), models.Index(fields=['season', '-bb', 'player'], name='batting_season_bb'), models.Index(fields=['season', '-so', 'player'], name='batting_season_so'), models.Index(fields=['season', '-avg', 'player'], name='batting_season_avg')],
+                'constraints': [models.UniqueConstraint(fields=('player', 'season'), name='unique_batting_season')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PitchingSeasonTotals',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('season', models.PositiveSmallIntegerField()),
+                ('games', models.PositiveSmallIntegerField(default=0)),
+                ('outs', models.PositiveIntegerField(default=0)),
+                ('bf', models.PositiveIntegerField(default=0)),
+                ('np', models.PositiveIntegerField(default=0)),
+                ('strikes', models.PositiveIntegerField(default=0)),
+                ('h', models.PositiveIntegerField(default=0)),
+                ('hr', models.PositiveIntegerField(default=0)),
+                ('bb', models.PositiveIntegerField(default=0)),
+                ('ibb', models.PositiveIntegerField(default=0)),
+                ('hbp', models.PositiveIntegerField(default=0)),
+                ('so', models.PositiveIntegerField(default=0)),
+                ('wp', models.PositiveIntegerField(default=0)),
+                ('bk', models.PositiveIntegerField(default=0)),
+                ('r', models.PositiveIntegerField(default=0)),
+                ('er', models.PositiveIntegerField(default=0)),
+                ('e', models.PositiveIntegerField(default=0)),
+                ('era', models.FloatField(default=0)),
+                ('whip', models.FloatField(default=0)),
+                ('player', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pitching_seasons', to='fantasy.player')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['season', '-so', 'player'], name='pitching_season_so'), models.Index(fields=['season', '-outs', 'player'], name='pitching_season_outs'), models.Index(fields=['season', '-bb', 'player'], name='pitching_season_bb'), models.Index(fields=['season', '-hr', 'player'], name='pitching_season_hr'), models.Index(fields=['season', 'era', 'player'], name='pitching_season_era'), models.Index(fields=['season', 'whip', 'player'], name='pitching_season_whip')],
+                'constraints': [models.UniqueConstraint(fields=('player', 'season'), name='unique_pitching_season')],
+            },
+        ),
+        migrations.RunPython(backfill_season_totals, migrations.RunPython.noop),
+    ]
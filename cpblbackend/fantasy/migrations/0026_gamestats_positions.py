@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:33
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+from fantasy.positions import fill_positions
+
+
+def backfill_positions(apps, schema_editor):
+    GameStats = apps.get_model('fantasy', 'GameStats')
+    fill_positions(GameStats.objects.all())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0025_season_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gamestats',
+            name='positions',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(max_length=10), blank=True, default=list, size=None),
+        ),
+        migrations.AddField(
+            model_name='gamestats',
+            name='started',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='gamestats',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['positions'], name='gamestats_positions'),
+        ),
+        migrations.RunPython(backfill_positions, migrations.RunPython.noop),
+    ]
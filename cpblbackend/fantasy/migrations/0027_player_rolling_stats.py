@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:35
+
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0026_gamestats_positions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlayerRollingStat',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('role', models.CharField(choices=[('batter', 'Batter'), ('pitcher', 'Pitcher')], max_length=10)),
+                ('days', models.PositiveSmallIntegerField()),
+                ('category', models.CharField(max_length=10)),
+                ('value', models.FloatField(default=0)),
+                ('date', models.DateField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='player',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['eligible_positions'], name='player_eligible_positions'),
+        ),
+        migrations.AddField(
+            model_name='playerrollingstat',
+            name='player',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rolling_stats', to='fantasy.player'),
+        ),
+        migrations.AddIndex(
+            model_name='playerrollingstat',
+            index=models.Index(fields=['role', 'days', 'category', '-value', 'player'], name='rolling_stat_desc'),
+        ),
+        migrations.AddIndex(
+            model_name='playerrollingstat',
+            index=models.Index(fields=['role', 'days', 'category', 'value', 'player'], name='rolling_stat_asc'),
+        ),
+        migrations.AddConstraint(
+            model_name='playerrollingstat',
+            constraint=models.UniqueConstraint(fields=('player', 'role', 'days', 'category'), name='unique_player_rolling_stat'),
+        ),
+    ]
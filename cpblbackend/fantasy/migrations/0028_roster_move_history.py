@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:37
+
+import django.contrib.postgres.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0027_player_rolling_stats'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='fantasyroster',
+            name='unique_player_per_team',
+        ),
+        migrations.AlterField(
+            model_name='fantasyroster',
+            name='position',
+            field=models.CharField(choices=[('1B', 'First Base'), ('2B', 'Second Base'), ('3B', 'Third Base'), ('SS', 'Shortstop'), ('C', 'Catcher'), ('CI', 'Corner Infield'), ('MI', 'Middle Infield'), ('IF', 'Infield'), ('LF', 'Left Field'), ('CF', 'Center Field'), ('RF', 'Right Field'), ('OF', 'Outfield'), ('UTIL', 'Utility'), ('SP', 'Starting Pitcher'), ('RP', 'Relief Pitcher'), ('P', 'Pitcher'), ('BN', 'Bench'), ('IL', 'Injured List')], max_length=4),
+        ),
+        migrations.AlterField(
+            model_name='player',
+            name='eligible_positions',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.CharField(choices=[('1B', 'First Base'), ('2B', 'Second Base'), ('3B', 'Third Base'), ('SS', 'Shortstop'), ('C', 'Catcher'), ('CI', 'Corner Infield'), ('MI', 'Middle Infield'), ('IF', 'Infield'), ('LF', 'Left Field'), ('CF', 'Center Field'), ('RF', 'Right Field'), ('OF', 'Outfield'), ('UTIL', 'Utility'), ('SP', 'Starting Pitcher'), ('RP', 'Relief Pitcher'), ('P', 'Pitcher'), ('BN', 'Bench'), ('IL', 'Injured List')], max_length=10), blank=True, null=True, size=None),
+        ),
+        migrations.AddConstraint(
+            model_name='fantasyroster',
+            constraint=models.UniqueConstraint(condition=models.Q(('end_date__isnull', True), ('fantasy_team__isnull', False)), fields=('fantasy_team', 'player'), name='unique_player_per_team'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:48
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0028_roster_move_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='game',
+            name='source_sha256',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+    ]
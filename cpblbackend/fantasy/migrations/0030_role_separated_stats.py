@@ -0,0 +1,142 @@
+# Generated by Django 5.2.18 on 2026-10-17 22:55
+
+from django.db import migrations, models
+
+RATE_STAT_KEYS = {"AVG", "ERA", "WHIP"}
+RESERVE_POSITIONS = {"BN", "IL"}
+BATCH_SIZE = 2000
+
+
+def derive_rates(stats):
+    batting, pitching = stats.get("batter"), stats.get("pitcher")
+    if batting is not None:
+        batting["AVG"] = batting.get("H", 0) / batting["AB"] if batting.get("AB", 0) > 0 else 0
+    if pitching is not None:
+        innings = pitching.get("IP", 0)
+        pitching["ERA"] = pitching.get("ER", 0) * 9 / innings if innings > 0 else 0
+        pitching["WHIP"] = (pitching.get("H", 0) + pitching.get("BB", 0)) / innings if innings > 0 else 0
+    return stats
+
+
+def add_line(totals, role, stats):
+    role_totals = totals.setdefault(role, {})
+    for stat, value in stats.items():
+        if stat not in RATE_STAT_KEYS:
+            role_totals[stat] = role_totals.get(stat, 0) + value
+
+
+def split_stats_by_role(apps, schema_editor):
+    """
+    Recomputes the stored roster, team and matchup period totals with batting and pitching
+    lines kept apart, from the GameStats of each stint. Daily snapshots are dropped and
+    refilled from the league's start by the next snapshot_league_stats run.
+    """
+    GameStats = apps.get_model('fantasy', 'GameStats')
+    FantasyRoster = apps.get_model('fantasy', 'FantasyRoster')
+    FantasyTeam = apps.get_model('fantasy', 'FantasyTeam')
+    TeamPeriodStats = apps.get_model('fantasy', 'TeamPeriodStats')
+    TeamStatSnapshot = apps.get_model('fantasy', 'TeamStatSnapshot')
+
+    TeamStatSnapshot.objects.all().delete()
+
+    rosters = list(FantasyRoster.objects.order_by('id'))
+    stints_by_player = {}
+    for roster in rosters:
+        roster.stats = {}
+        stints_by_player.setdefault(roster.player_id, []).append(roster)
+
+    periods_by_team = {}
+    period_stats = list(TeamPeriodStats.objects.select_related('period').order_by('id'))
+    for row in period_stats:
+        row.stats = {}
+        periods_by_team.setdefault(row.fantasy_team_id, []).append(row)
+
+    lines = GameStats.objects.filter(player_id__in=stints_by_player).values_list(
+        'player_id', 'role', 'game_date', 'stats'
+    )
+    for player_id, role, game_date, stats in lines.iterator(chunk_size=BATCH_SIZE):
+        for roster in stints_by_player[player_id]:
+            if game_date < roster.start_date or (roster.end_date is not None and game_date >= roster.end_date):
+                continue
+            add_line(roster.stats, role, stats)
+            if roster.position in RESERVE_POSITIONS:
+                continue
+            for row in periods_by_team.get(roster.fantasy_team_id, []):
+                if row.period.start_date <= game_date < row.period.end_date:
+                    add_line(row.stats, role, stats)
+
+    team_totals = {}
+    for roster in rosters:
+        derive_rates(roster.stats)
+        if roster.fantasy_team_id and roster.position not in RESERVE_POSITIONS:
+            totals = team_totals.setdefault(roster.fantasy_team_id, {})
+            for role, stats in roster.stats.items():
+                add_line(totals, role, stats)
+    teams = list(FantasyTeam.objects.order_by('id'))
+    for team in teams:
+        team.total_stats = derive_rates(team_totals.get(team.id, {}))
+    for row in period_stats:
+        derive_rates(row.stats)
+
+    FantasyRoster.objects.bulk_update(rosters, ['stats'], batch_size=BATCH_SIZE)
+    FantasyTeam.objects.bulk_update(teams, ['total_stats'], batch_size=BATCH_SIZE)
+    TeamPeriodStats.objects.bulk_update(period_stats, ['stats'], batch_size=BATCH_SIZE)
+
+
+def flat_stats(stats):
+    """Sums the role totals of a stats dict back into the single pre-split dict, rates rederived."""
+    flat = {}
+    for role_stats in stats.values():
+        if isinstance(role_stats, dict):
+            for stat, value in role_stats.items():
+                if stat not in RATE_STAT_KEYS and value is not None:
+                    flat[stat] = flat.get(stat, 0) + value
+    innings = flat.get("IP", 0)
+    flat["AVG"] = flat.get("H", 0) / flat["AB"] if flat.get("AB", 0) > 0 else 0
+    flat["ERA"] = flat.get("ER", 0) * 9 / innings if innings > 0 else 0
+    flat["WHIP"] = (flat.get("H", 0) + flat.get("BB", 0)) / innings if innings > 0 else 0
+    return flat
+
+
+def merge_stats_roles(apps, schema_editor):
+    """
+    Collapses the stored roster, team and matchup period totals back into one dict each,
+    batting and pitching counts summed together as they were before the split. Snapshots
+    are dropped, two roles' rows for a category would break the old unique constraint.
+    """
+    FantasyRoster = apps.get_model('fantasy', 'FantasyRoster')
+    FantasyTeam = apps.get_model('fantasy', 'FantasyTeam')
+    TeamPeriodStats = apps.get_model('fantasy', 'TeamPeriodStats')
+    TeamStatSnapshot = apps.get_model('fantasy', 'TeamStatSnapshot')
+
+    TeamStatSnapshot.objects.all().delete()
+    for model, field in ((FantasyRoster, 'stats'), (FantasyTeam, 'total_stats'), (TeamPeriodStats, 'stats')):
+        rows = list(model.objects.order_by('id'))
+        for row in rows:
+            setattr(row, field, flat_stats(getattr(row, field) or {}))
+        model.objects.bulk_update(rows, [field], batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0029_game_source_sha256'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='teamstatsnapshot',
+            name='unique_team_category_date',
+        ),
+        migrations.AddField(
+            model_name='teamstatsnapshot',
+            name='role',
+            field=models.CharField(choices=[('batter', 'Batter'), ('pitcher', 'Pitcher')], default='batter', max_length=10),
+            preserve_default=False,
+        ),
+        migrations.AddConstraint(
+            model_name='teamstatsnapshot',
+            constraint=models.UniqueConstraint(fields=('fantasy_team', 'role', 'category', 'date'), name='unique_team_role_category_date'),
+        ),
+        migrations.RunPython(split_stats_by_role, merge_stats_roles),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-17 23:03
+
+from django.db import migrations, models
+
+
+def clear_undefined_rates(apps, schema_editor):
+    PitchingSeasonTotals = apps.get_model('fantasy', 'PitchingSeasonTotals')
+    PitchingSeasonTotals.objects.filter(outs=0).update(era=None, whip=None)
+
+
+def zero_undefined_rates(apps, schema_editor):
+    PitchingSeasonTotals = apps.get_model('fantasy', 'PitchingSeasonTotals')
+    PitchingSeasonTotals.objects.filter(era=None).update(era=0)
+    PitchingSeasonTotals.objects.filter(whip=None).update(whip=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('fantasy', '0030_role_separated_stats'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='pitchingseasontotals',
+            name='era',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='pitchingseasontotals',
+            name='whip',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(clear_undefined_rates, zero_undefined_rates),
+    ]
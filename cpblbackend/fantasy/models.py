@@ -1,9 +1,12 @@
 import datetime
-from django.db import models
-from django.db.models import Sum, Avg
+from django.db import models, transaction
+from django.db.models import Sum, Avg, Count, F, Q, FloatField
+from django.db.models.fields.json import KeyTextTransform
+from django.db.models.functions import Cast, ExtractYear
 from django.contrib.auth.models import User
 from django.utils.translation import gettext_lazy as _  # Optional for i18n support
 from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
 
 # Global Enum for Role Choices
 class RoleChoices(models.TextChoices):
@@ -24,6 +27,37 @@ class Position(models.TextChoices):
     DESIGNATED_HITTER = "DH", _("Designated Hitter")
     UTILITY = "UT", _("Utility")  # Can play multiple positions
 
+# Stat keys stored in GameStats.stats, in the order the scraper reads them
+BATTING_STAT_KEYS = ["AB", "R", "H", "RBI", "2B", "3B", "HR", "GIDP", "BB", "IBB", "HBP", "SO", "SAC", "SF", "SB", "CS", "E", "AVG"]
+PITCHING_STAT_KEYS = ["IP", "BF", "NP", "S", "H", "HR", "BB", "IBB", "HBP", "SO", "WP", "BK", "R", "ER", "E", "ERA", "WHIP"]
+STAT_KEYS = list(dict.fromkeys(BATTING_STAT_KEYS + PITCHING_STAT_KEYS))
+FLOAT_STAT_KEYS = {"AVG", "IP", "ERA", "WHIP"}
+RATE_STAT_KEYS = {"AVG", "ERA", "WHIP"}
+ROLE_STAT_KEYS = {RoleChoices.BATTER: BATTING_STAT_KEYS, RoleChoices.PITCHER: PITCHING_STAT_KEYS}
+
+def calculate_rate_stats(stats, role=None):
+    """
+    Overwrites the averages in a dict of summed stats from their counting components:
+    AVG for a batter's stats, ERA and WHIP for a pitcher's, all three without a role.
+    """
+    if role != RoleChoices.PITCHER:
+        stats["AVG"] = stats.get("H", 0) / stats.get("AB", 1) if stats.get("AB", 0) > 0 else 0
+    if role != RoleChoices.BATTER:
+        stats["ERA"] = (stats.get("ER", 0) * 9) / stats.get("IP", 1) if stats.get("IP", 0) > 0 else 0
+        stats["WHIP"] = (stats.get("H", 0) + stats.get("BB", 0)) / stats.get("IP", 1) if stats.get("IP", 0) > 0 else 0
+    return stats
+
+def calculate_role_rate_stats(stats):
+    """
+    Derives the averages of role-separated stats, {"batter": {...}, "pitcher": {...}}, the
+    format of FantasyRoster.stats, FantasyTeam.total_stats and TeamPeriodStats.stats.
+
+    Batting and pitching lines share keys (R, H, SO, ...), so they are never summed together.
+    """
+    for role, role_stats in stats.items():
+        calculate_rate_stats(role_stats, role)
+    return stats
+
 # Fantasy baseball roster positions
 class FantasyPosition(models.TextChoices):
     FIRST_BASE = "1B", "First Base"
@@ -42,6 +76,7 @@ class FantasyPosition(models.TextChoices):
     STARTING_PITCHER = "SP", "Starting Pitcher"
     RELIEF_PITCHER = "RP", "Relief Pitcher"
     PITCHER = "P", "Pitcher"
+    BENCH = "BN", "Bench"
     INJURED_LIST = "IL", "Injured List"
 
 class Team(models.Model):
@@ -73,6 +108,14 @@ class Player(models.Model):
     nationality = models.CharField(max_length=100, null=True, blank=True)
     acnt = models.CharField(max_length=10, unique=True)
     profile_image = models.ImageField(upload_to='player_images/', null=True, blank=True)
+    # SHA-256 of the stored profile image, so the scraper only rewrites it when the bytes change
+    profile_image_hash = models.CharField(max_length=64, null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Position filters (eligible_positions @> ARRAY['SS']) on free agent searches and leaderboards
+            GinIndex(fields=['eligible_positions'], name='player_eligible_positions'),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.team.name})"
@@ -84,136 +127,27 @@ class Player(models.Model):
         1. For hitters: 20+ games at position OR 25%+ of games (min 5)
         2. For starting pitchers: 5+ starts
         3. For relief pitchers: 8+ relief appearances
+
+        Use fantasy.eligibility.update_eligibility to update many players at once.
         
         Args:
             season_year: Year to check for eligibility (defaults to previous year)
         """
-        from datetime import date
-        
-        # Determine season year (default to previous year)
-        if not season_year:
-            current_year = date.today().year
-            season_year = current_year - 1
-        
-        # Find start/end dates for the specified season
-        season_start = date(season_year, 1, 1)
-        season_end = date(season_year, 12, 31)
-        
-        # Get all game stats for this player in the previous season
-        all_games = GameStats.objects.filter(
-            player=self,
-            game__date__gte=season_start,
-            game__date__lte=season_end
-        )
-        
-        # Count total games played
-        total_games = all_games.values('game').distinct().count()
-        if total_games == 0:
-            return  # No games played, no eligibility to update
-        
-        # Initialize counters
-        position_counts = {}
-        starts = 0
-        relief_apps = 0
-        
-        # Count positions played, starts, and relief appearances
-        for gs in all_games:
-            # Handle pitching appearances
-            if gs.role == 'pitcher':
-                # Check if it was a start or relief appearance
-                pos_lower = gs.position.lower()
-                if 'start' in pos_lower or 'sp' in pos_lower:
-                    starts += 1
-                else:
-                    relief_apps += 1
-            
-            # Process position strings for all roles
-            # Split and clean position strings like "RF (LF)" -> ["RF", "LF"]
-            raw_position = gs.position
-            positions = []
-            
-            # Handle parentheses format: "RF (LF)"
-            if '(' in raw_position:
-                main_pos = raw_position.split('(')[0].strip()
-                if main_pos:
-                    positions.append(main_pos)
-                    
-                # Extract positions in parentheses
-                import re
-                paren_positions = re.findall(r'\(([^)]+)\)', raw_position)
-                for pos_group in paren_positions:
-                    for pos in pos_group.split(','):
-                        clean_pos = pos.strip()
-                        if clean_pos:
-                            positions.append(clean_pos)
-            else:
-                # Simple position string
-                positions.append(raw_position.strip())
-            
-            # Count each position
-            for pos in positions:
-                clean_pos = pos.strip().upper()
-                if clean_pos:
-                    position_counts[clean_pos] = position_counts.get(clean_pos, 0) + 1
-        
-        # Determine eligible positions
-        eligible_positions = []
-        
-        # Check hitter positions
-        for pos, count in position_counts.items():
-            # Only consider standard positions
-            if pos and pos in ['1B', '2B', '3B', 'SS', 'C', 'LF', 'CF', 'RF', 'OF', 'DH']:
-                # Rule 1: 20+ games at position
-                if count >= 20:
-                    if pos not in eligible_positions:
-                        eligible_positions.append(pos)
-                
-                # Rule 2: 25%+ of games (min 5)
-                elif count >= 5 and (count / total_games) >= 0.25:
-                    if pos not in eligible_positions:
-                        eligible_positions.append(pos)
-        
-        # Check pitcher eligibility
-        if starts >= 5:  # Rule 3: 5+ starts for SP
-            eligible_positions.append('SP')
-            eligible_positions.append('P')  # Always add general P if SP eligible
-            
-        if relief_apps >= 8:  # Rule 4: 8+ relief appearances for RP
-            eligible_positions.append('RP')
-            eligible_positions.append('P')  # Always add general P if RP eligible
-        
-        # Add derived positions
-        if '1B' in eligible_positions or '3B' in eligible_positions:
-            eligible_positions.append('CI')  # Corner infield
-            
-        if '2B' in eligible_positions or 'SS' in eligible_positions:
-            eligible_positions.append('MI')  # Middle infield
-            
-        if any(pos in eligible_positions for pos in ['1B', '2B', '3B', 'SS']):
-            eligible_positions.append('IF')  # Infield
-            
-        if any(pos in eligible_positions for pos in ['LF', 'CF', 'RF']):
-            eligible_positions.append('OF')  # Outfield
-        
-        # Everyone is utility eligible
-        eligible_positions.append('UTIL')
+        from .eligibility import update_eligibility
 
-        if(self.position and self.position not in eligible_positions):
-            eligible_positions.append(self.position)
-        
-        # Update the player record
+        eligible_positions = update_eligibility(season_year, [self.pk]).get(self.pk)
+        if eligible_positions is None:
+            return  # No games played, no eligibility to update
         self.eligible_positions = eligible_positions
-        self.save()
-        
         return eligible_positions
 
-    
-
 class Game(models.Model):
-    date = models.DateField()
+    date = models.DateField(db_index=True)
     game_number = models.IntegerField()
     home_team = models.ForeignKey("Team", on_delete=models.CASCADE, related_name="home_games")
     away_team = models.ForeignKey("Team", on_delete=models.CASCADE, related_name="away_games")
+    # Hash of the parsed box score last loaded into this game, see scraper BoxScoreWriter
+    source_sha256 = models.CharField(max_length=64, blank=True)
 
     class Meta:
         unique_together = ('game_number', 'date')
@@ -221,19 +155,338 @@ class Game(models.Model):
     def __str__(self):
         return f"{self.date}: {self.home_team.name} vs {self.away_team.name} (Game {self.game_number})"
 
+    def save(self, *args, **kwargs):
+        from .invalidation import game_lines_changed
+
+        super().save(*args, **kwargs)
+        # Keep the denormalized date on the stat lines in sync if a game gets rescheduled
+        moved = self.gamestats_set.exclude(game_date=self.date)
+        player_dates = list(moved.values_list('player_id', 'game_date'))
+        if player_dates:
+            moved.update(game_date=self.date)
+            player_ids = {player_id for player_id, _ in player_dates}
+            PlayerDailyTotals.rebuild(player_ids)
+            # The lines may now fall into different roster stints
+            game_lines_changed(player_dates + [(player_id, self.date) for player_id in player_ids])
+
 class GameStats(models.Model):
     game = models.ForeignKey(Game, on_delete=models.CASCADE)
     player = models.ForeignKey(Player, on_delete=models.CASCADE)
     role = models.CharField(max_length=10, choices=RoleChoices.choices)  # Use global Enum here
     position = models.CharField(blank=True) #the input won't be standardized. 
+    # position parsed once into canonical codes, e.g. "RF (LF)" -> ["RF", "LF"]; see fantasy/positions.py
+    positions = ArrayField(models.CharField(max_length=10), default=list, blank=True)
+    started = models.BooleanField(null=True, blank=True)  # Pitchers only: a start rather than a relief appearance
     stats = models.JSONField()
+    game_date = models.DateField()  # Copy of game.date so date-range lookups don't need the join
 
     class Meta:
         unique_together = ('game', 'player', 'role')
+        indexes = [
+            models.Index(fields=['player', 'game_date'], name='gamestats_player_date'),
+            models.Index(fields=['player', 'game'], name='gamestats_player_game'),
+            GinIndex(fields=['positions'], name='gamestats_positions'),
+        ]
+
+    def save(self, *args, **kwargs):
+        if self.game_date is None:
+            self.game_date = self.game.date
+        self.parse_position()
+        super().save(*args, **kwargs)
+
+    def parse_position(self):
+        """Fills positions and started from the scraped position string."""
+        from .positions import normalize_position
+
+        self.positions, self.started = normalize_position(self.role, self.position)
 
     def __str__(self):
         return f"{self.player.name} - {self.get_role_display()} - Game {self.game.id}"
 
+    @property
+    def stat_line_model(self):
+        return BattingLine if self.role == RoleChoices.BATTER else PitchingLine
+
+    def sync_stat_line(self):
+        """
+        Writes the typed batting or pitching copy of this line's stats and deletes the
+        other role's copy, left over if the line changed role. Returns whether there was one.
+        """
+        self.stat_line_model.from_game_stats(self).save()
+        other_model = PitchingLine if self.stat_line_model is BattingLine else BattingLine
+        deleted, _ = other_model.objects.filter(game_stats=self).delete()
+        return bool(deleted)
+
+class StatLine(models.Model):
+    """
+    Typed copy of one GameStats.stats dict with a column per scraped stat, so totals
+    and leaderboards can SUM narrow columns instead of parsing JSON.
+
+    STAT_FIELDS maps the scraped stat key to the model field storing it.
+    """
+    STAT_FIELDS = {}
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def from_game_stats(cls, game_stats):
+        """Builds an (unsaved) typed line from a GameStats row."""
+        line = cls(game_stats=game_stats, player_id=game_stats.player_id, game_id=game_stats.game_id)
+        for stat, field in cls.STAT_FIELDS.items():
+            setattr(line, field, game_stats.stats.get(stat, 0))
+        return line
+
+    @classmethod
+    def sync(cls, game_stats_rows):
+        """Upserts the typed lines for many GameStats rows of this role in one query."""
+        lines = [cls.from_game_stats(game_stats) for game_stats in game_stats_rows]
+        return cls.objects.bulk_create(
+            lines,
+            update_conflicts=True,
+            unique_fields=['game_stats'],
+            update_fields=[
+                field.name for field in cls._meta.concrete_fields
+                if field.name not in ['game_stats', 'player', 'game']
+            ],
+        )
+
+    def as_stats(self):
+        """Returns the line in the GameStats.stats format."""
+        return {stat: getattr(self, field) for stat, field in self.STAT_FIELDS.items()}
+
+class BattingLine(StatLine):
+    game_stats = models.OneToOneField(GameStats, on_delete=models.CASCADE, primary_key=True, related_name='batting_line')
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='batting_lines')
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='batting_lines')
+    ab = models.PositiveSmallIntegerField(default=0)
+    r = models.PositiveSmallIntegerField(default=0)
+    h = models.PositiveSmallIntegerField(default=0)
+    rbi = models.PositiveSmallIntegerField(default=0)
+    doubles = models.PositiveSmallIntegerField(default=0)
+    triples = models.PositiveSmallIntegerField(default=0)
+    hr = models.PositiveSmallIntegerField(default=0)
+    gidp = models.PositiveSmallIntegerField(default=0)
+    bb = models.PositiveSmallIntegerField(default=0)
+    ibb = models.PositiveSmallIntegerField(default=0)
+    hbp = models.PositiveSmallIntegerField(default=0)
+    so = models.PositiveSmallIntegerField(default=0)
+    sac = models.PositiveSmallIntegerField(default=0)
+    sf = models.PositiveSmallIntegerField(default=0)
+    sb = models.PositiveSmallIntegerField(default=0)
+    cs = models.PositiveSmallIntegerField(default=0)
+    e = models.PositiveSmallIntegerField(default=0)
+    avg = models.FloatField(default=0)  # Season average as shown in the box score
+
+    STAT_FIELDS = {
+        "AB": "ab", "R": "r", "H": "h", "RBI": "rbi", "2B": "doubles", "3B": "triples",
+        "HR": "hr", "GIDP": "gidp", "BB": "bb", "IBB": "ibb", "HBP": "hbp", "SO": "so",
+        "SAC": "sac", "SF": "sf", "SB": "sb", "CS": "cs", "E": "e", "AVG": "avg",
+    }
+
+    class Meta:
+        indexes = [
+            # Covers the common roster and leaderboard sums without touching the heap
+            models.Index(fields=['player'], include=['ab', 'h', 'r', 'rbi', 'hr', 'sb', 'bb', 'so'], name='batting_line_player_totals'),
+        ]
+
+class PitchingLine(StatLine):
+    game_stats = models.OneToOneField(GameStats, on_delete=models.CASCADE, primary_key=True, related_name='pitching_line')
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='pitching_lines')
+    game = models.ForeignKey(Game, on_delete=models.CASCADE, related_name='pitching_lines')
+    outs = models.PositiveSmallIntegerField(default=0)  # IP * 3, so innings sum exactly
+    bf = models.PositiveSmallIntegerField(default=0)
+    np = models.PositiveSmallIntegerField(default=0)
+    strikes = models.PositiveSmallIntegerField(default=0)
+    h = models.PositiveSmallIntegerField(default=0)
+    hr = models.PositiveSmallIntegerField(default=0)
+    bb = models.PositiveSmallIntegerField(default=0)
+    ibb = models.PositiveSmallIntegerField(default=0)
+    hbp = models.PositiveSmallIntegerField(default=0)
+    so = models.PositiveSmallIntegerField(default=0)
+    wp = models.PositiveSmallIntegerField(default=0)
+    bk = models.PositiveSmallIntegerField(default=0)
+    r = models.PositiveSmallIntegerField(default=0)
+    er = models.PositiveSmallIntegerField(default=0)
+    e = models.PositiveSmallIntegerField(default=0)
+    era = models.FloatField(default=0)  # Season ERA as shown in the box score
+    whip = models.FloatField(default=0)  # Season WHIP as shown in the box score
+
+    STAT_FIELDS = {
+        "BF": "bf", "NP": "np", "S": "strikes", "H": "h", "HR": "hr", "BB": "bb",
+        "IBB": "ibb", "HBP": "hbp", "SO": "so", "WP": "wp", "BK": "bk", "R": "r",
+        "ER": "er", "E": "e", "ERA": "era", "WHIP": "whip",
+    }
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['player'], include=['outs', 'er', 'h', 'bb', 'so'], name='pitching_line_player_totals'),
+        ]
+
+    @property
+    def ip(self):
+        return self.outs / 3
+
+    @classmethod
+    def from_game_stats(cls, game_stats):
+        line = super().from_game_stats(game_stats)
+        line.outs = round(game_stats.stats.get("IP", 0) * 3)
+        return line
+
+    def as_stats(self):
+        return {"IP": self.ip, **super().as_stats()}
+
+class SeasonTotals(models.Model):
+    """
+    Materialized season totals of one player, summed from the typed game lines, for
+    leaderboards. Refreshed for the players of every ingested batch.
+
+    SUM_FIELDS are summed from line_model; the rate stats are derived from the sums.
+    CATEGORY_FIELDS maps the scraped stat key to the column storing it.
+    """
+    season = models.PositiveSmallIntegerField()
+    games = models.PositiveSmallIntegerField(default=0)
+
+    line_model = None
+    SUM_FIELDS = []
+    RATE_FIELDS = []
+    CATEGORY_FIELDS = {}
+
+    class Meta:
+        abstract = True
+
+    def derive_rates(self):
+        """Sets the RATE_FIELDS from the summed columns."""
+
+    @classmethod
+    def refresh(cls, player_seasons):
+        """Recomputes the totals of the given (player_id, season) pairs from their game lines."""
+        players_by_season = {}
+        for player_id, season in player_seasons:
+            players_by_season.setdefault(season, set()).add(player_id)
+        if not players_by_season:
+            return []
+
+        condition = Q()
+        for season, player_ids in players_by_season.items():
+            condition |= Q(game__date__year=season, player_id__in=player_ids)
+        rows = (
+            cls.line_model.objects.filter(condition)
+            .values('player_id', season=ExtractYear('game__date'))
+            .annotate(games=Count('game', distinct=True), **{field: Sum(field) for field in cls.SUM_FIELDS})
+            .order_by()
+        )
+
+        totals = []
+        for row in rows:
+            season_totals = cls(**row)
+            season_totals.derive_rates()
+            totals.append(season_totals)
+
+        with transaction.atomic():
+            # Pairs without lines left (e.g. a deleted game) drop out of the leaderboard
+            fresh = {(season_totals.player_id, season_totals.season) for season_totals in totals}
+            current = Q()
+            for season, player_ids in players_by_season.items():
+                current |= Q(season=season, player_id__in=player_ids)
+            cls.objects.filter(id__in=[
+                row_id for row_id, player_id, season in cls.objects.filter(current).values_list('id', 'player_id', 'season')
+                if (player_id, season) not in fresh
+            ]).delete()
+            cls.objects.bulk_create(
+                totals,
+                update_conflicts=True,
+                unique_fields=['player', 'season'],
+                update_fields=['games', *cls.SUM_FIELDS, *cls.RATE_FIELDS],
+                batch_size=1000,
+            )
+        return totals
+
+class BattingSeasonTotals(SeasonTotals):
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='batting_seasons')
+    ab = models.PositiveIntegerField(default=0)
+    r = models.PositiveIntegerField(default=0)
+    h = models.PositiveIntegerField(default=0)
+    rbi = models.PositiveIntegerField(default=0)
+    doubles = models.PositiveIntegerField(default=0)
+    triples = models.PositiveIntegerField(default=0)
+    hr = models.PositiveIntegerField(default=0)
+    gidp = models.PositiveIntegerField(default=0)
+    bb = models.PositiveIntegerField(default=0)
+    ibb = models.PositiveIntegerField(default=0)
+    hbp = models.PositiveIntegerField(default=0)
+    so = models.PositiveIntegerField(default=0)
+    sac = models.PositiveIntegerField(default=0)
+    sf = models.PositiveIntegerField(default=0)
+    sb = models.PositiveIntegerField(default=0)
+    cs = models.PositiveIntegerField(default=0)
+    e = models.PositiveIntegerField(default=0)
+    avg = models.FloatField(default=0)
+
+    line_model = BattingLine
+    SUM_FIELDS = [field for field in BattingLine.STAT_FIELDS.values() if field != 'avg']
+    RATE_FIELDS = ['avg']
+    CATEGORY_FIELDS = BattingLine.STAT_FIELDS
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['player', 'season'], name='unique_batting_season')
+        ]
+        # One index per common leaderboard category, read in order for the top N
+        indexes = [
+            models.Index(fields=['season', f'-{field}', 'player'], name=f'batting_season_{field}')
+            for field in ['hr', 'r', 'rbi', 'sb', 'h', 'bb', 'so', 'avg']
+        ]
+
+    def derive_rates(self):
+        self.avg = self.h / self.ab if self.ab else 0
+
+class PitchingSeasonTotals(SeasonTotals):
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name='pitching_seasons')
+    outs = models.PositiveIntegerField(default=0)
+    bf = models.PositiveIntegerField(default=0)
+    np = models.PositiveIntegerField(default=0)
+    strikes = models.PositiveIntegerField(default=0)
+    h = models.PositiveIntegerField(default=0)
+    hr = models.PositiveIntegerField(default=0)
+    bb = models.PositiveIntegerField(default=0)
+    ibb = models.PositiveIntegerField(default=0)
+    hbp = models.PositiveIntegerField(default=0)
+    so = models.PositiveIntegerField(default=0)
+    wp = models.PositiveIntegerField(default=0)
+    bk = models.PositiveIntegerField(default=0)
+    r = models.PositiveIntegerField(default=0)
+    er = models.PositiveIntegerField(default=0)
+    e = models.PositiveIntegerField(default=0)
+    era = models.FloatField(null=True, blank=True)  # None until the pitcher records an out
+    whip = models.FloatField(null=True, blank=True)
+
+    line_model = PitchingLine
+    SUM_FIELDS = ['outs'] + [field for field in PitchingLine.STAT_FIELDS.values() if field not in ['era', 'whip']]
+    RATE_FIELDS = ['era', 'whip']
+    CATEGORY_FIELDS = {"IP": "outs", **PitchingLine.STAT_FIELDS}
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['player', 'season'], name='unique_pitching_season')
+        ]
+        indexes = [
+            models.Index(fields=['season', f'-{field}', 'player'], name=f'pitching_season_{field}')
+            for field in ['so', 'outs', 'bb', 'hr']
+        ] + [
+            # Lower is better, so these leaderboards read the index forwards
+            models.Index(fields=['season', field, 'player'], name=f'pitching_season_{field}')
+            for field in ['era', 'whip']
+        ]
+
+    @property
+    def ip(self):
+        return self.outs / 3
+
+    def derive_rates(self):
+        self.era = self.er * 27 / self.outs if self.outs else None
+        self.whip = (self.h + self.bb) * 3 / self.outs if self.outs else None
+
 class FantasyLeague(models.Model):
     name = models.CharField(max_length=255)
     commissioner = models.ForeignKey(User, on_delete=models.CASCADE)
@@ -242,7 +495,7 @@ class FantasyLeague(models.Model):
     public = models.BooleanField(default=True)
     SCORING_CHOICES = [
         ('ROT', 'Rotisserie'), # Start by implementing simple Rotisserie scoring
-        # ('H2H', 'Head-to-Head') 
+        ('H2H', 'Head-to-Head'),
     ]
     scoring_system = models.CharField(max_length=20, choices=SCORING_CHOICES, default='ROT') 
     
@@ -251,45 +504,137 @@ class FantasyLeague(models.Model):
     # - Draft type (snake, auction)
     # - Draft order (manual, random, reverse standings)
     # - Daily/weekly lineup changes (daily, weekly)
+    # - Rotisserie categories (categories), see fantasy/standings.py
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        from .matchups import invalidate_matchups
+        from .standings import invalidate_standings
+
+        super().save(*args, **kwargs)
+        # The scoring categories live in settings
+        invalidate_standings([self.pk])
+        invalidate_matchups(self.matchup_periods.values_list('id', flat=True))
+
+def sum_roster_stats(roster_spots):
+    """Sums the role-separated counting stats of the given roster entries and derives the team's averages."""
+    team_stats = {}
+
+    # First pass: accumulate raw stats
+    for roster_spot in roster_spots:
+        for role, stats in roster_spot.stats.items():
+            role_stats = team_stats.setdefault(role, {})
+            for stat, value in stats.items():
+                # Skip calculated averages in the first pass
+                if stat not in RATE_STAT_KEYS:
+                    role_stats[stat] = role_stats.get(stat, 0) + value
+
+    # Second pass: calculate averages
+    return calculate_role_rate_stats(team_stats)
+
 class FantasyTeam(models.Model):
     name = models.CharField(max_length=255)
     league = models.ForeignKey(FantasyLeague, on_delete=models.CASCADE)
     owner = models.ForeignKey(User, on_delete=models.CASCADE)
     total_stats = models.JSONField(default=dict)
 
-    def update_total_stats(self):
-        """Aggregates stats across all players to ever be in the team."""
-        team_stats = {}
+    def update_total_stats(self, refresh_rosters=True):
+        """
+        Aggregates stats across all players to ever be in the team.
 
-        roster_spots = self.fantasyroster_set.filter(
-        ).exclude(
+        Args:
+            refresh_rosters: Recompute every roster entry first. Pass False when the
+                affected roster entries were already refreshed by the caller.
+        """
+        roster_spots = self.fantasyroster_set.exclude(
             position__in=['BN', 'IL']
         )
-        
-        # First pass: accumulate raw stats
-        for roster_spot in roster_spots:
-            roster_spot.update_stats()  # Ensure each roster entry updates first
-            for stat, value in roster_spot.stats.items():
-                # Skip calculated averages in the first pass
-                if stat not in ['AVG', 'ERA', 'WHIP']:
-                    team_stats[stat] = team_stats.get(stat, 0) + value
-
-        # Second pass: calculate averages
-        team_stats["AVG"] = team_stats.get("H", 0) / team_stats.get("AB", 1) if team_stats.get("AB", 0) > 0 else 0
-        team_stats["ERA"] = (team_stats.get("ER", 0) * 9) / team_stats.get("IP", 1) if team_stats.get("IP", 0) > 0 else 0
-        team_stats["WHIP"] = (team_stats.get("H", 0) + team_stats.get("BB", 0)) / team_stats.get("IP", 1) if team_stats.get("IP", 0) > 0 else 0
+        if refresh_rosters:
+            # Refresh every roster entry in one grouped query before summing
+            roster_spots = roster_spots.update_stats()
 
         # Store updated stats
-        self.total_stats = team_stats
+        self.total_stats = sum_roster_stats(roster_spots)
         self.save()
 
     def __str__(self):
         return f"{self.name} ({self.league.name})"
 
+    def save(self, *args, **kwargs):
+        from .standings import invalidate_standings
+
+        super().save(*args, **kwargs)
+        invalidate_standings([self.league_id])
+
+    def delete(self, *args, **kwargs):
+        from .standings import invalidate_standings
+
+        invalidate_standings([self.league_id])
+        return super().delete(*args, **kwargs)
+
+
+
+class FantasyRosterQuerySet(models.QuerySet):
+    def covering(self, player_dates):
+        """Filters to the roster stints that include any of the given (player_id, date) pairs."""
+        dates_by_player = {}
+        for player_id, game_date in player_dates:
+            dates_by_player.setdefault(player_id, []).append(game_date)
+
+        matching_ids = [
+            roster.id
+            for roster in self.filter(player_id__in=dates_by_player).only('id', 'player_id', 'start_date', 'end_date')
+            if any(
+                roster.start_date <= game_date and (roster.end_date is None or game_date < roster.end_date)
+                for game_date in dates_by_player[roster.player_id]
+            )
+        ]
+        return self.filter(id__in=matching_ids)
+
+    def with_stint_totals(self):
+        """
+        Annotates each roster entry with the sum of every stat key of each role over its
+        stint, computed in a single grouped query instead of one query per roster.
+
+        Each key is exposed as ``total_<role>_<key>`` and is None when no game in the
+        stint recorded it.
+        """
+        # Same window as covering(): an open stint counts every game from start_date on
+        in_stint = Q(player__gamestats__game_date__gte=F('start_date')) & (
+            Q(end_date__isnull=True) | Q(player__gamestats__game_date__lt=F('end_date'))
+        )
+        totals = {
+            f"total_{role}_{stat}": Sum(
+                Cast(KeyTextTransform(stat, "player__gamestats__stats"), FloatField()),
+                filter=in_stint & Q(player__gamestats__role=role),
+            )
+            for role, keys in ROLE_STAT_KEYS.items()
+            for stat in keys if stat not in RATE_STAT_KEYS
+        }
+        return self.annotate(**totals)
+
+    def calculate_stats(self):
+        """Returns the roster entries with freshly aggregated (unsaved) role-separated stats."""
+        rosters = list(self.with_stint_totals())
+        for roster in rosters:
+            aggregated_stats = {}
+            for role, keys in ROLE_STAT_KEYS.items():
+                for stat in keys:
+                    value = getattr(roster, f"total_{role}_{stat}", None)
+                    if value is None:
+                        continue
+                    role_stats = aggregated_stats.setdefault(role, {})
+                    role_stats[stat] = value if stat in FLOAT_STAT_KEYS else int(value)
+            roster.stats = calculate_role_rate_stats(aggregated_stats)
+        return rosters
+
+    def update_stats(self):
+        """Recalculates stats for every roster entry in the queryset and writes them back in one bulk_update."""
+        rosters = self.calculate_stats()
+        self.model.objects.bulk_update(rosters, ['stats'])
+        return rosters
 
 
 class FantasyRoster(models.Model):
@@ -299,40 +644,275 @@ class FantasyRoster(models.Model):
     end_date = models.DateField(null=True, blank=True)  # Non-inclusive
     position = models.CharField(max_length=4, choices=FantasyPosition.choices)
     stats = models.JSONField(default=dict)
+
+    objects = FantasyRosterQuerySet.as_manager()
     
     class Meta:
         constraints = [
+            # One open stint per player and team; closed stints keep the history of moves
             models.UniqueConstraint(
                 fields=['fantasy_team', 'player'],
-                condition=models.Q(fantasy_team__isnull=False),
+                condition=models.Q(fantasy_team__isnull=False, end_date__isnull=True),
                 name='unique_player_per_team'
             )
         ]
 
     def update_stats(self):
         """Calculates and stores total stats for this player's fantasy stint."""
-        games = GameStats.objects.filter(
-            player=self.player,
-            game__date__gte=self.start_date,
-            game__date__lt=(self.end_date if self.end_date else datetime.date.today()),
+        roster, = FantasyRoster.objects.filter(pk=self.pk).update_stats()
+        self.stats = roster.stats
+
+    def __str__(self):
+        return f"{self.fantasy_team.name if self.fantasy_team else 'Free Agent'} - {self.player.name}"
+
+
+class TeamStatSnapshot(models.Model):
+    """
+    Cumulative total of one counting stat of a role for a fantasy team at the end of a date.
+
+    Filled once per day by the snapshot_league_stats command, by adding that day's
+    games to the previous day's row, so standings on any past date and category trend
+    lines are a single indexed range read. Rate stats are derived from their components
+    when read.
+    """
+    league = models.ForeignKey(FantasyLeague, on_delete=models.CASCADE, related_name="stat_snapshots")
+    fantasy_team = models.ForeignKey(FantasyTeam, on_delete=models.CASCADE, related_name="stat_snapshots")
+    date = models.DateField()
+    role = models.CharField(max_length=10, choices=RoleChoices.choices)
+    category = models.CharField(max_length=10)
+    value = models.FloatField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['fantasy_team', 'role', 'category', 'date'],
+                name='unique_team_role_category_date'
+            )
+        ]
+        indexes = [
+            # Standings on a date, and trend lines of a category over a date range
+            models.Index(fields=['league', 'date'], name='snapshot_league_date'),
+            models.Index(fields=['league', 'category', 'date'], name='snapshot_league_category_date'),
+        ]
+
+    def __str__(self):
+        return f"{self.fantasy_team.name} {self.role} {self.category} on {self.date}: {self.value}"
+
+
+class MatchupPeriod(models.Model):
+    """One scoring week of a head-to-head league, from start_date up to (not including) end_date."""
+    league = models.ForeignKey(FantasyLeague, on_delete=models.CASCADE, related_name="matchup_periods")
+    number = models.PositiveSmallIntegerField()
+    start_date = models.DateField()
+    end_date = models.DateField()  # Non-inclusive
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['league', 'number'], name='unique_league_period_number')
+        ]
+        indexes = [
+            models.Index(fields=['league', 'start_date'], name='matchup_period_league_start'),
+        ]
+
+    def __str__(self):
+        return f"{self.league.name} week {self.number} ({self.start_date} - {self.end_date})"
+
+
+class Matchup(models.Model):
+    period = models.ForeignKey(MatchupPeriod, on_delete=models.CASCADE, related_name="matchups")
+    home_team = models.ForeignKey(FantasyTeam, on_delete=models.CASCADE, related_name="home_matchups")
+    away_team = models.ForeignKey(FantasyTeam, on_delete=models.CASCADE, related_name="away_matchups")
+
+    def __str__(self):
+        return f"{self.home_team.name} vs {self.away_team.name} (week {self.period.number})"
+
+
+class TeamPeriodStats(models.Model):
+    """
+    A fantasy team's role-separated stat totals over one matchup period, counting only
+    active roster spots. Kept up to date by StatDeltaAccumulator as games are ingested.
+    """
+    period = models.ForeignKey(MatchupPeriod, on_delete=models.CASCADE, related_name="team_stats")
+    fantasy_team = models.ForeignKey(FantasyTeam, on_delete=models.CASCADE, related_name="period_stats")
+    stats = models.JSONField(default=dict)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['period', 'fantasy_team'], name='unique_team_period_stats')
+        ]
+        indexes = [
+            models.Index(fields=['fantasy_team', 'period'], name='team_period_stats_team'),
+        ]
+
+    def __str__(self):
+        return f"{self.fantasy_team.name} week {self.period.number}: {self.stats}"
+
+
+class PlayerDailyTotals(models.Model):
+    """
+    Running total of a player's counting stats in one role through the end of a date,
+    with a row for every date the player appeared.
+
+    The stats over any date window are the row at its end minus the row before its
+    start, so a window costs two indexed lookups however long the season is.
+    """
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name="daily_totals")
+    role = models.CharField(max_length=10, choices=RoleChoices.choices)
+    date = models.DateField()
+    stats = models.JSONField(default=dict)
+
+    class Meta:
+        constraints = [
+            # Also the index for the latest-row-before-a-date lookups
+            models.UniqueConstraint(fields=['player', 'role', 'date'], name='unique_player_role_date')
+        ]
+
+    def __str__(self):
+        return f"{self.player.name} - {self.role} through {self.date}"
+
+    @classmethod
+    def latest_rows(cls, bounds):
+        """
+        Returns {(player_id, role): stats} of the latest row matching each of the given Q
+        bounds, in one DISTINCT ON query.
+        """
+        condition = Q()
+        for bound in bounds:
+            condition |= bound
+        if not condition:
+            return {}
+        rows = (
+            cls.objects.filter(condition)
+            .order_by('player_id', 'role', '-date')
+            .distinct('player_id', 'role')
+            .values_list('player_id', 'role', 'stats')
         )
+        return {(player_id, role): stats for player_id, role, stats in rows}
+
+    @classmethod
+    def as_of(cls, player_ids, date, roles=None):
+        """Returns {(player_id, role): cumulative stats} through the end of date. player_ids None means everyone."""
+        bound = Q(date__lte=date)
+        if player_ids is not None:
+            bound &= Q(player_id__in=player_ids)
+        if roles:
+            bound &= Q(role__in=roles)
+        return cls.latest_rows([bound])
+
+    @classmethod
+    def window_by_role(cls, player_ids, start, end, roles=None):
+        """
+        Returns {player_id: {role: stats}} over start..end (both inclusive; no start means
+        since the first game), the counting stats of each role without averages.
+        """
+        upper = cls.as_of(player_ids, end, roles)
+        lower = cls.as_of(player_ids, start - datetime.timedelta(days=1), roles) if start else {}
 
-        # Aggregate stats
-        aggregated_stats = {}
-        for game in games:
-            for stat, value in game.stats.items():
-                #skip averages for now
-                if(type(stat) == float):
-                    continue
-                aggregated_stats[stat] = aggregated_stats.get(stat, 0) + value
-        # Calculate averages for certain stats  
-        aggregated_stats["AVG"] = aggregated_stats.get("H", 0) / aggregated_stats.get("AB", 1) if aggregated_stats.get("AB", 0) > 0 else 0
-        aggregated_stats["ERA"] = (aggregated_stats.get("ER", 0) * 9) / aggregated_stats.get("IP", 1) if aggregated_stats.get("IP", 0) > 0 else 0
-        aggregated_stats["WHIP"] = (aggregated_stats.get("H", 0) + aggregated_stats.get("BB", 0)) / aggregated_stats.get("IP", 1) if aggregated_stats.get("IP", 0) > 0 else 0
-
-        # Store aggregated stats
-        self.stats = aggregated_stats
-        self.save()
+        totals = {}
+        for (player_id, role), stats in upper.items():
+            base = lower.get((player_id, role), {})
+            totals.setdefault(player_id, {})[role] = {stat: value - base.get(stat, 0) for stat, value in stats.items()}
+        return totals
+
+    @classmethod
+    def window(cls, player_ids, start, end, roles=None):
+        """
+        Returns {player_id: stats} over start..end (both inclusive; no start means since the
+        first game), summed across the requested roles with the averages derived.
+        """
+        totals = {}
+        for player_id, by_role in cls.window_by_role(player_ids, start, end, roles).items():
+            player_totals = totals.setdefault(player_id, {})
+            for stats in by_role.values():
+                for stat, value in stats.items():
+                    player_totals[stat] = player_totals.get(stat, 0) + value
+        return {player_id: calculate_rate_stats(stats) for player_id, stats in totals.items()}
+
+    @classmethod
+    def add_deltas(cls, deltas):
+        """
+        Adds stat changes keyed by (player_id, role, date) to the running totals: to the row
+        of each date (created if missing) and to every later row of that player and role.
+        """
+        if not deltas:
+            return
+
+        delta_dates = {}
+        for player_id, role, date in deltas:
+            delta_dates.setdefault((player_id, role), set()).add(date)
+        first_dates = {key: min(dates) for key, dates in delta_dates.items()}
+
+        # Rows from the first changed date on, and the row before it to start from
+        existing = {}
+        later = Q()
+        for (player_id, role), date in first_dates.items():
+            later |= Q(player_id=player_id, role=role, date__gte=date)
+        for row in cls.objects.filter(later).select_for_update().order_by('id'):
+            existing.setdefault((row.player_id, row.role), {})[row.date] = row.stats
+        bases = cls.latest_rows(
+            Q(player_id=player_id, role=role, date__lt=date) for (player_id, role), date in first_dates.items()
+        )
+
+        rows = []
+        for (player_id, role) in first_dates:
+            old_rows = existing.get((player_id, role), {})
+            dates = sorted(set(old_rows) | delta_dates[(player_id, role)])
+            old_total = bases.get((player_id, role), {})
+            added = {}
+            for date in dates:
+                old_total = old_rows.get(date, old_total)
+                for stat, change in deltas.get((player_id, role, date), {}).items():
+                    added[stat] = added.get(stat, 0) + change
+                total = dict(old_total)
+                for stat, change in added.items():
+                    total[stat] = total.get(stat, 0) + change
+                rows.append(cls(player_id=player_id, role=role, date=date, stats=total))
+
+        cls.objects.bulk_create(
+            rows,
+            update_conflicts=True,
+            unique_fields=['player', 'role', 'date'],
+            update_fields=['stats'],
+            batch_size=2000,
+        )
+
+    @classmethod
+    def rebuild(cls, player_ids):
+        """Recomputes every running total of the given players from their game lines."""
+        cls.objects.filter(player_id__in=player_ids).delete()
+        daily = {}
+        lines = GameStats.objects.filter(player_id__in=player_ids).values_list('player_id', 'role', 'game_date', 'stats')
+        for player_id, role, game_date, stats in lines:
+            day = daily.setdefault((player_id, role, game_date), {})
+            for stat, value in stats.items():
+                if stat not in RATE_STAT_KEYS:
+                    day[stat] = day.get(stat, 0) + value
+        cls.add_deltas(daily)
+
+
+class PlayerRollingStat(models.Model):
+    """
+    One stat of a player over the last `days` days, refreshed from the daily running
+    totals by fantasy.free_agents.refresh_rolling_stats. Every player who played a role
+    in the window gets a row for each of its categories (rates only once defined), so
+    sorting a search by recent production is an index range scan.
+    """
+    player = models.ForeignKey(Player, on_delete=models.CASCADE, related_name="rolling_stats")
+    role = models.CharField(max_length=10, choices=RoleChoices.choices)
+    days = models.PositiveSmallIntegerField()
+    category = models.CharField(max_length=10)
+    value = models.FloatField(default=0)
+    date = models.DateField()  # Last day of the window
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['player', 'role', 'days', 'category'], name='unique_player_rolling_stat')
+        ]
+        indexes = [
+            # Searches sort by a category in either direction, ties broken by player id
+            models.Index(fields=['role', 'days', 'category', '-value', 'player'], name='rolling_stat_desc'),
+            models.Index(fields=['role', 'days', 'category', 'value', 'player'], name='rolling_stat_asc'),
+        ]
 
     def __str__(self):
-        return f"{self.fantasy_team.name if self.fantasy_team else 'Free Agent'} - {self.player.name}"
+        return f"{self.player.name} {self.category} over {self.days} days: {self.value}"
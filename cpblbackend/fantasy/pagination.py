@@ -0,0 +1,14 @@
+from rest_framework.pagination import CursorPagination
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Keyset pagination on the primary key for every list endpoint: each page is an index
+    range read after the previous page's last id, however deep the client pages.
+
+    Responses are {"next": url, "previous": url, "results": [...]}.
+    """
+    ordering = 'id'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
@@ -0,0 +1,56 @@
+import re
+from functools import lru_cache
+
+from django.db import transaction
+
+
+@lru_cache(maxsize=None)
+def parse_position(raw_position):
+    """
+    Splits a scraped position string into upper case position codes, e.g. "RF (LF)" -> ("RF", "LF").
+
+    There are only a few hundred distinct strings in a season, so each is parsed once.
+    """
+    if '(' not in raw_position:
+        positions = [raw_position]
+    else:
+        positions = [raw_position.split('(')[0]]
+        for group in re.findall(r'\(([^)]+)\)', raw_position):
+            positions.extend(group.split(','))
+    return tuple(position.strip().upper() for position in positions if position.strip())
+
+
+@lru_cache(maxsize=None)
+def is_start(raw_position):
+    """Whether a pitcher's position string marks a start rather than a relief appearance."""
+    lowered = raw_position.lower()
+    return 'start' in lowered or 'sp' in lowered
+
+
+def normalize_position(role, raw_position):
+    """
+    Returns the (positions, started) stored on a GameStats row for its scraped position:
+    the canonical position codes, and for pitchers whether the appearance was a start
+    (None for batters).
+    """
+    if role == 'pitcher':
+        started = is_start(raw_position)
+        return ['SP' if started else 'RP'], started
+    return list(parse_position(raw_position)), None
+
+
+def fill_positions(lines):
+    """
+    Stores positions and started on a GameStats queryset (a migration's historical model
+    works too) from the scraped position strings.
+
+    A season has a few hundred distinct strings, so this updates by string rather than by
+    row. Returns (distinct strings, updated lines).
+    """
+    distinct = list(lines.values_list('role', 'position').distinct().order_by())
+    updated = 0
+    with transaction.atomic():
+        for role, position in distinct:
+            positions, started = normalize_position(role, position)
+            updated += lines.filter(role=role, position=position).update(positions=positions, started=started)
+    return len(distinct), updated
@@ -0,0 +1,101 @@
+import functools
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+
+RESPONSE_CACHE = "responses"
+VERSION_KEY = "fantasy:responses:version"
+
+
+def response_cache():
+    return caches[RESPONSE_CACHE]
+
+
+def data_version():
+    """Current version of the scraped reference data. Every cached response is keyed on it."""
+    cache = response_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        # Start from the clock, so losing the key (eviction, restart) never brings back older entries
+        cache.add(VERSION_KEY, time.time_ns(), None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_data_version():
+    """Retires every cached response, see fantasy/invalidation.py."""
+    try:
+        response_cache().incr(VERSION_KEY)
+    except ValueError:
+        # No version yet, so there is nothing cached to retire
+        data_version()
+
+
+def response_etag(content):
+    return f'"{hashlib.sha256(content).hexdigest()}"'
+
+
+def cached_response(handler):
+    """
+    Serves a read action from the response cache, see CachedResponseMixin. The response
+    is cached once rendered if it succeeded.
+    """
+
+    @functools.wraps(handler)
+    def wrapper(view, request, *args, **kwargs):
+        # The browsable API page shows the logged in user, so only the JSON is shared
+        if request.accepted_renderer.format != "json":
+            return handler(view, request, *args, **kwargs)
+
+        cache = response_cache()
+        key = "fantasy:responses:{}:{}".format(
+            data_version(), hashlib.sha256(request.build_absolute_uri().encode()).hexdigest()
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            content_type, content, etag = cached
+            if etag in parse_etags(request.headers.get("If-None-Match", "")):
+                response = HttpResponseNotModified()
+            else:
+                response = HttpResponse(content, content_type=content_type)
+            response["ETag"] = etag
+        else:
+            response = handler(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                def store(rendered):
+                    rendered["ETag"] = response_etag(rendered.content)
+                    cache.set(key, (rendered["Content-Type"], rendered.content, rendered["ETag"]))
+
+                response.add_post_render_callback(store)
+
+        patch_cache_control(response, public=True, max_age=settings.RESPONSE_CACHE_MAX_AGE)
+        patch_vary_headers(response, ["Accept"])
+        return response
+
+    return wrapper
+
+
+class CachedResponseMixin:
+    """
+    Caches the rendered list and detail responses of a viewset over data that only the
+    scraper changes.
+
+    Cache keys include the data version, which the invalidation bus bumps once any
+    ingest or write to the cached models commits, so repeat reads never touch the
+    database until the data actually changes. Responses carry a strong ETag (the hash of
+    the body) and a Cache-Control max-age; a request whose If-None-Match matches gets an
+    empty 304. Other read actions opt in with the cached_response decorator.
+    """
+
+    @cached_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @cached_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
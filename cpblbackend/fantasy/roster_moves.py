@@ -0,0 +1,283 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import Q
+
+from .matchups import invalidate_matchups
+from .models import FantasyLeague, FantasyPosition, FantasyRoster, FantasyTeam, Player, PlayerDailyTotals
+from .stat_deltas import accumulate_roles, add_stats, apply_period_deltas
+from .standings import invalidate_standings
+
+# Slots of a team when the league doesn't set its own in settings["roster_slots"]
+DEFAULT_ROSTER_SLOTS = {
+    "C": 1, "1B": 1, "2B": 1, "3B": 1, "SS": 1, "CI": 1, "MI": 1, "OF": 3, "UTIL": 1,
+    "SP": 2, "RP": 2, "P": 3, "BN": 5, "IL": 2,
+}
+# Spots that don't count towards the team totals and that any player can take
+RESERVE_SLOTS = ['BN', 'IL']
+MOVE_TYPES = ['add', 'drop', 'swap', 'trade']
+
+
+def roster_slots(league):
+    return league.settings.get("roster_slots") or DEFAULT_ROSTER_SLOTS
+
+
+def slot_eligible(player, slot):
+    """Whether a player may fill a slot: any player on the bench or injured list, else by eligibility."""
+    if slot in RESERVE_SLOTS:
+        return True
+    return slot in (player.eligible_positions or [player.position])
+
+
+def match_slots(players, open_slots):
+    """
+    Places players in open slots with augmenting path bipartite matching (Kuhn's algorithm).
+
+    Args:
+        players: players without a requested slot
+        open_slots: free slot units, e.g. ["OF", "OF", "BN"], in order of preference
+
+    Returns {player id: slot}, or None if some player can't be placed.
+    """
+    # Prefer lineup spots: match onto the active slots first, then let the rest take reserve slots
+    units = sorted(range(len(open_slots)), key=lambda unit: open_slots[unit] in RESERVE_SLOTS)
+    edges = {player.id: [unit for unit in units if slot_eligible(player, open_slots[unit])] for player in players}
+    holder = {}  # slot unit -> player id
+
+    def place(player_id, visited):
+        for unit in edges[player_id]:
+            if unit in visited:
+                continue
+            visited.add(unit)
+            if unit not in holder or place(holder[unit], visited):
+                holder[unit] = player_id
+                return True
+        return False
+
+    for player in players:
+        if not place(player.id, set()):
+            return None
+    return {player_id: open_slots[unit] for unit, player_id in holder.items()}
+
+
+def validate_lineup(team, entries, slots, changed):
+    """
+    Checks a team's resulting open roster: no slot over its capacity and every changed
+    entry in a slot its player is eligible for.
+
+    Args:
+        entries: {player id: (player, slot)}
+        changed: player ids whose slot is new or changed; the others keep their spot even
+            if their eligibility has changed since
+
+    Raises ValueError listing every problem.
+    """
+    errors = []
+    counts = {}
+    for player, slot in entries.values():
+        counts[slot] = counts.get(slot, 0) + 1
+        if slot not in FantasyPosition.values:
+            errors.append(f"{slot} is not a roster position.")
+        elif player.id in changed and not slot_eligible(player, slot):
+            errors.append(f"{player.name} is not eligible at {slot}.")
+    for slot, count in counts.items():
+        if count > slots.get(slot, 0):
+            errors.append(f"{team.name} has {count} players at {slot}, only {slots.get(slot, 0)} allowed.")
+    if errors:
+        raise ValueError(" ".join(errors))
+
+
+class RosterMove:
+    """
+    Applies add, drop, swap and trade moves to a league's rosters in one transaction.
+
+    The league row is locked first, so moves in a league run one at a time. A move
+    effective on a date closes the open FantasyRoster stints it changes at that date
+    (end_date is non-inclusive) and opens new ones from it. Moves can't be dated before
+    today, so stints covering days that already have standings snapshots never change.
+
+    Stats are moved rather than recomputed: games on or after the date (only today's,
+    if already played) come off the closed stints and onto the new ones, and the
+    difference of the active spots is applied to the affected teams' totals. A move
+    costs the same handful of queries whatever the size of the rosters.
+
+    Usage:
+        RosterMove(league, date).add(team, player_id, slot=None, drop=None)
+    """
+
+    def __init__(self, league, date=None):
+        self.league = league
+        self.date = date or datetime.date.today()
+        if self.date < datetime.date.today():
+            raise ValueError("Roster moves can't be dated in the past.")
+
+    def add(self, team, player_id, slot=None, drop=None):
+        """Signs a player nobody in the league has, optionally dropping one of the team's players for the spot."""
+        return self.run([team], lambda rosters: self._add(team, rosters, player_id, slot, drop))
+
+    def drop(self, team, player_id):
+        return self.run([team], lambda rosters: self._release(team, rosters, [player_id]))
+
+    def swap(self, team, changes):
+        """Moves the team's players to new slots, given as {player id: slot}, validated as one lineup change."""
+        return self.run([team], lambda rosters: self._swap(team, rosters, changes))
+
+    def lineups(self, changes):
+        """Applies {team id: {player id: slot}} lineup changes for several teams of the league at once."""
+        teams = list(FantasyTeam.objects.filter(league=self.league, id__in=changes))
+        if len(teams) != len(changes):
+            raise ValueError("The team is not in this league.")
+
+        def move(rosters):
+            for team in teams:
+                self._swap(team, rosters, changes[team.id])
+
+        return self.run(teams, move)
+
+    def trade(self, team, other_team, send, receive):
+        """Exchanges players between two teams of the league; received players fill open slots."""
+        if team.league_id != other_team.league_id or team.id == other_team.id:
+            raise ValueError("Trades are between two different teams of the same league.")
+        return self.run([team, other_team], lambda rosters: self._trade(team, other_team, rosters, send, receive))
+
+    def run(self, teams, move):
+        with transaction.atomic():
+            FantasyLeague.objects.select_for_update().get(pk=self.league.pk)
+            if any(team.league_id != self.league.pk for team in teams):
+                raise ValueError("The team is not in this league.")
+
+            # Every stint of the league still running at the date; a player is on one team at a time
+            stints = FantasyRoster.objects.filter(
+                Q(end_date__isnull=True) | Q(end_date__gt=self.date),
+                fantasy_team__league=self.league,
+            ).select_related('player').select_for_update(of=('self',))
+            rosters = {}
+            self.taken = set()
+            for roster in stints:
+                self.taken.add(roster.player_id)
+                # Stints already ending at a later date belong to an earlier move and stay as they are
+                if roster.end_date is None:
+                    rosters.setdefault(roster.fantasy_team_id, {})[roster.player_id] = roster
+
+            self.closed = []  # stints ending at the date
+            self.opened = []  # new stints from the date
+            self.changed = {team.id: set() for team in teams}
+            move(rosters)
+
+            for team in teams:
+                entries = {
+                    player_id: (roster.player, roster.position)
+                    for player_id, roster in rosters.get(team.id, {}).items()
+                }
+                validate_lineup(team, entries, roster_slots(self.league), self.changed[team.id])
+
+            self._write()
+        return self.opened
+
+    def _open(self, team, player, slot, rosters):
+        roster = FantasyRoster(fantasy_team=team, player=player, position=slot, start_date=self.date, stats={})
+        rosters.setdefault(team.id, {})[player.id] = roster
+        self.opened.append(roster)
+        self.changed[team.id].add(player.id)
+        return roster
+
+    def _close(self, team, roster, rosters):
+        del rosters[team.id][roster.player_id]
+        self.closed.append(roster)
+
+    def _release(self, team, rosters, player_ids):
+        released = []
+        for player_id in player_ids:
+            roster = rosters.get(team.id, {}).get(player_id)
+            if roster is None:
+                raise ValueError(f"Player {player_id} is not on {team.name}.")
+            self._close(team, roster, rosters)
+            released.append(roster.player)
+        return released
+
+    def _add(self, team, rosters, player_id, slot, drop):
+        if player_id in self.taken:
+            raise ValueError(f"Player {player_id} is already on a team in this league.")
+        player = Player.objects.filter(pk=player_id).first()
+        if player is None:
+            raise ValueError(f"Unknown player {player_id}.")
+        if drop is not None:
+            self._release(team, rosters, [drop])
+        if slot is None:
+            slot = self._place(team, [player], rosters)[player.id]
+        self._open(team, player, slot, rosters)
+
+    def _swap(self, team, rosters, changes):
+        for player_id, slot in changes.items():
+            roster = rosters.get(team.id, {}).get(player_id)
+            if roster is None:
+                raise ValueError(f"Player {player_id} is not on {team.name}.")
+            if roster.position == slot:
+                continue
+            self._close(team, roster, rosters)
+            self._open(team, roster.player, slot, rosters)
+
+    def _trade(self, team, other_team, rosters, send, receive):
+        sent = self._release(team, rosters, send)
+        received = self._release(other_team, rosters, receive)
+        for to_team, players in [(other_team, sent), (team, received)]:
+            if players:
+                slots = self._place(to_team, players, rosters)
+                for player in players:
+                    self._open(to_team, player, slots[player.id], rosters)
+
+    def _place(self, team, players, rosters):
+        slots = roster_slots(self.league)
+        used = {}
+        for roster in rosters.get(team.id, {}).values():
+            used[roster.position] = used.get(roster.position, 0) + 1
+        open_slots = [
+            slot
+            for slot, capacity in slots.items() if slot != 'IL'
+            for _ in range(capacity - used.get(slot, 0))
+        ]
+        placed = match_slots(players, open_slots)
+        if placed is None:
+            raise ValueError(f"{team.name} has no open roster spot for {', '.join(player.name for player in players)}.")
+        return placed
+
+    def _write(self):
+        """Moves the stats of games on or after the date from the closed stints to the opened ones."""
+        stints = self.closed + self.opened
+        if not stints:
+            return
+        moved = PlayerDailyTotals.window_by_role({roster.player_id for roster in stints}, self.date, datetime.date.max)
+
+        team_deltas = {}
+        for sign, rosters in [(-1, self.closed), (1, self.opened)]:
+            for roster in rosters:
+                delta = {
+                    role: {stat: sign * value for stat, value in stats.items() if value}
+                    for role, stats in moved.get(roster.player_id, {}).items()
+                }
+                add_stats(roster.stats, delta)
+                if roster.position not in RESERVE_SLOTS:
+                    accumulate_roles(team_deltas.setdefault(roster.fantasy_team_id, {}), delta)
+
+        # A stint that hasn't started by the date (opened by an earlier move that day) is
+        # replaced rather than kept with zero length. The team totals were just adjusted, so
+        # it's deleted without signals: the invalidation bus would re-sum the whole team.
+        unstarted = [roster.pk for roster in self.closed if roster.start_date >= self.date]
+        ended = [roster for roster in self.closed if roster.start_date < self.date]
+        for roster in ended:
+            roster.end_date = self.date
+        unstarted_rows = FantasyRoster.objects.filter(pk__in=unstarted)
+        unstarted_rows._raw_delete(unstarted_rows.db)
+        FantasyRoster.objects.bulk_update(ended, ['end_date', 'stats'])
+        FantasyRoster.objects.bulk_create(self.opened)
+
+        teams = list(FantasyTeam.objects.filter(id__in=team_deltas).select_for_update().order_by('id'))
+        for team in teams:
+            add_stats(team.total_stats, team_deltas[team.id])
+        FantasyTeam.objects.bulk_update(teams, ['total_stats'])
+        # Only games of the move's date can have moved, which all fall into that date's matchup period
+        period_stats = apply_period_deltas(
+            {(team_id, self.date): delta for team_id, delta in team_deltas.items() if delta}
+        )
+        invalidate_standings([self.league.pk])
+        invalidate_matchups(row.period_id for row in period_stats)
@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
-from .models import Team, FantasyTeam, Player, FantasyRoster, Game, GameStats, FantasyLeague
+from .models import Team, FantasyTeam, Player, FantasyRoster, Game, GameStats, FantasyLeague, FantasyPosition
+from .roster_moves import MOVE_TYPES
 
 class TeamSerializer(serializers.ModelSerializer):
     class Meta:
@@ -13,6 +14,7 @@ class PlayerSerializer(serializers.ModelSerializer):
     class Meta:
         model = Player
         fields = '__all__'
+        read_only_fields = ['profile_image_hash']
         
     def get_profile_image_url(self, obj):
         if obj.profile_image:
@@ -22,15 +24,26 @@ class PlayerSerializer(serializers.ModelSerializer):
             return obj.profile_image.url
         return None
 
+class PlayerSummarySerializer(PlayerSerializer):
+    """The player fields a roster or team view shows, nested to save a request per player."""
+    team_name = serializers.CharField(source='team.name', read_only=True)
+
+    class Meta(PlayerSerializer.Meta):
+        fields = [
+            'id', 'name', 'indigenous_name', 'number', 'team', 'team_name', 'position',
+            'eligible_positions', 'profile_image_url',
+        ]
+
 class GameSerializer(serializers.ModelSerializer):
     class Meta:
         model = Game
-        fields = '__all__'
+        exclude = ['source_sha256']  # scraper bookkeeping
 
 class GameStatsSerializer(serializers.ModelSerializer):
     class Meta:
         model = GameStats
         fields = '__all__'
+        read_only_fields = ['game_date', 'positions', 'started']  # Copied from the game and parsed on save
 
 class FantasyLeagueSerializer(serializers.ModelSerializer):
     class Meta:
@@ -38,15 +51,60 @@ class FantasyLeagueSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 class FantasyTeamSerializer(serializers.ModelSerializer):
+    """
+    total_stats is split by role, {"batter": {...}, "pitcher": {...}}, so a pitcher's H or SO
+    never lands in the batting categories. Clients reading it as one flat dict must pick a role.
+    """
     class Meta:
         model = FantasyTeam
         fields = '__all__'
 
 class FantasyRosterSerializer(serializers.ModelSerializer):
+    """stats is split by role like FantasyTeamSerializer's total_stats, with only the roles played."""
     class Meta:
         model = FantasyRoster
         fields = '__all__'
 
+class FantasyRosterReadSerializer(FantasyRosterSerializer):
+    """
+    Roster entry with its player nested. Needs the queryset to select_related('player__team').
+    """
+    player_detail = PlayerSummarySerializer(source='player', read_only=True)
+
+class FantasyTeamReadSerializer(FantasyTeamSerializer):
+    """
+    Fantasy team with its roster and players nested. Needs the queryset to select the
+    owner and league, and to prefetch fantasyroster_set with player__team selected.
+    """
+    owner_username = serializers.CharField(source='owner.username', read_only=True)
+    league_name = serializers.CharField(source='league.name', read_only=True)
+    roster = FantasyRosterReadSerializer(source='fantasyroster_set', many=True, read_only=True)
+
+
+class RosterChangeSerializer(serializers.Serializer):
+    player = serializers.IntegerField()
+    position = serializers.ChoiceField(choices=FantasyPosition.choices)
+
+class RosterMoveSerializer(serializers.Serializer):
+    """Body of a roster move (see FantasyTeamViewSet.moves); each type checks its own required fields."""
+    REQUIRED_FIELDS = {"add": ["player"], "drop": ["player"], "swap": ["changes"], "trade": ["team"]}
+
+    type = serializers.ChoiceField(choices=MOVE_TYPES)
+    date = serializers.DateField(required=False)
+    player = serializers.IntegerField(required=False)
+    position = serializers.ChoiceField(choices=FantasyPosition.choices, required=False, allow_null=True)
+    drop = serializers.IntegerField(required=False, allow_null=True)
+    changes = RosterChangeSerializer(many=True, required=False)
+    team = serializers.IntegerField(required=False)
+    send = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+    receive = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, data):
+        missing = [field for field in self.REQUIRED_FIELDS[data["type"]] if field not in data]
+        if missing:
+            raise serializers.ValidationError({field: "This field is required." for field in missing})
+        return data
+
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -0,0 +1,181 @@
+import datetime
+
+from django.db import transaction
+from django.db.models import Max, Q
+
+from .models import (
+    FantasyLeague, FantasyRoster, GameStats, TeamStatSnapshot, RATE_STAT_KEYS, ROLE_STAT_KEYS,
+    calculate_role_rate_stats,
+)
+from .standings import category_role, league_categories, rank_teams
+
+COUNTING_STATS = {
+    role: [stat for stat in keys if stat not in RATE_STAT_KEYS] for role, keys in ROLE_STAT_KEYS.items()
+}
+# Only counting stats are stored, rate stats are derived from them when read
+RATE_COMPONENTS = {"AVG": ["H", "AB"], "ERA": ["ER", "IP"], "WHIP": ["H", "BB", "IP"]}
+BATCH_SIZE = 5000
+
+
+def snapshot_stats(categories):
+    """
+    Returns {role: [stat]}, the counting stats a league scoring the given categories
+    snapshots: each category in its role, rate categories as their components.
+    """
+    stats = {}
+    for category in categories:
+        role_stats = stats.setdefault(category_role(category), [])
+        for stat in RATE_COMPONENTS.get(category, [category]):
+            if stat not in role_stats:
+                role_stats.append(stat)
+    return stats
+
+
+def daily_team_deltas(league, start, end, stats=None):
+    """
+    Returns {date: {team_id: {role: {stat: change}}}} with the counting stats every team's
+    active roster spots gained on each date from start to end (inclusive), from one
+    GameStats read.
+
+    Args:
+        stats: {role: [stat]} to count, every counting stat by default
+    """
+    stints_by_player = {}
+    stints = FantasyRoster.objects.filter(
+        Q(end_date__isnull=True) | Q(end_date__gt=start),
+        fantasy_team__league=league,
+        start_date__lte=end,
+    ).exclude(position__in=['BN', 'IL']).values_list('fantasy_team_id', 'player_id', 'start_date', 'end_date')
+    for team_id, player_id, start_date, end_date in stints:
+        stints_by_player.setdefault(player_id, []).append((team_id, start_date, end_date))
+
+    counted = {role: set(role_stats) for role, role_stats in (stats or COUNTING_STATS).items()}
+    deltas = {}
+    lines = GameStats.objects.filter(
+        player_id__in=stints_by_player, game_date__gte=start, game_date__lte=end
+    ).values_list('player_id', 'role', 'game_date', 'stats')
+    for player_id, role, game_date, line in lines.iterator(chunk_size=2000):
+        if role not in counted:
+            continue
+        for team_id, start_date, end_date in stints_by_player[player_id]:
+            if game_date < start_date or (end_date is not None and game_date >= end_date):
+                continue
+            team_delta = deltas.setdefault(game_date, {}).setdefault(team_id, {}).setdefault(role, {})
+            for stat, value in line.items():
+                if stat in counted[role]:
+                    team_delta[stat] = team_delta.get(stat, 0) + value
+    return deltas
+
+
+def snapshot_league(league, until=None, rebuild=False):
+    """
+    Writes the cumulative snapshot rows of every team in the league for each date after
+    the last snapshot, up to until (default yesterday, capped at the league's end date).
+
+    Each day's rows are the previous day's totals plus that day's games. Only the stats
+    the league's categories are computed from are stored (see snapshot_stats). With
+    rebuild, the league's snapshots are dropped and refilled from its start date, which
+    picks up stat corrections to games that were already snapshotted; the same happens
+    when the league has started scoring a category the stored rows lack.
+
+    Returns the number of dates written.
+    """
+    until = min(until or datetime.date.today() - datetime.timedelta(days=1), league.end_date)
+
+    with transaction.atomic():
+        # Serializes concurrent runs for the same league
+        FantasyLeague.objects.select_for_update().get(pk=league.pk)
+        snapshots = TeamStatSnapshot.objects.filter(league=league)
+        stats = snapshot_stats(league_categories(league))
+        last_date = snapshots.aggregate(last=Max('date'))['last']
+        if last_date and not rebuild:
+            stored = set(snapshots.filter(date=last_date).values_list('role', 'category').distinct())
+            rebuild = any((role, stat) not in stored for role, role_stats in stats.items() for stat in role_stats)
+        if rebuild:
+            snapshots.delete()
+            last_date = None
+
+        start = last_date + datetime.timedelta(days=1) if last_date else league.start_date
+        if start > until:
+            return 0
+
+        totals = {team_id: {} for team_id in league.fantasyteam_set.values_list('id', flat=True)}
+        if last_date:
+            for team_id, role, category, value in snapshots.filter(date=last_date).values_list(
+                'fantasy_team_id', 'role', 'category', 'value'
+            ):
+                totals.setdefault(team_id, {}).setdefault(role, {})[category] = value
+
+        deltas = daily_team_deltas(league, start, until, stats)
+        rows = []
+        day = start
+        while day <= until:
+            for team_id, delta in deltas.get(day, {}).items():
+                for role, role_delta in delta.items():
+                    role_totals = totals.setdefault(team_id, {}).setdefault(role, {})
+                    for stat, change in role_delta.items():
+                        role_totals[stat] = role_totals.get(stat, 0) + change
+
+            for team_id, team_totals in totals.items():
+                rows.extend(
+                    TeamStatSnapshot(
+                        league=league, fantasy_team_id=team_id, date=day,
+                        role=role, category=category, value=team_totals.get(role, {}).get(category, 0),
+                    )
+                    for role, role_stats in stats.items()
+                    for category in role_stats
+                )
+            if len(rows) >= BATCH_SIZE:
+                TeamStatSnapshot.objects.bulk_create(rows)
+                rows = []
+            day += datetime.timedelta(days=1)
+        TeamStatSnapshot.objects.bulk_create(rows)
+
+    return (until - start).days + 1
+
+
+def standings_on(league, date, categories):
+    """Returns the rotisserie standings at the end of date, read from the snapshot rows of that date."""
+    teams = {}
+    rows = TeamStatSnapshot.objects.filter(league=league, date=date).values_list(
+        'fantasy_team_id', 'fantasy_team__name', 'role', 'category', 'value'
+    )
+    for team_id, name, role, category, value in rows:
+        teams.setdefault(team_id, (team_id, name, {}))[2].setdefault(role, {})[category] = value
+
+    standings = rank_teams(categories, [
+        (team_id, name, calculate_role_rate_stats(stats)) for team_id, name, stats in sorted(teams.values())
+    ])
+    standings["date"] = date
+    return standings
+
+
+def category_trends(league, categories, start, end):
+    """
+    Returns the daily cumulative value of each category for every team of the league
+    between start and end, read as one range of snapshot rows.
+    """
+    needed = Q()
+    for category in categories:
+        needed |= Q(role=category_role(category), category__in=RATE_COMPONENTS.get(category, [category]))
+
+    series = {}
+    rows = TeamStatSnapshot.objects.filter(
+        needed, league=league, date__gte=start, date__lte=end
+    ).order_by('fantasy_team_id', 'date').values_list('fantasy_team_id', 'date', 'role', 'category', 'value')
+    for team_id, date, role, category, value in rows:
+        series.setdefault(team_id, {}).setdefault(date, {}).setdefault(role, {})[category] = value
+
+    derive_rates = bool(RATE_COMPONENTS.keys() & set(categories))
+    teams = []
+    for team_id, days in series.items():
+        points = []
+        for date, stats in days.items():
+            if derive_rates:
+                calculate_role_rate_stats(stats)
+            points.append({
+                "date": date,
+                **{category: stats.get(category_role(category), {}).get(category, 0) for category in categories},
+            })
+        teams.append({"team_id": team_id, "series": points})
+    return {"categories": categories, "start": start, "end": end, "teams": teams}
@@ -0,0 +1,127 @@
+import numpy as np
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import FantasyTeam, RoleChoices
+
+# Rotisserie categories used when a league doesn't set its own in settings["categories"]
+DEFAULT_CATEGORIES = ["R", "HR", "RBI", "SB", "AVG", "SO", "ERA", "WHIP"]
+# Categories read from the pitching totals (SO is strikeouts thrown); every other one
+# comes from the batting totals
+PITCHING_CATEGORIES = {"IP", "BF", "NP", "S", "ER", "ERA", "WHIP", "WP", "BK", "SO"}
+LOWER_IS_BETTER = {"ERA", "WHIP"}
+# Rate stats are undefined (and rank last) until a team has some of their denominator
+RATE_DENOMINATORS = {"AVG": "AB", "ERA": "IP", "WHIP": "IP"}
+CACHE_TIMEOUT = 60 * 60
+
+
+def standings_cache_key(league_id):
+    return f"fantasy:standings:{league_id}"
+
+
+def invalidate_standings(league_ids):
+    """Drops the cached standings of the given leagues once the current transaction commits."""
+    keys = [standings_cache_key(league_id) for league_id in set(league_ids)]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def league_categories(league):
+    return league.settings.get("categories") or DEFAULT_CATEGORIES
+
+
+def category_role(category):
+    return RoleChoices.PITCHER if category in PITCHING_CATEGORIES else RoleChoices.BATTER
+
+
+def category_matrix(team_stats, categories):
+    """
+    Builds a (teams, categories) float array from role-separated total_stats dicts, each
+    category read from its role. Missing counting stats are 0; rate stats without a
+    denominator are NaN.
+    """
+    roles = [category_role(category) for category in categories]
+    values = np.array(
+        [[stats.get(role, {}).get(category, 0) for category, role in zip(categories, roles)] for stats in team_stats],
+        dtype=float,
+    ).reshape(len(team_stats), len(categories))
+    for column, (category, role) in enumerate(zip(categories, roles)):
+        denominator = RATE_DENOMINATORS.get(category)
+        if denominator:
+            played = np.array([stats.get(role, {}).get(denominator, 0) > 0 for stats in team_stats], dtype=bool)
+            values[~played, column] = np.nan
+    return values
+
+
+def rank_points(values, lower_is_better):
+    """
+    Ranks every category column at once and returns the rotisserie points per team and category.
+
+    With n teams the best team in a category gets n points and the worst 1. Tied teams
+    split the points of the places they cover, and NaN ranks below every value.
+
+    Args:
+        values: (teams, categories) array of category totals
+        lower_is_better: (categories,) boolean array, True where a lower total is better
+    """
+    signed = np.where(lower_is_better, -values, values)
+    signed = np.where(np.isnan(signed), -np.inf, signed)
+    # [i, j, c]: how team i compares with team j in category c
+    beats = (signed[:, None, :] > signed[None, :, :]).sum(axis=1)
+    ties = (signed[:, None, :] == signed[None, :, :]).sum(axis=1)
+    return beats + 1 + (ties - 1) / 2
+
+
+def rank_teams(categories, teams):
+    """
+    Returns the rotisserie standings of teams, given as (team id, name, total stats) tuples.
+    """
+    if not teams:
+        return {"categories": categories, "teams": []}
+
+    values = category_matrix([stats for _, _, stats in teams], categories)
+    points = rank_points(values, np.array([category in LOWER_IS_BETTER for category in categories], dtype=bool))
+    totals = points.sum(axis=1)
+    ranks = (totals[None, :] > totals[:, None]).sum(axis=1) + 1
+
+    standings = [
+        {
+            "team_id": team_id,
+            "name": name,
+            "rank": int(ranks[row]),
+            "points": float(totals[row]),
+            "categories": {
+                category: {
+                    "value": None if np.isnan(values[row, column]) else float(values[row, column]),
+                    "points": float(points[row, column]),
+                }
+                for column, category in enumerate(categories)
+            },
+        }
+        for row, (team_id, name, _) in enumerate(teams)
+    ]
+    standings.sort(key=lambda team: (team["rank"], team["team_id"]))
+    return {"categories": categories, "teams": standings}
+
+
+def compute_standings(league):
+    """Loads every team's totals for the league with one query and returns the rotisserie standings."""
+    teams = list(
+        FantasyTeam.objects.filter(league=league).order_by('id').values_list('id', 'name', 'total_stats')
+    )
+    return rank_teams(league_categories(league), teams)
+
+
+def get_standings(league):
+    """
+    Returns the league's standings from the cache, computing and caching them on a miss.
+
+    The default cache is shared by every process (see settings.CACHES), so evictions by
+    invalidate_standings in the scraper or a management command reach the web workers.
+    """
+    key = standings_cache_key(league.id)
+    standings = cache.get(key)
+    if standings is None:
+        standings = compute_standings(league)
+        cache.set(key, standings, CACHE_TIMEOUT)
+    return standings
@@ -0,0 +1,160 @@
+from django.db import transaction
+
+from .matchups import invalidate_matchups
+from .models import FantasyRoster, FantasyTeam, TeamPeriodStats, RATE_STAT_KEYS, calculate_role_rate_stats
+from .standings import invalidate_standings
+
+
+def stat_line_delta(old_stats, new_stats):
+    """
+    Returns new_stats - old_stats for every counting stat in either line.
+
+    Rate stats (AVG, ERA, WHIP) are skipped since they are derived from the
+    stored components. Keys that did not change are left out.
+    """
+    delta = {}
+    for stat in set(old_stats) | set(new_stats):
+        if stat in RATE_STAT_KEYS:
+            continue
+        change = new_stats.get(stat, 0) - old_stats.get(stat, 0)
+        if change:
+            delta[stat] = change
+    return delta
+
+
+def accumulate(totals, delta):
+    """Adds a delta to a dict of counting stats in place."""
+    for stat, change in delta.items():
+        totals[stat] = totals.get(stat, 0) + change
+    return totals
+
+
+def accumulate_roles(totals, deltas):
+    """Adds role-separated deltas, {role: {stat: change}}, to role-separated totals in place."""
+    for role, delta in deltas.items():
+        accumulate(totals.setdefault(role, {}), delta)
+    return totals
+
+
+def add_stats(totals, deltas):
+    """Adds role-separated deltas to a dict of stored role-separated totals in place and re-derives the averages."""
+    return calculate_role_rate_stats(accumulate_roles(totals, deltas))
+
+
+def apply_period_deltas(dated_team_deltas):
+    """
+    Adds role-separated team deltas, keyed by (team id, game date), to the head-to-head
+    totals of the matchup periods containing their dates. Returns the updated
+    TeamPeriodStats rows.
+    """
+    if not dated_team_deltas:
+        return []
+
+    dates = [game_date for _, game_date in dated_team_deltas]
+    period_stats = list(
+        TeamPeriodStats.objects.filter(
+            fantasy_team_id__in={team_id for team_id, _ in dated_team_deltas},
+            period__start_date__lte=max(dates),
+            period__end_date__gt=min(dates),
+        )
+        .select_related('period')
+        .select_for_update(of=('self',))
+        .order_by('id')
+    )
+    for row in period_stats:
+        period_delta = {}
+        for (team_id, game_date), delta in dated_team_deltas.items():
+            if team_id == row.fantasy_team_id and row.period.start_date <= game_date < row.period.end_date:
+                accumulate_roles(period_delta, delta)
+        add_stats(row.stats, period_delta)
+
+    TeamPeriodStats.objects.bulk_update(period_stats, ['stats'])
+    return period_stats
+
+
+class StatDeltaAccumulator:
+    """
+    Collects the change of every ingested GameStats line and applies it to the stored
+    FantasyRoster.stats, FantasyTeam.total_stats and head-to-head TeamPeriodStats,
+    instead of re-aggregating the season.
+
+    Usage:
+        deltas = StatDeltaAccumulator()
+        deltas.add(player.id, line.role, game.date, old_stats, new_stats)  # once per stat line
+        deltas.apply()  # once per batch, in the transaction that stored the lines
+    """
+
+    def __init__(self):
+        # (player_id, role, game date) -> {stat: change}
+        self.deltas = {}
+
+    def __len__(self):
+        return len(self.deltas)
+
+    def add(self, player_id, role, game_date, old_stats, new_stats):
+        """Records the difference between the previous and new version of one stat line."""
+        delta = stat_line_delta(old_stats or {}, new_stats or {})
+        if not delta:
+            return
+        accumulate(self.deltas.setdefault((player_id, role, game_date), {}), delta)
+
+    def apply(self):
+        """
+        Applies every pending delta inside one transaction, holding row locks on the
+        affected roster entries and fantasy teams.
+
+        Returns the number of roster entries and teams that were updated.
+        """
+        if not self.deltas:
+            return 0, 0
+
+        with transaction.atomic():
+            rosters = list(
+                FantasyRoster.objects.covering((player_id, game_date) for player_id, _, game_date in self.deltas)
+                .select_for_update()
+                .order_by('id')
+            )
+
+            deltas_by_player = {}
+            for (player_id, role, game_date), delta in self.deltas.items():
+                deltas_by_player.setdefault(player_id, []).append((role, game_date, delta))
+
+            team_deltas = {}
+            # (team id, game date) -> {role: {stat: change}}, for the matchup period containing the date
+            dated_team_deltas = {}
+            for roster in rosters:
+                roster_delta = {}
+                # Bench and injured list spots don't count towards the team totals
+                active = roster.fantasy_team_id and roster.position not in ['BN', 'IL']
+                for role, game_date, delta in deltas_by_player.get(roster.player_id, []):
+                    if game_date < roster.start_date:
+                        continue
+                    if roster.end_date is not None and game_date >= roster.end_date:
+                        continue
+                    accumulate_roles(roster_delta, {role: delta})
+                    if active:
+                        accumulate_roles(
+                            dated_team_deltas.setdefault((roster.fantasy_team_id, game_date), {}), {role: delta}
+                        )
+
+                add_stats(roster.stats, roster_delta)
+                if active:
+                    accumulate_roles(team_deltas.setdefault(roster.fantasy_team_id, {}), roster_delta)
+
+            teams = list(
+                FantasyTeam.objects.filter(id__in=team_deltas)
+                .select_for_update()
+                .order_by('id')
+            )
+            for team in teams:
+                add_stats(team.total_stats, team_deltas[team.id])
+
+            period_stats = apply_period_deltas(dated_team_deltas)
+
+            FantasyRoster.objects.bulk_update(rosters, ['stats'])
+            FantasyTeam.objects.bulk_update(teams, ['total_stats'])
+            invalidate_standings(team.league_id for team in teams)
+            invalidate_matchups(row.period_id for row in period_stats)
+
+        self.deltas.clear()
+        return len(rosters), len(teams)
@@ -1,3 +1,982 @@
-from django.test import TestCase
+import datetime
+import io
+import itertools
+import os
+import random
+import tempfile
+import threading
+import time
+from collections import Counter
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+from urllib.parse import parse_qs, urlparse
 
-# Create your tests here.
+import numpy as np
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import caches
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from .models import (
+    Team, Player, Game, GameStats, BattingLine, BattingSeasonTotals, PitchingLine, PitchingSeasonTotals, FantasyLeague, FantasyTeam, FantasyRoster, PlayerDailyTotals,
+    PlayerRollingStat, TeamPeriodStats, TeamStatSnapshot, BATTING_STAT_KEYS, PITCHING_STAT_KEYS,
+)
+from .eligibility import eligible_positions, season_counts, update_eligibility
+from .free_agents import free_agents, refresh_rolling_stats
+from .invalidation import dispatch
+from .leaderboards import leaderboard
+from .lineups import hungarian, optimal_lineups
+from .matchups import generate_schedule, get_period_scores, matchup_cache_key
+from .positions import fill_positions, is_start, parse_position
+from .response_cache import RESPONSE_CACHE, VERSION_KEY, bump_data_version, response_cache
+from .snapshots import category_trends, snapshot_league, standings_on
+from .standings import get_standings, standings_cache_key
+
+
+# The configured caches are shared with the running site, tests get their own in memory
+test_caches = override_settings(CACHES={
+    alias: {**config, "BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": f"test-{alias}"}
+    for alias, config in settings.CACHES.items()
+})
+
+
+def setUpModule():
+    test_caches.enable()
+
+
+def tearDownModule():
+    test_caches.disable()
+
+
+def seed_season(year=2024, games=360, teams=6, players_per_team=40, lines_per_team=20):
+    """Bulk-creates a season's worth of games and stat lines (about 14k GameStats rows)."""
+    cpbl_teams = [Team.objects.create(name=f"Team {i}") for i in range(teams)]
+    players = Player.objects.bulk_create([
+        Player(name=f"Player {i}-{j}", team=team, acnt=f"{i:02d}{j:03d}", bats='R', throws='R')
+        for i, team in enumerate(cpbl_teams)
+        for j in range(players_per_team)
+    ])
+    roster = {team.id: [p for p in players if p.team_id == team.id] for team in cpbl_teams}
+
+    opening_day = datetime.date(year, 3, 30)
+    season = Game.objects.bulk_create([
+        Game(
+            date=opening_day + datetime.timedelta(days=number // 3),
+            game_number=number + 1,
+            home_team=cpbl_teams[number % teams],
+            away_team=cpbl_teams[(number + 1) % teams],
+        )
+        for number in range(games)
+    ])
+
+    lines = []
+    for number, game in enumerate(season):
+        for team in (game.home_team, game.away_team):
+            team_players = roster[team.id]
+            for k in range(lines_per_team):
+                player = team_players[(number + k) % len(team_players)]
+                lines.append(GameStats(
+                    game=game, game_date=game.date, player=player, role='batter',
+                    position='SS', stats={"AB": 4, "H": 1},
+                ))
+    GameStats.objects.bulk_create(lines, batch_size=2000)
+
+    with connection.cursor() as cursor:
+        cursor.execute("ANALYZE")
+    return players
+
+
+class GameStatsIndexTests(TestCase):
+    """The date-range lookups per player must stay index range scans as the season grows."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.players = seed_season()
+
+    def assertIndexScan(self, queryset, index):
+        """Accepts a plain ("Index Scan using <index>") or bitmap ("Bitmap Index Scan on <index>") scan."""
+        plan = queryset.explain()
+        self.assertNotIn("Seq Scan on fantasy_gamestats", plan)
+        self.assertRegex(plan, rf"(Index Scan using|Index Only Scan using|Bitmap Index Scan on) {index}")
+
+    def test_roster_stint_lookup_uses_player_date_index(self):
+        self.assertIndexScan(GameStats.objects.filter(
+            player=self.players[0],
+            game_date__gte=datetime.date(2024, 5, 1),
+            game_date__lt=datetime.date(2024, 6, 1),
+        ), "gamestats_player_date")
+
+    def test_eligibility_season_lookup_uses_player_index(self):
+        self.assertIndexScan(GameStats.objects.filter(
+            player=self.players[1],
+            game_date__gte=datetime.date(2024, 1, 1),
+            game_date__lte=datetime.date(2024, 12, 31),
+        ), "gamestats_player_")  # Either player index covers a whole season
+
+
+def box_score_html(game_no, game_date, home, away):
+    """Builds a minimal box score page with the structure of the CPBL box page."""
+    batting_headers = ["Player"] + BATTING_STAT_KEYS
+    pitching_headers = ["Player"] + PITCHING_STAT_KEYS
+
+    def player_cell(team, i, position=""):
+        acnt = f"{team[:3]}{game_no % 2}{i:03d}"
+        return f'<td><span class="position">{position}</span><a href="/team/person?Acnt={acnt}">{team} {i}</a></td>'
+
+    def table(headers, rows):
+        header = "".join(f"<th>{h}</th>" for h in headers)
+        body = "".join(f"<tr>{row}</tr>" for row in rows)
+        totals = "".join("<td>0</td>" for _ in headers)
+        return f'<table class="RecordTable"><tbody><tr>{header}</tr>{body}<tr>{totals}</tr></tbody></table>'
+
+    def team_tab(team):
+        batters = [
+            player_cell(team, i, "SS") + "".join(
+                "<td>0.250</td>" if stat == "AVG" else "<td>(0)</td>" if stat == "IBB" else "<td>1</td>"
+                for stat in BATTING_STAT_KEYS
+            )
+            for i in range(9)
+        ]
+        pitchers = [
+            player_cell(team, 10 + i) + "".join(
+                "<td>52/3</td>" if stat == "IP" else "<td>1.50</td>" if stat in ("ERA", "WHIP") else "<td>1</td>"
+                for stat in PITCHING_STAT_KEYS
+            )
+            for i in range(2)
+        ]
+        return f'<div class="tab_cont">{table(batting_headers, batters)}{table(pitching_headers, pitchers)}</div>'
+
+    return f"""<html><body>
+        <input id="GameSno" value="{game_no}">
+        <div class="date">{game_date:%Y/%m/%d}</div>
+        <div class="GameBoxDetail tabs_group">
+            <div class="tabs"><a title="{home}">{home}</a><a title="{away}">{away}</a></div>
+            {team_tab(home)}{team_tab(away)}
+        </div>
+    </body></html>"""
+
+
+class BoxScoreFixtureServer(ThreadingHTTPServer):
+    """Serves saved box score pages by gameSno; game numbers in errors are a 500, every other one a 404."""
+
+    def __init__(self, pages, errors=()):
+        self.pages = pages
+        self.errors = set(errors)
+        self.hits = Counter()
+        super().__init__(("127.0.0.1", 0), BoxScoreFixtureHandler)
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class BoxScoreFixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        game_no = int(parse_qs(urlparse(self.path).query)["gameSno"][0])
+        self.server.hits[game_no] += 1
+        page = self.server.pages.get(game_no)
+        if game_no in self.server.errors:
+            self.send_response(500)
+            self.end_headers()
+            return
+        self.send_response(200 if page else 404)
+        self.end_headers()
+        if page:
+            self.wfile.write(page.encode())
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ConcurrentScrapeTests(TestCase):
+    def setUp(self):
+        opening_day = datetime.date(2024, 3, 30)
+        # Game 3 is missing (postponed), the season ends after game 5
+        self.server = BoxScoreFixtureServer({
+            game_no: box_score_html(game_no, opening_day + datetime.timedelta(days=game_no), "Lions", "Hawks")
+            for game_no in (1, 2, 4, 5)
+        })
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        cache_settings = override_settings(SCRAPER_CACHE_PATH=os.path.join(cache_dir.name, "pages.sqlite3"))
+        cache_settings.enable()
+        self.addCleanup(cache_settings.disable)
+
+    def scrape(self, backend="http", retries=2):
+        from scraper.game_scraper import scrape_year_concurrent
+
+        with redirect_stdout(io.StringIO()):
+            return scrape_year_concurrent(
+                2024, workers=3, backend=backend, max_gap=3, retries=retries, batch_size=2,
+                base_url=self.server.base_url,
+            )
+
+    def test_scrape_year_concurrent_skips_gaps(self):
+        self.scrape()
+
+        self.assertEqual(sorted(Game.objects.values_list('game_number', flat=True)), [1, 2, 4, 5])
+        self.assertEqual(GameStats.objects.count(), 4 * 2 * 11)
+        self.assertEqual(GameStats.objects.filter(role='pitcher', position='SP').count(), 4 * 2)
+        self.assertEqual(PitchingLine.objects.first().outs, 17)
+
+    def test_failed_fetches_dont_end_the_season(self):
+        self.server.errors = {6}
+        self.server.pages[9] = box_score_html(9, datetime.date(2024, 4, 8), "Lions", "Hawks")
+
+        # Game 6 failing isn't a gap: counted as missing along with 7 and 8, game 9 would never be asked for
+        self.assertEqual(self.scrape(retries=1), [6])
+        self.assertEqual(self.server.hits[6], 2)
+        self.assertIn(9, Game.objects.values_list('game_number', flat=True))
+
+    def test_rerun_serves_finished_games_from_cache(self):
+        self.scrape()
+        first_run = dict(self.server.hits)
+        GameStats.objects.update(stats={})
+
+        self.scrape()
+        # Finished games are neither downloaded nor written again
+        for game_no in (1, 2, 4, 5):
+            self.assertEqual(self.server.hits[game_no], first_run[game_no])
+        self.assertFalse(GameStats.objects.exclude(stats={}).exists())
+
+    def test_worker_that_cannot_start_fails_the_run(self):
+        # Every worker dying before taking a task used to leave the run waiting on results forever
+        with mock.patch("scraper.game_scraper.make_fetcher", side_effect=OSError("no browser")):
+            with self.assertRaises(RuntimeError) as raised:
+                self.scrape()
+        self.assertIsInstance(raised.exception.__cause__, OSError)
+        self.assertFalse(Game.objects.exists())
+
+    def test_replay_reparses_without_network(self):
+        self.scrape()
+        self.server.shutdown()
+        # A reset database gets every game written again from the cached pages
+        Game.objects.all().delete()
+
+        self.scrape(backend="replay")
+        self.assertEqual(sorted(Game.objects.values_list('game_number', flat=True)), [1, 2, 4, 5])
+
+
+class ListQueryCountTests(TestCase):
+    """Every list endpoint must run the same number of queries whatever the page size."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username="owner")
+        cls.league = FantasyLeague.objects.create(name="League", commissioner=cls.owner)
+        cls.cpbl_team = Team.objects.create(name="Lions")
+        cls.opponent = Team.objects.create(name="Hawks")
+
+    def add_rows(self, count):
+        """Adds count fantasy teams, each with two rostered players and a stat line for each."""
+        offset = FantasyTeam.objects.count()
+        for i in range(offset, offset + count):
+            team = FantasyTeam.objects.create(name=f"Team {i}", league=self.league, owner=self.owner)
+            game = Game.objects.create(
+                game_number=i, date=datetime.date(2024, 4, 1), home_team=self.cpbl_team, away_team=self.opponent,
+            )
+            for j in range(2):
+                player = Player.objects.create(
+                    name=f"Player {i}-{j}", team=self.cpbl_team, acnt=f"{i:04d}{j}", bats='R', throws='R',
+                )
+                FantasyRoster.objects.create(
+                    fantasy_team=team, player=player, start_date=datetime.date(2024, 3, 1), position='UTIL',
+                )
+                GameStats.objects.create(game=game, player=player, role='batter', position='SS', stats={"AB": 4})
+        # Written behind the API's back, like an ingest
+        bump_data_version()
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertConstantQueries(self, url):
+        self.add_rows(2)
+        small = self.count_queries(url)
+        self.add_rows(8)
+        self.assertEqual(self.count_queries(url), small, f"{url} runs more queries as the page grows")
+
+    def test_fantasy_teams(self):
+        self.assertConstantQueries("/api/fantasy-teams/")
+
+    def test_fantasy_rosters(self):
+        self.assertConstantQueries("/api/fantasy-rosters/")
+
+    def test_fantasy_roster_list_view(self):
+        self.assertConstantQueries("/api/api/fantasy-rosters/")
+
+    def test_players(self):
+        self.assertConstantQueries("/api/players/")
+
+    def test_game_stats(self):
+        self.assertConstantQueries("/api/game-stats/")
+
+    def test_nested_roster_shows_players(self):
+        self.add_rows(1)
+        team, = self.client.get("/api/fantasy-teams/").json()["results"]
+        self.assertEqual(len(team["roster"]), 2)
+        self.assertEqual(team["roster"][0]["player_detail"]["team_name"], "Lions")
+        self.assertEqual(team["owner_username"], "owner")
+
+
+class ResponseCacheTests(TestCase):
+    """Reference data is served from the response cache until the scraper bumps the data version."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.team = Team.objects.create(name="Lions")
+        cls.player = Player.objects.create(name="Player", team=cls.team, acnt="0000000001", bats='R', throws='R')
+
+    def setUp(self):
+        response_cache().clear()
+
+    def test_repeat_reads_skip_the_database(self):
+        first = self.client.get("/api/players/")
+        self.assertEqual(first.status_code, 200)
+        self.assertIn("max-age", first["Cache-Control"])
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get("/api/players/")
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second["ETag"], first["ETag"])
+
+    def test_matching_etag_gets_not_modified(self):
+        etag = self.client.get(f"/api/players/{self.player.id}/")["ETag"]
+        response = self.client.get(f"/api/players/{self.player.id}/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+
+    def test_version_bumped_by_another_process_serves_fresh_data(self):
+        # A second client on the same backend and location stands in for the scraper's process
+        scraper_cache = caches.create_connection(RESPONSE_CACHE)
+        etag = self.client.get("/api/teams/")["ETag"]
+        Team.objects.filter(pk=self.team.pk).update(name="Monkeys")
+
+        scraper_cache.incr(VERSION_KEY)
+        response = self.client.get("/api/teams/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["name"], "Monkeys")
+
+    def test_bumped_version_serves_fresh_data(self):
+        etag = self.client.get("/api/teams/")["ETag"]
+        Team.objects.filter(pk=self.team.pk).update(name="Monkeys")
+        self.assertEqual(self.client.get("/api/teams/", HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        bump_data_version()
+        response = self.client.get("/api/teams/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["name"], "Monkeys")
+        self.assertNotEqual(response["ETag"], etag)
+
+
+class InvalidationBusTests(TestCase):
+    """Changes to game lines and rosters are coalesced and refreshed once per commit."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username="owner")
+        league = FantasyLeague.objects.create(name="League", commissioner=owner)
+        cls.team = FantasyTeam.objects.create(name="Team", league=league, owner=owner)
+        cls.cpbl_team = Team.objects.create(name="Lions")
+        cls.players = [
+            Player.objects.create(name=f"Player {i}", team=cls.cpbl_team, acnt=f"{i:010d}", bats='R', throws='R')
+            for i in range(3)
+        ]
+        cls.rosters = [
+            FantasyRoster.objects.create(
+                fantasy_team=cls.team, player=player, start_date=datetime.date(2024, 3, 1), position='UTIL',
+            )
+            for player in cls.players
+        ]
+
+    def test_game_lines_refresh_rosters_and_team_once(self):
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            for number in range(1, 11):
+                game = Game.objects.create(
+                    game_number=number, date=datetime.date(2024, 4, number),
+                    home_team=self.cpbl_team, away_team=self.cpbl_team,
+                )
+                for player in self.players:
+                    GameStats.objects.create(game=game, player=player, role='batter', position='SS', stats={"AB": 4, "H": 1})
+        updates = [query["sql"] for query in queries if query["sql"].startswith('UPDATE "fantasy_fantasyteam"')]
+        self.assertEqual(len(updates), 1)
+
+        for roster in self.rosters:
+            roster.refresh_from_db()
+            self.assertEqual(roster.stats["batter"]["AB"], 40)
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.total_stats["batter"]["H"], 30)
+        self.assertEqual(self.team.total_stats["batter"]["AVG"], 0.25)
+
+    def test_batting_and_pitching_lines_are_kept_apart(self):
+        game = Game.objects.create(game_number=1, date=datetime.date(2024, 4, 1), home_team=self.cpbl_team, away_team=self.cpbl_team)
+        with self.captureOnCommitCallbacks(execute=True):
+            GameStats.objects.create(
+                game=game, player=self.players[0], role='batter', position='SS',
+                stats={"AB": 4, "H": 2, "R": 3, "SO": 2},
+            )
+            GameStats.objects.create(
+                game=game, player=self.players[1], role='pitcher', position='P',
+                stats={"IP": 3, "H": 4, "BB": 1, "R": 5, "ER": 5, "SO": 7},
+            )
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.total_stats["batter"]["R"], 3)
+        self.assertEqual(self.team.total_stats["pitcher"]["R"], 5)
+
+        # Runs and AVG from the batting lines, strikeouts, ERA and WHIP from the pitching ones
+        categories = get_standings(self.team.league)["teams"][0]["categories"]
+        self.assertEqual(categories["R"]["value"], 3)
+        self.assertEqual(categories["AVG"]["value"], 0.5)
+        self.assertEqual(categories["SO"]["value"], 7)
+        self.assertEqual(categories["ERA"]["value"], 15)
+        self.assertAlmostEqual(categories["WHIP"]["value"], 5 / 3)
+
+    def test_edited_line_refreshes_running_season_and_period_totals(self):
+        league = self.team.league
+        league.scoring_system = 'H2H'
+        league.start_date, league.end_date = datetime.date(2024, 4, 1), datetime.date(2024, 4, 14)
+        league.save()
+        generate_schedule(league)
+        player = self.players[0]
+        game = Game.objects.create(game_number=1, date=datetime.date(2024, 4, 9), home_team=self.cpbl_team, away_team=self.cpbl_team)
+
+        def totals():
+            period_stats = TeamPeriodStats.objects.get(fantasy_team=self.team, period__number=2).stats
+            return (
+                PlayerDailyTotals.window([player.id], None, datetime.date(2024, 4, 30)).get(player.id, {}).get("HR", 0),
+                BattingSeasonTotals.objects.filter(player=player, season=2024).values_list('hr', flat=True).first(),
+                period_stats.get("batter", {}).get("HR", 0),
+            )
+
+        with self.captureOnCommitCallbacks(execute=True):
+            line = GameStats.objects.create(game=game, player=player, role='batter', position='SS', stats={"AB": 4, "HR": 1})
+        self.assertEqual(totals(), (1, 1, 1))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            line.stats = {"AB": 4, "HR": 3}
+            line.save()
+        self.assertEqual(totals(), (3, 3, 3))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            line.delete()
+        self.assertEqual(totals(), (0, None, 0))
+
+    def test_line_changing_role_drops_its_old_typed_line(self):
+        player = self.players[0]
+        game = Game.objects.create(game_number=1, date=datetime.date(2024, 4, 1), home_team=self.cpbl_team, away_team=self.cpbl_team)
+        with self.captureOnCommitCallbacks(execute=True):
+            line = GameStats.objects.create(game=game, player=player, role='batter', position='SS', stats={"AB": 4, "H": 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            line.role, line.position, line.stats = 'pitcher', 'P', {"IP": 2, "SO": 3}
+            line.save()
+        self.assertFalse(BattingLine.objects.filter(game_stats=line).exists())
+        self.assertEqual(PitchingLine.objects.get(game_stats=line).so, 3)
+        self.assertFalse(BattingSeasonTotals.objects.filter(player=player).exists())
+        self.assertEqual(PitchingSeasonTotals.objects.get(player=player).so, 3)
+
+    def test_failed_refresh_keeps_its_keys(self):
+        game = Game.objects.create(game_number=1, date=datetime.date(2024, 4, 1), home_team=self.cpbl_team, away_team=self.cpbl_team)
+        with mock.patch("fantasy.invalidation.refresh", side_effect=RuntimeError("database went away")):
+            with self.assertRaises(RuntimeError), self.captureOnCommitCallbacks(execute=True):
+                GameStats.objects.create(game=game, player=self.players[0], role='batter', position='SS', stats={"AB": 4})
+
+        # The next dispatch retries what the failed one was given
+        dispatch()
+        self.rosters[0].refresh_from_db()
+        self.assertEqual(self.rosters[0].stats["batter"]["AB"], 4)
+
+    def test_standings_invalidated_from_another_process(self):
+        league = self.team.league
+        self.assertEqual(get_standings(league)["teams"][0]["categories"]["HR"]["value"], 0)
+        FantasyTeam.objects.filter(pk=self.team.pk).update(total_stats={"batter": {"HR": 3}})
+
+        # A second client on the same location stands in for the scraper's process
+        caches.create_connection("default").delete(standings_cache_key(league.id))
+        self.assertEqual(get_standings(league)["teams"][0]["categories"]["HR"]["value"], 3)
+
+    def test_matchup_scores_invalidated_from_another_process(self):
+        owner = self.team.owner
+        league = FantasyLeague.objects.create(
+            name="H2H", commissioner=owner, scoring_system='H2H',
+            start_date=datetime.date(2024, 4, 1), end_date=datetime.date(2024, 4, 7),
+        )
+        for name in ("Home", "Away"):
+            FantasyTeam.objects.create(name=name, league=league, owner=owner)
+        period, = generate_schedule(league)
+        matchup, = get_period_scores(league, period)["matchups"]
+        self.assertEqual(matchup["categories"]["HR"]["winner"], None)
+
+        TeamPeriodStats.objects.filter(period=period, fantasy_team=matchup["home_team"]).update(stats={"batter": {"HR": 2}})
+        caches.create_connection("default").delete(matchup_cache_key(period.id))
+        matchup, = get_period_scores(league, period)["matchups"]
+        self.assertEqual(matchup["categories"]["HR"]["winner"], "home")
+
+    def test_benched_roster_leaves_team_totals(self):
+        game = Game.objects.create(game_number=1, date=datetime.date(2024, 4, 1), home_team=self.cpbl_team, away_team=self.cpbl_team)
+        with self.captureOnCommitCallbacks(execute=True):
+            for player in self.players:
+                GameStats.objects.create(game=game, player=player, role='batter', position='SS', stats={"AB": 4})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            roster = self.rosters[0]
+            roster.position = 'BN'
+            roster.save()
+        self.team.refresh_from_db()
+        self.assertEqual(self.team.total_stats["batter"]["AB"], 8)
+
+
+class SnapshotTests(TestCase):
+    """Daily snapshots store only what the league's categories need, per role."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username="owner")
+        cls.league = FantasyLeague.objects.create(
+            name="League", commissioner=owner, settings={"categories": ["R", "AVG", "SO", "WHIP"]},
+            start_date=datetime.date(2024, 4, 1), end_date=datetime.date(2024, 9, 30),
+        )
+        cls.team = FantasyTeam.objects.create(name="Team", league=cls.league, owner=owner)
+        cpbl_team = Team.objects.create(name="Lions")
+        batter, pitcher = [
+            Player.objects.create(name=name, team=cpbl_team, acnt=f"{i:010d}", bats='R', throws='R')
+            for i, name in enumerate(["Batter", "Pitcher"])
+        ]
+        for player in (batter, pitcher):
+            FantasyRoster.objects.create(
+                fantasy_team=cls.team, player=player, start_date=datetime.date(2024, 3, 1), position='UTIL',
+            )
+        game = Game.objects.create(game_number=1, date=datetime.date(2024, 4, 2), home_team=cpbl_team, away_team=cpbl_team)
+        GameStats.objects.create(
+            game=game, player=batter, role='batter', position='SS', stats={"AB": 4, "H": 2, "R": 3, "SO": 2, "HR": 1},
+        )
+        GameStats.objects.create(
+            game=game, player=pitcher, role='pitcher', position='P', stats={"IP": 3, "H": 4, "BB": 1, "R": 5, "SO": 7},
+        )
+
+    def test_only_category_components_are_stored(self):
+        self.assertEqual(snapshot_league(self.league, datetime.date(2024, 4, 3)), 3)
+        stored = set(TeamStatSnapshot.objects.values_list('role', 'category').distinct())
+        self.assertEqual(stored, {
+            ('batter', 'R'), ('batter', 'H'), ('batter', 'AB'),
+            ('pitcher', 'SO'), ('pitcher', 'H'), ('pitcher', 'BB'), ('pitcher', 'IP'),
+        })
+
+        categories = standings_on(self.league, datetime.date(2024, 4, 3), ["R", "AVG", "SO", "WHIP"])["teams"][0]["categories"]
+        self.assertEqual(
+            {category: value["value"] for category, value in categories.items()},
+            {"R": 3, "AVG": 0.5, "SO": 7, "WHIP": 5 / 3},
+        )
+        series = category_trends(self.league, ["WHIP"], datetime.date(2024, 4, 1), datetime.date(2024, 4, 3))["teams"][0]["series"]
+        self.assertEqual([point["WHIP"] for point in series], [0, 5 / 3, 5 / 3])
+
+    def test_new_category_refills_the_snapshots(self):
+        snapshot_league(self.league, datetime.date(2024, 4, 3))
+        self.league.settings = {"categories": ["R", "HR", "AVG", "SO", "WHIP"]}
+        self.league.save()
+
+        self.assertEqual(snapshot_league(self.league, datetime.date(2024, 4, 4)), 4)
+        hr = TeamStatSnapshot.objects.filter(role='batter', category='HR').order_by('date')
+        self.assertEqual([row.value for row in hr], [0, 1, 1, 1])
+
+
+class EligibilityTests(TestCase):
+    """Position eligibility from a season's game lines."""
+
+    def test_rules(self):
+        # 20 games at a position always qualify; 19 of 100 don't
+        self.assertIn("SS", eligible_positions({"SS": 20}, 100, 0, 0))
+        self.assertNotIn("SS", eligible_positions({"SS": 19}, 100, 0, 0))
+        # Otherwise a quarter of the player's games, and at least 5
+        self.assertIn("SS", eligible_positions({"SS": 5}, 20, 0, 0))
+        self.assertNotIn("SS", eligible_positions({"SS": 4}, 16, 0, 0))
+        self.assertNotIn("SS", eligible_positions({"SS": 6}, 25, 0, 0))
+
+        self.assertEqual(eligible_positions({}, 5, 5, 0), ["SP", "P", "UTIL"])
+        self.assertEqual(eligible_positions({}, 4, 4, 0), ["UTIL"])
+        self.assertEqual(eligible_positions({}, 8, 0, 8), ["RP", "P", "UTIL"])
+        self.assertEqual(eligible_positions({}, 7, 0, 7), ["UTIL"])
+        self.assertEqual(eligible_positions({}, 13, 5, 8), ["SP", "P", "RP", "UTIL"])
+
+    def test_derived_slots(self):
+        self.assertEqual(eligible_positions({"1B": 20}, 20, 0, 0), ["1B", "CI", "IF", "UTIL"])
+        self.assertEqual(eligible_positions({"3B": 20}, 20, 0, 0), ["3B", "CI", "IF", "UTIL"])
+        self.assertEqual(eligible_positions({"2B": 20}, 20, 0, 0), ["2B", "MI", "IF", "UTIL"])
+        self.assertEqual(eligible_positions({"SS": 20}, 20, 0, 0), ["SS", "MI", "IF", "UTIL"])
+        self.assertEqual(eligible_positions({"CF": 20}, 20, 0, 0), ["CF", "OF", "UTIL"])
+        # Played at OF directly and through a field position, listed once
+        self.assertEqual(eligible_positions({"OF": 10, "LF": 10}, 20, 0, 0), ["LF", "OF", "UTIL"])
+        self.assertEqual(eligible_positions({"C": 20}, 20, 0, 0), ["C", "UTIL"])
+
+    def test_primary_position_is_kept(self):
+        self.assertEqual(eligible_positions({"LF": 20}, 20, 0, 0, "C"), ["LF", "OF", "UTIL", "C"])
+        self.assertEqual(eligible_positions({"C": 20}, 20, 0, 0, "C"), ["C", "UTIL"])
+
+        cpbl_team = Team.objects.create(name="Lions")
+        player = Player.objects.create(name="Catcher", team=cpbl_team, acnt="0000000001", bats='R', throws='R', position='C')
+        game = Game.objects.create(game_number=1, date=datetime.date(2024, 4, 1), home_team=cpbl_team, away_team=cpbl_team)
+        GameStats.objects.create(game=game, player=player, role='batter', position='DH', stats={})
+        update_eligibility(2024, [player.id])
+        player.refresh_from_db()
+        self.assertEqual(player.eligible_positions, ["UTIL", "C"])
+
+    def test_parsed_positions_match_the_string_parser(self):
+        cpbl_team = Team.objects.create(name="Lions")
+        players = [
+            Player.objects.create(name=f"Player {i}", team=cpbl_team, acnt=f"{i:010d}", bats='R', throws='R')
+            for i in range(4)
+        ]
+        games = Game.objects.bulk_create([
+            Game(game_number=number, date=datetime.date(2024, 4, 1) + datetime.timedelta(days=number),
+                 home_team=cpbl_team, away_team=cpbl_team)
+            for number in range(1, 31)
+        ])
+        raw_positions = {
+            'batter': ["SS", "ss", "2B (SS)", "PH (1B)", "LF (CF,RF)", "DH", " 3B ", "PR (2B)"],
+            'pitcher': ["P", "SP", "Starter", "RP", "P (start)"],
+        }
+        generator = random.Random(7)
+        # Unparsed, as the lines stood before the positions column existed
+        GameStats.objects.bulk_create([
+            GameStats(
+                game=game, game_date=game.date, player=player, role=role,
+                position=generator.choice(raw_positions[role]), stats={},
+            )
+            for game in games
+            for player in players
+            for role in raw_positions
+            if generator.random() < 0.8
+        ])
+        fill_positions(GameStats.objects.all())
+
+        # Counted from the position strings, as the eligibility rules did before
+        expected = {}
+        for player_id, role, raw_position, line_count in GameStats.objects.values_list(
+            'player_id', 'role', 'position'
+        ).annotate(lines=Count('id')).order_by():
+            position_counts, starts, relief_appearances = expected.setdefault(player_id, ({}, [0], [0]))
+            if role == 'pitcher':
+                (starts if is_start(raw_position) else relief_appearances)[0] += line_count
+            for position in parse_position(raw_position):
+                position_counts[position] = position_counts.get(position, 0) + line_count
+
+        counts = season_counts(2024)
+        for player in players:
+            position_counts, games_played, starts, relief_appearances = counts[player.id]
+            string_counts, string_starts, string_relief = expected[player.id]
+            self.assertEqual(
+                eligible_positions(position_counts, games_played, starts, relief_appearances),
+                eligible_positions(string_counts, games_played, string_starts[0], string_relief[0]),
+            )
+
+
+class FreeAgentTests(TestCase):
+    """The free agent search over the rolling stats."""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create(username="owner")
+        cls.league = FantasyLeague.objects.create(name="League", commissioner=owner)
+        team = FantasyTeam.objects.create(name="Team", league=cls.league, owner=owner)
+        cpbl_team = Team.objects.create(name="Lions")
+        cls.today = datetime.date.today()
+        game = Game.objects.create(game_number=1, date=cls.today, home_team=cpbl_team, away_team=cpbl_team)
+
+        def player(name, positions, role, stats):
+            created = Player.objects.create(
+                name=name, team=cpbl_team, acnt=name.lower().replace(" ", ""), bats='R', throws='R',
+                eligible_positions=positions,
+            )
+            GameStats.objects.create(game=game, player=created, role=role, position=positions[0], stats=stats)
+            return created
+
+        cls.shortstop = player("Shortstop", ["SS", "UTIL"], 'batter', {"AB": 4, "H": 2})
+        cls.slugger = player("Slugger", ["OF", "UTIL"], 'batter', {"AB": 4, "H": 3})
+        cls.contact = player("Contact", ["SS", "UTIL"], 'batter', {"AB": 4, "H": 2})
+        cls.rostered = player("Rostered", ["SS", "UTIL"], 'batter', {"AB": 4, "H": 4})
+        cls.ace = player("Ace", ["SP", "P"], 'pitcher', {"IP": 6, "ER": 1, "SO": 8})
+        cls.starter = player("Starter", ["SP", "P"], 'pitcher', {"IP": 3, "ER": 4, "SO": 2})
+        cls.no_outs = player("No outs", ["RP", "P"], 'pitcher', {"IP": 0, "ER": 2, "SO": 0})
+        FantasyRoster.objects.create(fantasy_team=team, player=cls.rostered, start_date=cls.today, position='SS')
+        PlayerDailyTotals.rebuild(Player.objects.values_list('id', flat=True))
+        refresh_rolling_stats(cls.today)
+
+    def names(self, page):
+        return [result["name"] for result in page["results"]]
+
+    def test_rows_only_for_roles_played_and_defined_rates(self):
+        self.assertFalse(PlayerRollingStat.objects.filter(player=self.shortstop, role='pitcher').exists())
+        self.assertFalse(PlayerRollingStat.objects.filter(player=self.no_outs, category__in=["ERA", "WHIP"]).exists())
+        self.assertTrue(PlayerRollingStat.objects.filter(player=self.no_outs, category="SO").exists())
+
+    def test_rostered_and_ineligible_players_are_left_out(self):
+        page = free_agents(self.league, category="H", days=7, position="SS")
+        self.assertEqual(self.names(page), ["Shortstop", "Contact"])
+
+    def test_pages_follow_value_then_player_order(self):
+        names, cursor = [], None
+        while True:
+            page = free_agents(self.league, category="H", days=7, limit=1, cursor=cursor)
+            names += self.names(page)
+            cursor = page["next"]
+            if not cursor:
+                break
+        self.assertEqual(names, ["Slugger", "Shortstop", "Contact"])
+
+    def test_rates_sort_lower_is_better_first(self):
+        page = free_agents(self.league, role='pitcher', category="ERA", days=7)
+        self.assertEqual(self.names(page), ["Ace", "Starter"])
+        self.assertEqual(page["results"][0]["value"], 1.5)
+
+
+class LeaderboardTests(TestCase):
+    """Pitchers without an out have no ERA or WHIP and rank last in either order."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cpbl_team = Team.objects.create(name="Lions")
+        game = Game.objects.create(game_number=1, date=datetime.date(2024, 4, 2), home_team=cpbl_team, away_team=cpbl_team)
+        with cls.captureOnCommitCallbacks(execute=True):
+            for i, (name, stats) in enumerate([
+                ("Ace", {"IP": 6, "ER": 1}),
+                ("Starter", {"IP": 3, "ER": 4}),
+                ("No outs", {"IP": 0, "ER": 2}),
+                ("Reliever", {"IP": 1, "ER": 0}),
+            ]):
+                player = Player.objects.create(name=name, team=cpbl_team, acnt=f"{i:010d}", bats='R', throws='R')
+                GameStats.objects.create(game=game, player=player, role='pitcher', position='P', stats=stats)
+
+    def pages(self, **options):
+        names, cursor = [], None
+        while True:
+            page = leaderboard('pitcher', "ERA", limit=1, cursor=cursor, **options)
+            names += [result["name"] for result in page["results"]]
+            cursor = page["next"]
+            if not cursor:
+                return names
+
+    def test_undefined_rates_rank_last(self):
+        window = {"start": datetime.date(2024, 4, 1), "end": datetime.date(2024, 4, 30)}
+        for options in [{"season": 2024}, window]:
+            self.assertEqual(self.pages(**options), ["Reliever", "Ace", "Starter", "No outs"], options)
+            self.assertEqual(
+                self.pages(descending=True, **options), ["Starter", "Ace", "Reliever", "No outs"], options,
+            )
+        self.assertIsNone(PitchingSeasonTotals.objects.get(player__name="No outs").era)
+
+
+class RosterMoveTests(TestCase):
+    """Roster moves close and open stints, keep lineups legal and move only the affected stats."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create(username="owner")
+        cls.rival = User.objects.create(username="rival")
+        cls.league = FantasyLeague.objects.create(
+            name="League", commissioner=cls.owner,
+            settings={"roster_slots": {"SS": 1, "OF": 1, "UTIL": 1, "BN": 1}},
+        )
+        cls.team = FantasyTeam.objects.create(name="Team", league=cls.league, owner=cls.owner)
+        cls.other = FantasyTeam.objects.create(name="Other", league=cls.league, owner=cls.rival)
+        cpbl_team = Team.objects.create(name="Lions")
+        cls.shortstop, cls.outfielder, cls.free_agent = [
+            Player.objects.create(
+                name=name, team=cpbl_team, acnt=f"{i:010d}", bats='R', throws='R', eligible_positions=positions,
+            )
+            for i, (name, positions) in enumerate([
+                ("Shortstop", ["SS", "UTIL"]), ("Outfielder", ["OF", "UTIL"]), ("Free agent", ["SS", "OF", "UTIL"]),
+            ])
+        ]
+        game = Game.objects.create(game_number=1, date=datetime.date.today(), home_team=cpbl_team, away_team=cpbl_team)
+        for player in [cls.shortstop, cls.outfielder, cls.free_agent]:
+            GameStats.objects.create(game=game, player=player, role='batter', position='SS', stats={"AB": 4, "H": 2})
+        PlayerDailyTotals.rebuild([cls.shortstop.id, cls.outfielder.id, cls.free_agent.id])
+
+    def setUp(self):
+        self.client.force_login(self.owner)
+        FantasyRoster.objects.create(
+            fantasy_team=self.team, player=self.shortstop, start_date=datetime.date(2024, 3, 1),
+            position='SS', stats={"batter": {"AB": 4, "H": 2}},
+        )
+        FantasyTeam.objects.filter(pk=self.team.pk).update(total_stats={"batter": {"AB": 4, "H": 2}})
+
+    def move(self, fantasy_team, **data):
+        return self.client.post(f"/api/fantasy-teams/{fantasy_team.id}/moves/", data, content_type="application/json")
+
+    def test_add_fills_the_open_slot_and_counts_todays_games(self):
+        response = self.move(self.team, type="add", player=self.free_agent.id)
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(response.json()["opened"][0]["position"], "OF")
+        self.assertEqual(response.json()["total_stats"]["batter"]["AB"], 8)
+
+    def test_swap_closes_the_old_stint(self):
+        self.move(self.team, type="add", player=self.free_agent.id, position="BN")
+        # The free agent's bench stint hasn't started yet and is replaced; the move keeps the
+        # team totals itself, without the invalidation bus summing the team again
+        with mock.patch("fantasy.invalidation.refresh") as refresh, self.captureOnCommitCallbacks(execute=True):
+            response = self.move(self.team, type="swap", changes=[
+                {"player": self.shortstop.id, "position": "BN"}, {"player": self.free_agent.id, "position": "SS"},
+            ])
+        self.assertEqual(response.status_code, 200, response.content)
+        refresh.assert_not_called()
+        self.assertFalse(FantasyRoster.objects.filter(player=self.free_agent, position="BN").exists())
+        stints = FantasyRoster.objects.filter(fantasy_team=self.team, player=self.shortstop).order_by('id')
+        self.assertEqual([(stint.position, stint.end_date) for stint in stints], [
+            ('SS', datetime.date.today()), ('BN', None),
+        ])
+        self.assertEqual(stints[0].stats["batter"]["AB"], 0)
+        self.assertEqual(response.json()["total_stats"]["batter"]["AB"], 4)
+
+    def test_malformed_bodies_are_rejected_per_field(self):
+        cases = [
+            ({"type": "add"}, "player"),
+            ({"type": "add", "player": "abc"}, "player"),
+            ({"type": "swap", "changes": [{"player": self.shortstop.id}]}, "changes"),
+            ({"type": "trade", "team": self.other.id, "send": ["x"]}, "send"),
+            ({"type": "waive", "player": self.shortstop.id}, "type"),
+        ]
+        for body, field in cases:
+            response = self.move(self.team, **body)
+            self.assertEqual(response.status_code, 400, body)
+            self.assertIn(field, response.json(), body)
+
+    def test_ineligible_or_full_lineups_are_rejected(self):
+        response = self.move(self.team, type="add", player=self.outfielder.id, position="SS")
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(FantasyRoster.objects.filter(player=self.outfielder).exists())
+
+        self.move(self.other, type="add", player=self.outfielder.id)
+        self.assertEqual(self.move(self.team, type="add", player=self.outfielder.id).status_code, 400)
+
+    def test_trade_moves_players_between_teams(self):
+        self.client.force_login(self.rival)
+        self.move(self.other, type="add", player=self.outfielder.id)
+        self.client.force_login(self.owner)
+        response = self.move(self.team, type="trade", team=self.other.id, send=[self.shortstop.id], receive=[self.outfielder.id])
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(
+            set(FantasyRoster.objects.filter(end_date__isnull=True).values_list('fantasy_team_id', 'player_id', 'position')),
+            {(self.team.id, self.outfielder.id, 'OF'), (self.other.id, self.shortstop.id, 'SS')},
+        )
+
+
+class LineupTests(TestCase):
+    """The lineup solver finds the best assignment and sets every team of a large league in a few queries."""
+
+    SLOTS = {"C": 1, "1B": 1, "2B": 1, "3B": 1, "SS": 1, "CI": 1, "MI": 1, "OF": 3, "UTIL": 1,
+             "SP": 2, "RP": 2, "P": 3, "BN": 5}
+    ELIGIBILITY = [
+        ["C", "UTIL"], ["1B", "CI", "IF", "UTIL"], ["2B", "SS", "MI", "IF", "UTIL"], ["3B", "CI", "IF", "UTIL"],
+        ["SS", "MI", "IF", "UTIL"], ["1B", "3B", "CI", "IF", "UTIL"], ["2B", "MI", "IF", "UTIL"],
+        ["LF", "OF", "UTIL"], ["CF", "OF", "UTIL"], ["RF", "OF", "UTIL"], ["OF", "1B", "CI", "IF", "UTIL"],
+        ["C", "1B", "CI", "IF", "UTIL"], ["OF", "UTIL"], ["2B", "3B", "CI", "MI", "IF", "UTIL"],
+        ["SP", "P"], ["SP", "P"], ["SP", "P"], ["RP", "P"], ["RP", "P"], ["RP", "P"], ["SP", "RP", "P"], ["RP", "P"],
+    ]
+
+    def test_hungarian_matches_brute_force(self):
+        rng = random.Random(7)
+        for rows, columns in [(3, 3), (4, 6), (5, 7)]:
+            cost = [[rng.randint(0, 20) for _ in range(columns)] for _ in range(rows)]
+            best = min(
+                sum(cost[row][column] for row, column in enumerate(columns_used))
+                for columns_used in itertools.permutations(range(columns), rows)
+            )
+            assignment = hungarian(np.array(cost, dtype=float))
+            self.assertEqual(len(set(assignment)), rows)
+            self.assertEqual(sum(cost[row][column] for row, column in enumerate(assignment)), best)
+
+    def seed_league(self, teams):
+        owner = User.objects.create(username=f"commissioner{teams}")
+        league = FantasyLeague.objects.create(name=f"{teams} teams", commissioner=owner, settings={"roster_slots": self.SLOTS})
+        cpbl_team = Team.objects.create(name=f"Lions {teams}")
+        fantasy_teams = FantasyTeam.objects.bulk_create([
+            FantasyTeam(name=f"Team {i}", league=league, owner=owner) for i in range(teams)
+        ])
+        players = Player.objects.bulk_create([
+            Player(
+                name=f"Player {i}-{j}", team=cpbl_team, acnt=f"{teams:02d}{i:02d}{j:03d}", bats='R', throws='R',
+                eligible_positions=positions,
+            )
+            for i in range(teams)
+            for j, positions in enumerate(self.ELIGIBILITY)
+        ])
+        rng = random.Random(teams)
+        PlayerRollingStat.objects.bulk_create([
+            PlayerRollingStat(player=player, role=role, days=14, category=category, value=rng.randint(0, 30), date=datetime.date.today())
+            for player in players
+            for role, categories in [('batter', ["R", "HR", "RBI", "SB", "H", "AB"]), ('pitcher', ["SO", "ER", "IP"])]
+            for category in categories
+        ])
+        # Everyone starts on the bench, so the solver has the whole lineup to set
+        FantasyRoster.objects.bulk_create([
+            FantasyRoster(
+                fantasy_team=fantasy_teams[index // len(self.ELIGIBILITY)], player=player,
+                position='BN', start_date=datetime.date(2024, 3, 1), stats={},
+            )
+            for index, player in enumerate(players)
+        ])
+        return league
+
+    def test_benchmark_sets_12_and_20_team_leagues(self):
+        for teams in [12, 20]:
+            league = self.seed_league(teams)
+            started = time.perf_counter()
+            with CaptureQueriesContext(connection) as queries:
+                lineups = optimal_lineups(league)
+            elapsed = time.perf_counter() - started
+
+            self.assertEqual(len(lineups), teams)
+            self.assertLessEqual(len(queries), 3)
+            # A generous bound, machines differ: it only catches a solver gone much slower
+            self.assertLess(elapsed, 5, f"optimal_lineups: {teams} teams took {elapsed:.2f}s")
+            for lineup in lineups.values():
+                counts = Counter(lineup["lineup"].values())
+                # 22 players for 18 lineup spots; a player hurting the ratios may sit rather than play
+                self.assertEqual(sum(counts.values()), len(self.ELIGIBILITY))
+                self.assertGreaterEqual(counts["BN"], 4)
+                self.assertTrue(all(counts[slot] <= self.SLOTS[slot] for slot in counts))
+
+    def test_post_sets_the_lineups(self):
+        league = self.seed_league(12)
+        self.client.force_login(league.commissioner)
+        proposed = self.client.get(f"/api/fantasy-leagues/{league.id}/lineups/").json()
+        response = self.client.post(f"/api/fantasy-leagues/{league.id}/lineups/", {}, content_type="application/json")
+        self.assertEqual(response.status_code, 200, response.content)
+
+        open_stints = FantasyRoster.objects.filter(fantasy_team__league=league, end_date__isnull=True)
+        for team in proposed:
+            self.assertEqual(
+                set(open_stints.filter(fantasy_team_id=team["fantasy_team"]).values_list('player_id', 'position')),
+                {(entry["player"], entry["position"]) for entry in team["lineup"]},
+            )
+        # Already optimal, so a second run changes nothing
+        self.assertTrue(all(not lineup["changes"] for lineup in optimal_lineups(league).values()))
+
+    def test_command_continues_past_a_failing_league(self):
+        owner = User.objects.create(username="commissioner")
+        broken = FantasyLeague.objects.create(name="Broken", commissioner=owner, settings={"roster_slots": {"SS": 1}})
+        team = FantasyTeam.objects.create(name="Crowded", league=broken, owner=owner)
+        cpbl_team = Team.objects.create(name="Lions")
+        for i in range(2):
+            player = Player.objects.create(
+                name=f"Shortstop {i}", team=cpbl_team, acnt=f"{i:010d}", bats='R', throws='R', eligible_positions=["SS"],
+            )
+            FantasyRoster.objects.create(fantasy_team=team, player=player, position='SS', start_date=datetime.date(2024, 3, 1))
+        league = self.seed_league(12)
+
+        stdout, stderr = io.StringIO(), io.StringIO()
+        with self.assertRaises(CommandError):
+            call_command("set_lineups", league=[broken.id, league.id], stdout=stdout, stderr=stderr)
+        self.assertIn("Broken: 2 players don't fit", stderr.getvalue())
+        self.assertIn(f"{league.name}: Moved", stdout.getvalue())
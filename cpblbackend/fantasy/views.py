@@ -1,16 +1,97 @@
+import datetime
+
 from rest_framework import viewsets, generics
-from .models import Team, Player, FantasyTeam, FantasyLeague, Game, GameStats, FantasyRoster
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound, PermissionDenied, ValidationError
+from rest_framework.response import Response
+from .models import (
+    Team, Player, FantasyTeam, FantasyLeague, Game, GameStats, FantasyRoster, PlayerDailyTotals, RoleChoices,
+    calculate_role_rate_stats, sum_roster_stats,
+)
 from .serializers import (
     TeamSerializer, PlayerSerializer, FantasyTeamSerializer, GameSerializer,
     GameStatsSerializer, FantasyLeagueSerializer, FantasyRosterSerializer
-    , UserSerializer
+    , UserSerializer, FantasyRosterReadSerializer, FantasyTeamReadSerializer, RosterMoveSerializer
 )
 from django.contrib.auth.models import User
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import JSONField, Prefetch
+from django.http import StreamingHttpResponse
 from rest_framework.permissions import IsAuthenticated, IsAdminUser, IsAuthenticatedOrReadOnly
 from .permissions import IsAdminOrReadOnly, IsOwnerOrReadOnly
 from django_filters.rest_framework import DjangoFilterBackend
+from django.utils.dateparse import parse_date
+from .exports import CONTENT_TYPES, export_chunks, export_lines
+from .free_agents import ROLLING_WINDOWS, free_agents
+from .leaderboards import leaderboard
+from .lineups import ROLLING_DAYS, optimal_lineups, set_optimal_lineups
+from .matchups import current_period, generate_schedule, get_period_scores
+from .response_cache import CachedResponseMixin, cached_response
+from .roster_moves import RosterMove
+from .snapshots import category_trends, standings_on
+from .standings import get_standings, league_categories
+
+
+def date_param(request, name, default=None):
+    """Reads an optional YYYY-MM-DD query parameter."""
+    value = request.query_params.get(name)
+    if not value:
+        return default
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed is None:
+        raise ValidationError({name: "Expected a date formatted as YYYY-MM-DD."})
+    return parsed
+
+class SparseFieldsetMixin:
+    """
+    Lets list and detail requests pick the serialized fields with ?fields=a,b or drop
+    some with ?omit=a,b. JSON and array columns nobody asked for are also deferred, so
+    large stats blobs are neither read nor sent.
+    """
+    DEFERRABLE_FIELDS = (JSONField, ArrayField)
+
+    def sparse_fieldset_requested(self):
+        # Plain generic views have no action and only list
+        return getattr(self, 'action', 'list') in ['list', 'retrieve'] and (
+            'fields' in self.request.query_params or 'omit' in self.request.query_params
+        )
+
+    def kept_fields(self, available):
+        params = self.request.query_params
+        kept = set(available)
+        if params.get('fields'):
+            kept &= set(params['fields'].split(','))
+        if params.get('omit'):
+            kept -= set(params['omit'].split(','))
+        return kept
 
-class UserListView(viewsets.ModelViewSet):
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        if self.sparse_fieldset_requested():
+            fields = getattr(serializer, 'child', serializer).fields
+            kept = self.kept_fields(fields)
+            for name in list(fields):
+                if name not in kept:
+                    fields.pop(name)
+        return serializer
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if not self.sparse_fieldset_requested():
+            return queryset
+
+        fields = self.get_serializer_class()(context=self.get_serializer_context()).fields
+        sources = {fields[name].source.split('.')[0] for name in self.kept_fields(fields)}
+        deferred = [
+            field.name for field in queryset.model._meta.concrete_fields
+            if isinstance(field, self.DEFERRABLE_FIELDS) and field.name not in sources
+        ]
+        return queryset.defer(*deferred) if deferred else queryset
+
+class UserListView(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = User.objects.all()
     serializer_class = UserSerializer
     class Meta:
@@ -19,12 +100,12 @@ class UserListView(viewsets.ModelViewSet):
     # permission_classes = [IsAuthenticated]  # Require authentication to access
 
 
-class TeamViewSet(viewsets.ModelViewSet):
+class TeamViewSet(CachedResponseMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Team.objects.all()
     serializer_class = TeamSerializer
     permission_classes = [IsAdminOrReadOnly]
 
-class PlayerViewSet(viewsets.ModelViewSet):
+class PlayerViewSet(CachedResponseMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Player.objects.all()
     serializer_class = PlayerSerializer
     
@@ -34,44 +115,372 @@ class PlayerViewSet(viewsets.ModelViewSet):
         context.update({"request": self.request})
         return context
 
-class GameViewSet(viewsets.ModelViewSet):
+    @action(detail=True, methods=['get'])
+    @cached_response
+    def stats(self, request, pk=None):
+        """
+        The player's stats over a date window, from the daily running totals.
+
+        Query params: from and to (inclusive, default all games through today) and role.
+        """
+        player = self.get_object()
+        start = date_param(request, "from")
+        end = date_param(request, "to", datetime.date.today())
+        role = request.query_params.get("role")
+        if role and role not in RoleChoices.values:
+            raise ValidationError({"role": f"Expected one of {', '.join(RoleChoices.values)}."})
+
+        totals = PlayerDailyTotals.window([player.id], start, end, [role] if role else None)
+        return Response({
+            "player": player.id, "from": start, "to": end, "role": role,
+            "stats": totals.get(player.id, {}),
+        })
+
+    @action(detail=False, methods=['get'])
+    @cached_response
+    def leaderboard(self, request):
+        """
+        Players ranked by one category, keyset paginated.
+
+        Query params: role (batter/pitcher), category (e.g. HR, ERA), order (asc/desc, default
+        by category), season (default this year) or a from/to date window, min_<category>
+        qualifiers (e.g. min_IP=30), team, position, limit and cursor.
+        """
+        params = request.query_params
+        try:
+            season = int(params.get("season", datetime.date.today().year))
+            limit = int(params.get("limit", 50))
+            team = int(params["team"]) if params.get("team") else None
+            qualifiers = {key[len("min_"):]: float(value) for key, value in params.items() if key.startswith("min_")}
+        except ValueError:
+            raise ValidationError("season, limit, team and min_ qualifiers must be numbers.")
+
+        start = date_param(request, "from")
+        end = date_param(request, "to")
+        if start and not end:
+            end = datetime.date.today()
+
+        order = params.get("order")
+        if order not in (None, "asc", "desc"):
+            raise ValidationError({"order": "Expected asc or desc."})
+
+        try:
+            page = leaderboard(
+                params.get("role", RoleChoices.BATTER), params.get("category"), season=season,
+                start=start, end=end, descending=None if order is None else order == "desc",
+                qualifiers=qualifiers, team=team, position=params.get("position"),
+                limit=limit, cursor=params.get("cursor"),
+            )
+        except ValueError as e:
+            raise ValidationError(str(e))
+        return Response(page)
+
+class GameViewSet(CachedResponseMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = Game.objects.all()
     serializer_class = GameSerializer
     permission_classes = [IsAdminOrReadOnly]
 
-class GameStatsViewSet(viewsets.ModelViewSet):
+class GameStatsViewSet(CachedResponseMixin, SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = GameStats.objects.all()
     serializer_class = GameStatsSerializer
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['player', 'game', 'role']
 
-class FantasyLeagueViewSet(viewsets.ModelViewSet):
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Streams every game line of a season or date range as a file download.
+
+        Query params: output (ndjson, csv, parquet or arrow; named so it doesn't clash with
+        DRF's format suffix), season, from, to, role and gzip=1 to compress on the fly.
+        """
+        params = request.query_params
+        export_format = params.get("output", "ndjson")
+        role = params.get("role")
+        if role and role not in RoleChoices.values:
+            raise ValidationError({"role": f"Expected one of {', '.join(RoleChoices.values)}."})
+        season = params.get("season")
+        if season and not season.isdigit():
+            raise ValidationError({"season": "Expected a year."})
+        gzip = params.get("gzip") in ["1", "true"]
+
+        lines = export_lines(season=season, start=date_param(request, "from"), end=date_param(request, "to"), role=role)
+        try:
+            chunks = export_chunks(export_format, lines, gzip=gzip)
+        except ValueError as e:
+            raise ValidationError({"output": str(e)})
+        except ImportError:
+            raise ValidationError({"output": f"{export_format} export needs pyarrow installed on the server."})
+
+        filename = f"game-stats{'-' + season if season else ''}.{export_format}{'.gz' if gzip else ''}"
+        response = StreamingHttpResponse(chunks, content_type="application/gzip" if gzip else CONTENT_TYPES[export_format])
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        return response
+
+class FantasyLeagueViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
     queryset = FantasyLeague.objects.all()
     serializer_class = FantasyLeagueSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
-class FantasyTeamViewSet(viewsets.ModelViewSet):
-    queryset = FantasyTeam.objects.all()
+    @action(detail=True, methods=['get'])
+    def standings(self, request, pk=None):
+        """
+        Rotisserie standings of the league, served from the cache until a team total changes.
+        With ?date=YYYY-MM-DD, the standings at the end of that date from the daily snapshots.
+        """
+        league = self.get_object()
+        date = date_param(request, "date")
+        if date:
+            return Response(standings_on(league, date, league_categories(league)))
+        return Response(get_standings(league))
+
+    @action(detail=True, methods=['get'])
+    def trends(self, request, pk=None):
+        """
+        Daily cumulative category values of every team, from the snapshots.
+
+        Query params: categories (comma separated, defaults to the league's; only the league's
+        categories are snapshotted), from and to dates.
+        """
+        league = self.get_object()
+        scored = league_categories(league)
+        categories = request.query_params.get("categories")
+        categories = categories.split(",") if categories else scored
+        unknown = [category for category in categories if category not in scored]
+        if unknown:
+            raise ValidationError({"categories": f"Not scored in this league: {', '.join(unknown)}"})
+
+        start = date_param(request, "from", league.start_date)
+        end = date_param(request, "to", league.end_date)
+        return Response(category_trends(league, categories, start, end))
+
+    @action(detail=True, methods=['get'], url_path='free-agents')
+    def free_agents(self, request, pk=None):
+        """
+        Players on no active roster of the league, sorted by recent production, keyset paginated.
+
+        Query params: position (e.g. SS), role (batter/pitcher), category (e.g. OPS, ERA),
+        days (7, 14 or 30, default 14), order (asc/desc, default by category), limit and cursor.
+        """
+        league = self.get_object()
+        params = request.query_params
+        try:
+            days = int(params.get("days", 14))
+            limit = int(params.get("limit", 50))
+        except ValueError:
+            raise ValidationError("days and limit must be numbers.")
+
+        order = params.get("order")
+        if order not in (None, "asc", "desc"):
+            raise ValidationError({"order": "Expected asc or desc."})
+
+        try:
+            page = free_agents(
+                league, params.get("role", RoleChoices.BATTER), params.get("category"), days=days,
+                position=params.get("position"), descending=None if order is None else order == "desc",
+                limit=limit, cursor=params.get("cursor"),
+            )
+        except ValueError as e:
+            raise ValidationError(str(e))
+        return Response(page)
+
+    @action(detail=True, methods=['get', 'post'])
+    def lineups(self, request, pk=None):
+        """
+        Best lineup of every team in the league, from the players' recent production in
+        the league's categories (days: 7, 14 or 30, default 14).
+
+        GET returns the proposed lineups; POST also sets them, effective on date
+        (YYYY-MM-DD, default today). Setting lineups is commissioner only.
+        """
+        league = self.get_object()
+        params = request.data if request.method == "POST" else request.query_params
+        try:
+            days = int(params.get("days", ROLLING_DAYS))
+        except (TypeError, ValueError):
+            raise ValidationError({"days": "Expected a number."})
+        if days not in ROLLING_WINDOWS:
+            raise ValidationError({"days": f"Expected one of {', '.join(map(str, ROLLING_WINDOWS))}."})
+
+        try:
+            if request.method == "POST":
+                if league.commissioner != request.user:
+                    raise PermissionDenied("Only the commissioner can set every team's lineup.")
+                date = parse_date(params["date"]) if params.get("date") else datetime.date.today()
+                if date is None:
+                    raise ValidationError({"date": "Expected a date formatted as YYYY-MM-DD."})
+                lineups = set_optimal_lineups(league, date, days)
+            else:
+                lineups = optimal_lineups(league, days)
+        except ValueError as e:
+            raise ValidationError(str(e))
+
+        return Response([
+            {
+                "fantasy_team": team_id,
+                "score": lineup["score"],
+                "lineup": [{"player": player_id, "position": slot} for player_id, slot in lineup["lineup"].items()],
+                "changes": [{"player": player_id, "position": slot} for player_id, slot in lineup["changes"].items()],
+            }
+            for team_id, lineup in lineups.items()
+        ])
+
+    @action(detail=True, methods=['post'], url_path='generate-schedule')
+    def generate_schedule(self, request, pk=None):
+        """Creates the weekly head-to-head schedule of the league. Commissioner only."""
+        league = self.get_object()
+        if league.commissioner != request.user:
+            raise PermissionDenied("Only the commissioner can generate the schedule.")
+        if league.scoring_system != 'H2H':
+            raise ValidationError({"scoring_system": "Schedules are only used by head-to-head leagues."})
+
+        periods = generate_schedule(league)
+        return Response({"periods": len(periods)})
+
+    @action(detail=True, methods=['get'])
+    def matchups(self, request, pk=None):
+        """
+        Category scores of every matchup in a period (?period=N, defaults to the current week),
+        served from the cache until a game in the period is ingested.
+        """
+        league = self.get_object()
+        number = request.query_params.get("period")
+        if number:
+            if not number.isdigit():
+                raise ValidationError({"period": "Expected a period number."})
+            period = league.matchup_periods.filter(number=number).first()
+        else:
+            period = current_period(league) or league.matchup_periods.order_by('number').first()
+        if period is None:
+            raise NotFound("This league has no matchup period.")
+        return Response(get_period_scores(league, period))
+
+class FantasyTeamViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
+    queryset = FantasyTeam.objects.select_related('owner', 'league')
     serializer_class = FantasyTeamSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['league']
 
-class FantasyRosterViewSet(viewsets.ModelViewSet):
-    queryset = FantasyRoster.objects.all()
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ['list', 'retrieve']:
+            # Two queries for any number of teams: the teams, then all their roster entries with players
+            queryset = queryset.prefetch_related(Prefetch(
+                'fantasyroster_set',
+                queryset=FantasyRoster.objects.select_related('player__team').order_by('id'),
+            ))
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action in ['list', 'retrieve']:
+            return FantasyTeamReadSerializer
+        return super().get_serializer_class()
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """
+        The team's stats over a date window (from and to, inclusive), counted like
+        total_stats: each active roster spot only within its own stint. The team's and every
+        player's stats are split by role, {"batter": {...}, "pitcher": {...}}.
+        """
+        team = self.get_object()
+        start = date_param(request, "from", team.league.start_date)
+        end = date_param(request, "to", datetime.date.today())
+        if start > end:
+            raise ValidationError({"from": "Must not be after to."})
+
+        # Clip every stint to the window, then look up each distinct window once
+        windows = {}
+        for roster in team.fantasyroster_set.exclude(position__in=['BN', 'IL']):
+            stint_start = max(start, roster.start_date)
+            stint_end = end if roster.end_date is None else min(end, roster.end_date - datetime.timedelta(days=1))
+            if stint_start <= stint_end:
+                windows.setdefault((stint_start, stint_end), []).append(roster)
+
+        spots = []
+        for (stint_start, stint_end), rosters in windows.items():
+            totals = PlayerDailyTotals.window_by_role([roster.player_id for roster in rosters], stint_start, stint_end)
+            for roster in rosters:
+                # Unsaved, only the window's stats
+                roster.stats = calculate_role_rate_stats(totals.get(roster.player_id, {}))
+                spots.append(roster)
+
+        return Response({
+            "fantasy_team": team.id, "from": start, "to": end,
+            "stats": sum_roster_stats(spots),
+            "players": [
+                {"player": roster.player_id, "position": roster.position, "stats": roster.stats} for roster in spots
+            ],
+        })
+
+    @action(detail=True, methods=['post'])
+    def moves(self, request, pk=None):
+        """
+        Makes a roster move for the team, effective on date (YYYY-MM-DD, default today).
+
+        Body by type:
+            add: player, optional position (default the best open slot) and drop
+            drop: player
+            swap: changes, a list of {"player", "position"} applied as one lineup change
+            trade: team (the other team), send and receive (player id lists); commissioner only
+
+        Only the team's owner or the league's commissioner can make moves.
+        """
+        team = self.get_object()
+        league = team.league
+        if request.user != team.owner and request.user != league.commissioner:
+            raise PermissionDenied("Only the team's owner or the commissioner can change its roster.")
+        serializer = RosterMoveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+        move_type = data["type"]
+
+        try:
+            move = RosterMove(league, data.get("date"))
+            if move_type == "add":
+                opened = move.add(team, data["player"], data.get("position"), data.get("drop"))
+            elif move_type == "drop":
+                opened = move.drop(team, data["player"])
+            elif move_type == "swap":
+                opened = move.swap(team, {change["player"]: change["position"] for change in data["changes"]})
+            else:
+                if request.user != league.commissioner:
+                    raise PermissionDenied("Only the commissioner can process trades.")
+                other_team = FantasyTeam.objects.filter(pk=data["team"]).first()
+                if other_team is None:
+                    raise ValidationError({"team": "Unknown fantasy team."})
+                opened = move.trade(team, other_team, data["send"], data["receive"])
+        except ValueError as e:
+            raise ValidationError(str(e))
+
+        team.refresh_from_db(fields=['total_stats'])
+        return Response({
+            "opened": FantasyRosterSerializer(opened, many=True).data,
+            "total_stats": team.total_stats,
+        })
+
+class FantasyRosterViewSet(SparseFieldsetMixin, viewsets.ModelViewSet):
+    queryset = FantasyRoster.objects.select_related('player__team')
     serializer_class = FantasyRosterSerializer
     permission_classes = [IsOwnerOrReadOnly]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['fantasy_team', 'player']
 
-class FantasyRosterListView(generics.ListAPIView):
-    serializer_class = FantasyRosterSerializer
+    def get_serializer_class(self):
+        if self.action in ['list', 'retrieve']:
+            return FantasyRosterReadSerializer
+        return super().get_serializer_class()
+
+class FantasyRosterListView(SparseFieldsetMixin, generics.ListAPIView):
+    serializer_class = FantasyRosterReadSerializer
     permission_classes = [IsAuthenticatedOrReadOnly]
 
     def get_queryset(self):
         """Filter rosters by fantasy team if 'fantasy_team_id' is provided"""
+        rosters = FantasyRoster.objects.select_related('player__team')
         fantasy_team_id = self.request.query_params.get("fantasy_team_id")
         if fantasy_team_id:
-            return FantasyRoster.objects.filter(fantasy_team_id=fantasy_team_id)
-        return FantasyRoster.objects.all()
\ No newline at end of file
+            return rosters.filter(fantasy_team_id=fantasy_team_id)
+        return rosters
\ No newline at end of file
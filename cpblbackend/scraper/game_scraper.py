@@ -1,23 +1,27 @@
 import os
 import django
 import datetime
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
+import hashlib
+import json
+from lxml import html as lxml_html
 import pandas as pd
+import queue
 import re
+import requests
+import threading
+import time
 
 # Set up Django environment
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "your_project.settings")  # Replace with your Django project name
 django.setup()
 
-from fantasy.models import FantasyTeam, Team, Player, Game, GameStats, FantasyRoster
-
-# Set up Selenium with a headless browser
-options = webdriver.ChromeOptions()
-options.add_argument("--headless")  # Run in headless mode
+from django.conf import settings
+from fantasy.eligibility import update_eligibility as update_player_eligibility
+from fantasy.free_agents import refresh_rolling_stats
+from fantasy.models import FantasyTeam, Game, BATTING_STAT_KEYS, PITCHING_STAT_KEYS
+from fantasy.ingest import GameLoader
+from scraper.http_session import get_http_session
+from scraper.page_cache import PageCache
 
 BASE_URL = "https://en.cpbl.com.tw"
 
@@ -38,64 +42,52 @@ def parse_innings_pitched(s):
 
 
 
-def get_or_create_team(name):
-    team, _ = Team.objects.get_or_create(name=name)
-    return team
-
-
-def get_or_create_player(name_block, team, acnt):
+def split_name_block(name_block):
+    """Splits "Name（Indigenous name）" into its two parts."""
     if "（" in name_block and "）" in name_block:
         name, indigenous_name = name_block.split("（")
         indigenous_name = indigenous_name.strip("）")
     else:
         name = name_block
         indigenous_name = None
-    player, created = Player.objects.update_or_create(acnt=acnt, defaults={
-        "position": "Unknown", 
-        "team": team, 
-        "name": name, 
-        "indigenous_name": indigenous_name 
-        })
-    if(created):
-        print("Created new Player", name, team, acnt)
-    return player
+    return name, indigenous_name
 
-def update_or_create_gamestats(game, player, role, position, stats):
-    gamestats, created = GameStats.objects.update_or_create(game=game, player=player, role=role, defaults={"position": position, "stats":stats})
-    return gamestats, created
+def has_class(name):
+    """XPath predicate matching elements with the given CSS class."""
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
 
+def cell_text(element):
+    return element.text_content().strip()
 
-    
-def get_team_data(team_container, team, game):
-    """Extracts and saves player stats from the given team container."""
-    batting_table = team_container.find_elements(By.CLASS_NAME, "RecordTable")[0]
-    pitching_table = team_container.find_elements(By.CLASS_NAME, "RecordTable")[1]
+def parse_player_cell(player_col):
+    link = player_col.xpath(".//a")[0]
+    player_name, indigenous_name = split_name_block(cell_text(link))
+    player_url= BASE_URL + link.get("href")
+    acnt = player_url.lower().split("acnt=")[-1]
+    return {"acnt": acnt, "name": player_name, "indigenous_name": indigenous_name}
 
-    html_batting = batting_table.get_attribute("outerHTML")
-    html_pitching = pitching_table.get_attribute("outerHTML")
+def parse_table_headers(header_row):
+    #all this just for weird full length parentehses in IBB
+    return [re.sub(r"[()（）]", "", "".join(text.strip() for text in th.itertext())) for th in header_row.xpath("./th")]
 
-    batting_soup = BeautifulSoup(html_batting, "html.parser")
-    pitching_soup = BeautifulSoup(html_pitching, "html.parser")
+def parse_team_data(team_container, team_name):
+    """Extracts the batting and pitching lines from the given team container."""
+    batting_table, pitching_table = team_container.xpath(f".//*[{has_class('RecordTable')}]")[:2]
+    lines = []
 
     # Extract batting data
-    batting_header_row = batting_soup.select("tbody tr")[0]
-    #all this just for weird full length parentehses in IBB
-    batting_headers = [re.sub(r"[()（）]", "", th.get_text(strip=True)) for th in batting_header_row.find_all("th")]
-    print(batting_headers)
-    batting_stats = ["AB","R","H","RBI","2B","3B","HR","GIDP","BB","IBB","HBP","SO","SAC","SF","SB","CS","E","AVG"]
+    batting_rows = batting_table.xpath("./tbody/tr")
+    batting_headers = parse_table_headers(batting_rows[0])
 
-    for row in batting_soup.select("tbody tr")[1:-1]:
-        cols = row.find_all("td")
+    for row in batting_rows[1:-1]:
+        cols = row.xpath("./td")
         if cols:
             player_col = cols[0]
-            player_name = player_col.find("a").text.strip()
-            position = player_col.find(class_="position").text.strip()
-            player_url= BASE_URL + player_col.find("a").get("href")
-            acnt = player_url.lower().split("acnt=")[-1]
+            position = cell_text(player_col.xpath(f".//*[{has_class('position')}]")[0])
 
             stats_data = {}
-            for stat in batting_stats:
-                stat_text = cols[batting_headers.index(stat)].text.strip()
+            for stat in BATTING_STAT_KEYS:
+                stat_text = cell_text(cols[batting_headers.index(stat)])
                 
                 match stat:
                     case "AVG":
@@ -105,39 +97,28 @@ def get_team_data(team_container, team, game):
                     case _:
                         stats_data[stat] = int(stat_text)
 
-            player = get_or_create_player(player_name, team, acnt)
-
-            #Create gamestat
-            gamestats, created = update_or_create_gamestats(game=game, player=player, role="batter", position=position, stats=stats_data)
-            
-            # Update all FantasyRosters that have this player
-            fantasy_rosters = list(FantasyRoster.objects.filter(player=player.id))
-            for roster in fantasy_rosters:
-                print(roster)
-                roster.update_stats()
+            lines.append({
+                **parse_player_cell(player_col),
+                "team": team_name, "role": "batter", "position": position, "stats": stats_data,
+            })
 
 
     # Extract pitching data
-    pitching_header_row = pitching_soup.select("tbody tr")[0]
-    pitching_headers = [re.sub(r"[()（）]", "", th.get_text(strip=True)) for th in pitching_header_row.find_all("th")]
-
-    pitching_stats = ["IP","BF","NP", "S", "H", "HR", "BB", "IBB", "HBP", "SO",	"WP", "BK", "R", "ER", "E", "ERA", "WHIP"]
+    pitching_rows = pitching_table.xpath("./tbody/tr")
+    pitching_headers = parse_table_headers(pitching_rows[0])
 
 
     pitcherPos = "SP"
-    for row in pitching_soup.select("tbody tr")[1:-1]:
-        cols = row.find_all("td")
+    for row in pitching_rows[1:-1]:
+        cols = row.xpath("./td")
         if cols:
             player_col = cols[0]
-            player_name = player_col.find("a").text.strip()
             position = pitcherPos
             pitcherPos = "RP"
-            player_url= BASE_URL + player_col.find("a").get("href")
-            acnt = player_url.lower().split("acnt=")[-1]
 
             stats_data = {}
-            for stat in pitching_stats:
-                stat_text = cols[pitching_headers.index(stat)].text.strip()
+            for stat in PITCHING_STAT_KEYS:
+                stat_text = cell_text(cols[pitching_headers.index(stat)])
                 match stat:
                     case "IP":
                         stats_data[stat] = (int(parse_innings_pitched(stat_text) * 3))/3.0
@@ -150,92 +131,376 @@ def get_team_data(team_container, team, game):
                     case _:
                         stats_data[stat] = int(stat_text)
             
+            lines.append({
+                **parse_player_cell(player_col),
+                "team": team_name, "role": "pitcher", "position": position, "stats": stats_data,
+            })
 
-            player = get_or_create_player(player_name, team, acnt)
+    return lines
 
-            update_or_create_gamestats(game=game, player=player, role="pitcher", position=position, stats=stats_data)
-                
-            print(player, stats_data["IP"])
-            fantasy_rosters = list(FantasyRoster.objects.filter(player=player.id))
-            for roster in fantasy_rosters:
-                print(roster)
-                roster.update_stats()
-            # Update all FantasyRosters that have this player
-
-def get_game_data(game_link, driver):
-    """Fetches and stores data for a single game."""
-    driver.get(game_link)
-
-    wait = WebDriverWait(driver, 30)
-    try:
-        tab_group = wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".GameBoxDetail.tabs_group")))
-    except:
-        return False
+def parse_box_score(html):
+    """
+    Parses a box score page into the format GameLoader expects, or None if the page has no game.
 
-    team_names = tab_group.find_elements(By.CSS_SELECTOR, ".tabs a")
-    team_containers = tab_group.find_elements(By.CLASS_NAME, "tab_cont")
+    The page is parsed once with lxml, whichever backend fetched it.
+    """
+    root = lxml_html.fromstring(html)
+    tab_groups = root.xpath(f"//*[{has_class('GameBoxDetail')} and {has_class('tabs_group')}]")
+    if not tab_groups:
+        return None
+    tab_group = tab_groups[0]
 
-    home_team = get_or_create_team(team_names[0].get_attribute("title"))
-    away_team = get_or_create_team(team_names[1].get_attribute("title"))
+    team_names = tab_group.xpath(f".//*[{has_class('tabs')}]//a")
+    team_containers = tab_group.xpath(f".//*[{has_class('tab_cont')}]")
 
-    soup = BeautifulSoup(driver.page_source, "html.parser")
-    game_no = int(soup.find(id="GameSno")["value"])
-    game_date_text = soup.find("div", class_="date").get_text().strip()
-    game_date = datetime.datetime.strptime(game_date_text, "%Y/%m/%d").date()
+    home_team = team_names[0].get("title")
+    away_team = team_names[1].get("title")
 
-    game, _ = Game.objects.get_or_create(
-        date=game_date, game_number=game_no, home_team=home_team, away_team=away_team
-    )
+    game_no = int(root.get_element_by_id("GameSno").get("value"))
+    game_date_text = cell_text(root.xpath(f"//div[{has_class('date')}]")[0])
+    game_date = datetime.datetime.strptime(game_date_text, "%Y/%m/%d").date()
 
-    print(f"Processing game {game_no}: {home_team.name} vs {away_team.name} on {game_date}")
+    print(f"Processing game {game_no}: {home_team} vs {away_team} on {game_date}")
+
+    return {
+        "game_number": game_no,
+        "date": game_date,
+        "home_team": home_team,
+        "away_team": away_team,
+        "lines": parse_team_data(team_containers[0], home_team) + parse_team_data(team_containers[1], away_team),
+    }
+
+class SeleniumBoxFetcher:
+    """
+    Loads box score pages in a headless Chrome, waiting for the page scripts to render the box.
+
+    Selenium is only imported here, so the HTTP backend works without it installed.
+    With a page cache, finished games are served from the cache without starting a page load.
+    """
+
+    def __init__(self, cache=None):
+        from selenium import webdriver
+
+        # Set up Selenium with a headless browser
+        options = webdriver.ChromeOptions()
+        options.add_argument("--headless")  # Run in headless mode
+        self.driver = webdriver.Chrome(options=options)
+        self.cache = cache
+
+    def fetch(self, url):
+        """Returns the rendered page source, or None if no box score shows up."""
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        cached = self.cache.get(url) if self.cache else None
+        if cached and cached.final:
+            return cached.body.decode()
+
+        self.driver.get(url)
+        wait = WebDriverWait(self.driver, 30)
+        try:
+            wait.until(EC.presence_of_element_located((By.CSS_SELECTOR, ".GameBoxDetail.tabs_group")))
+        except TimeoutException:
+            return None
+        page_source = self.driver.page_source
+        if self.cache:
+            self.cache.store(url, page_source.encode())
+        return page_source
+
+    def close(self):
+        self.driver.quit()
+
+class HttpBoxFetcher:
+    """
+    Fetches box score pages with plain HTTP requests through the pooled session, for pages
+    served with the box already rendered. No browser is started.
+
+    With a page cache, finished games are served from the cache and other pages are
+    revalidated with conditional requests.
+    """
+
+    def __init__(self, cache=None):
+        self.session = get_http_session()
+        self.cache = cache
+
+    def fetch(self, url):
+        """Returns the page HTML, or None if the page has no box score. Server errors raise so they are retried."""
+        if self.cache:
+            status, content = self.cache.fetch(self.session, url, timeout=30)
+        else:
+            response = self.session.get(url, timeout=30)
+            status, content = response.status_code, response.content
+        if status == 404:
+            return None
+        if status >= 400:
+            raise requests.HTTPError(f"{status} error for {url}")
+        html = content.decode("utf-8", errors="replace")
+        if "GameBoxDetail" not in html:
+            return None
+        return html
+
+    def close(self):
+        # The session and its pool are shared by every HTTP fetcher
+        pass
+
+class ReplayBoxFetcher:
+    """Serves box scores only from the page cache, so a season can be re-parsed without any network."""
+
+    def __init__(self, cache=None):
+        if cache is None:
+            raise ValueError("The replay backend needs a page cache, set SCRAPER_CACHE_PATH")
+        self.cache = cache
+
+    def fetch(self, url):
+        cached = self.cache.get(url)
+        return cached.body.decode() if cached else None
+
+    def close(self):
+        pass
+
+BOX_FETCHERS = {
+    "selenium": SeleniumBoxFetcher,
+    "http": HttpBoxFetcher,
+    "replay": ReplayBoxFetcher,
+}
+
+def make_fetcher(backend=None, cache=None):
+    """Creates a box score fetcher for the given backend name, defaulting to settings.SCRAPER_BACKEND."""
+    return BOX_FETCHERS[backend or settings.SCRAPER_BACKEND](cache=cache)
+
+def box_score_url(year, game_no, base_url=BASE_URL):
+    return "{base_url}/box?year={year}&KindCode=A&gameSno={gameNo}".format(base_url=base_url, year=year, gameNo=game_no)
+
+def fetch_box_score(fetcher, url):
+    """Fetches and parses one box score, or returns None if there is no game at url."""
+    html = fetcher.fetch(url)
+    parsed = parse_box_score(html) if html else None
+    if parsed and fetcher.cache and parsed["date"] < datetime.date.today():
+        # Games from past days are finished, their page won't change anymore
+        fetcher.cache.mark_final(url)
+    return parsed
+
+def parsed_game_hash(parsed):
+    return hashlib.sha256(json.dumps(parsed, sort_keys=True, default=str).encode()).hexdigest()
+
+class BoxScoreWriter:
+    """
+    Collects parsed games for the single database writer and loads them batch_size at a time.
+
+    Games whose parsed content hashes the same as what was last loaded into the database
+    (Game.source_sha256) are skipped entirely. The hash lives next to the data, so a
+    reset or restored database gets every game written again.
+    """
+
+    def __init__(self, loader, batch_size=10):
+        self.loader = loader
+        self.batch_size = batch_size
+        self.batch = []
+
+    def add(self, parsed):
+        digest = parsed_game_hash(parsed)
+        if Game.objects.filter(
+            game_number=parsed["game_number"], date=parsed["date"], source_sha256=digest
+        ).exists():
+            print(f"Game {parsed['game_number']} unchanged, skipping")
+            return
+        self.batch.append(dict(parsed, sha256=digest))
+        if len(self.batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        self.loader.load(self.batch)
+        self.batch.clear()
+
+def get_game_data(game_link, fetcher, loader=None):
+    """Fetches and stores data for a single game, fantasy totals included."""
+    parsed = fetch_box_score(fetcher, game_link)
+    if parsed is None:
+        return False
 
-    get_team_data(team_containers[0], home_team, game)
-    get_team_data(team_containers[1], away_team, game)
+    writer = BoxScoreWriter(loader or GameLoader())
+    writer.add(parsed)
+    writer.flush()
     return True
 
-def scrape_data():
+def scrape_data(backend: str = None):
     
-    driver = webdriver.Chrome(options=options)
-    
-    driver.get("https://en.cpbl.com.tw/box?year=2024&kindCode=A&gameSno=19")
-
-    wait = WebDriverWait(driver, 30)  # Increased wait time
-    wait.until(EC.visibility_of_element_located((By.CLASS_NAME, "RecordTable")))
-
-
-    # Scrape all games on the page
-    html = driver.page_source
-    soup = BeautifulSoup(html, "html.parser")
-    games_list = soup.find("div", class_="game_list")
-
-    for game in games_list.find_all("li"):
-        game_link = game.find("a")["href"]
-        get_game_data(BASE_URL + game_link, driver)
-
-    driver.quit()
+    cache = PageCache.from_settings()
+    fetcher = make_fetcher(backend, cache)
+    try:
+        # Scrape all games on the page
+        url = "https://en.cpbl.com.tw/box?year=2024&kindCode=A&gameSno=19"
+        html = fetcher.fetch(url)
+        if not html:
+            print(f"Could not fetch the game list at {url}")
+            return
+        root = lxml_html.fromstring(html)
+        games_list = root.xpath(f"//div[{has_class('game_list')}]")[0]
+
+        for game in games_list.xpath(".//li"):
+            game_link = game.xpath(".//a")[0].get("href")
+            get_game_data(BASE_URL + game_link, fetcher)
+    finally:
+        fetcher.close()
+        if cache:
+            cache.close()
+
+def scrape_year(year: int, start: int = 1, end: int = 1000, refresh_each_game: bool = False, batch_size: int = 10, backend: str = None):
+    """
+    Scrapes every game of a season starting from gameSno start.
+
+    Parsed games are written batch_size at a time by a single GameLoader, each batch
+    with its fantasy roster and team totals. With refresh_each_game every game is its own
+    batch (useful for live updates during the season).
+
+    Pages go through the page cache (settings.SCRAPER_CACHE_PATH). Use backend="replay"
+    to re-parse a season from the cache without any network access.
+    """
+    cache = PageCache.from_settings()
+    fetcher = make_fetcher(backend, cache)
+    writer = BoxScoreWriter(GameLoader(), 1 if refresh_each_game else batch_size)
 
-def scrape_year(year: int, start: int = 1, end: int = 1000):
-    driver = webdriver.Chrome(options=options)
-    
-    #run until no more games
-    for gameNo in range(start, end):
-        game_link = "/box?year={year}&KindCode=A&gameSno={gameNo}".format(year=year, gameNo=gameNo)
-        print(BASE_URL + game_link)
-        print("GAME NUMBER :" + str(gameNo))
-        result = get_game_data(BASE_URL + game_link, driver)
-        if not result:
-            print("No more games")
-            break
-
-    update_fantasy()
-    
-    driver.quit()
+    try:
+        #run until no more games
+        for gameNo in range(start, end):
+            game_link = box_score_url(year, gameNo)
+            print(game_link)
+            print("GAME NUMBER :" + str(gameNo))
+            parsed = fetch_box_score(fetcher, game_link)
+            if not parsed:
+                print("No more games")
+                break
+            writer.add(parsed)
+
+        writer.flush()
+    finally:
+        fetcher.close()
+        if cache:
+            cache.close()
+
+    update_eligibility()
+    refresh_rolling_stats()
+
+# Result of a game whose fetch kept failing: unknown, as opposed to None for "no box score"
+FETCH_FAILED = object()
+
+def fetch_worker(backend, cache, tasks, results, retries):
+    """
+    Worker thread: owns one fetcher, takes (game number, url) tasks until it gets None and
+    puts (game number, result) on results, the result being the parsed game, None if
+    there is no box score or FETCH_FAILED once every retry failed. A worker that can't create
+    its fetcher puts (None, error) instead and stops. Never touches the database.
+    """
+    try:
+        fetcher = make_fetcher(backend, cache)
+    except Exception as e:
+        results.put((None, e))
+        return
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                return
+            game_no, url = task
+            parsed = FETCH_FAILED
+            for attempt in range(retries + 1):
+                try:
+                    parsed = fetch_box_score(fetcher, url)
+                    break
+                except Exception as e:
+                    print(f"Game {game_no} attempt {attempt + 1} failed: {e}")
+                    if attempt < retries:
+                        time.sleep(2 ** attempt)
+            results.put((game_no, parsed))
+    finally:
+        fetcher.close()
+
+def scrape_year_concurrent(year: int, start: int = 1, end: int = 1000, workers: int = 4, backend: str = None,
+                           max_gap: int = 5, retries: int = 2, batch_size: int = 10, base_url: str = BASE_URL):
+    """
+    Scrapes a season with a pool of workers fetching and parsing box scores in parallel.
+
+    Game numbers are handed out through a bounded queue. The calling thread is the only
+    writer: it bulk-loads the parsed games batch_size at a time. The season is considered
+    over once max_gap consecutive game numbers after the last found game have no box score,
+    so postponed or missing games don't end the run early. Games whose fetch failed on
+    every retry don't count towards that gap; they are listed at the end for a rerun.
+
+    Returns the game numbers that failed.
+    """
+    cache = PageCache.from_settings()
+    tasks = queue.Queue(maxsize=workers * 2)
+    results = queue.Queue()
+    threads = [
+        threading.Thread(target=fetch_worker, args=(backend, cache, tasks, results, retries), daemon=True)
+        for _ in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    writer = BoxScoreWriter(GameLoader(), batch_size)
+    next_no = start
+    last_found = start - 1
+    failed = []
+    pending = 0
+    try:
+        while True:
+            # Keep the workers busy without running too far past the last game we found;
+            # failed games past it could be games, so they widen the window instead of closing it
+            horizon = last_found + max_gap + sum(game_no > last_found for game_no in failed)
+            while pending < workers * 2 and next_no < end and next_no <= horizon:
+                tasks.put((next_no, box_score_url(year, next_no, base_url)))
+                next_no += 1
+                pending += 1
+            if pending == 0:
+                break
+
+            game_no, parsed = results.get()
+            if isinstance(parsed, Exception):
+                raise RuntimeError("A fetch worker could not start") from parsed
+            pending -= 1
+            if parsed is FETCH_FAILED:
+                print(f"Could not fetch game {game_no}")
+                failed.append(game_no)
+                continue
+            if parsed is None:
+                print(f"No box score for game {game_no}")
+                continue
+            last_found = max(last_found, game_no)
+            writer.add(parsed)
+
+        writer.flush()
+    finally:
+        # Drop the games nobody will fetch, so every worker still running finds its None
+        # and a full queue of tasks for dead workers can't block the shutdown
+        while True:
+            try:
+                tasks.get_nowait()
+            except queue.Empty:
+                break
+        for _ in threads:
+            tasks.put_nowait(None)
+        for thread in threads:
+            thread.join()
+        if cache:
+            cache.close()
+
+    print(f"No box scores after game {last_found}, season done")
+    if failed:
+        print(f"Failed to fetch games {', '.join(map(str, sorted(failed)))}, rerun with start= to retry")
+    update_eligibility()
+    refresh_rolling_stats()
+    return sorted(failed)
 
 def update_fantasy():
     teams = list(FantasyTeam.objects.all())
     for team in teams:
         team.update_total_stats()
     
-    players = list(Player.objects.all())
-    for player in players:
-        player.update_eligible_positions()
\ No newline at end of file
+    update_eligibility()
+
+def update_eligibility():
+    eligibility = update_player_eligibility()
+    print(f"Updated position eligibility of {len(eligibility)} players")
\ No newline at end of file
@@ -0,0 +1,26 @@
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+_session = None
+_pool_size = 0
+_lock = threading.Lock()
+
+
+def get_http_session(pool_size=16):
+    """
+    Returns the process-wide requests.Session, with a connection pool shared by all HTTP
+    workers. The pool grows to pool_size if an earlier caller asked for a smaller one.
+    """
+    global _session, _pool_size
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            _session.headers["User-Agent"] = "Mozilla/5.0"
+        if pool_size > _pool_size:
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+            _pool_size = pool_size
+        return _session
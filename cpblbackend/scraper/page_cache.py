@@ -0,0 +1,115 @@
+import hashlib
+import sqlite3
+import threading
+from collections import namedtuple
+from datetime import datetime, timezone
+
+from django.conf import settings
+
+CachedPage = namedtuple("CachedPage", ["url", "body", "sha256", "etag", "last_modified", "final"])
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bodies (
+    sha256 TEXT PRIMARY KEY,
+    body BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT PRIMARY KEY,
+    sha256 TEXT NOT NULL REFERENCES bodies (sha256),
+    etag TEXT,
+    last_modified TEXT,
+    final INTEGER NOT NULL DEFAULT 0,
+    fetched_at TEXT NOT NULL
+);
+"""
+
+
+def sha256(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+class PageCache:
+    """
+    Local raw-response cache for the scrapers, stored in SQLite.
+
+    Bodies are content-addressed by their SHA-256, so a page that is re-downloaded unchanged
+    (or an image shared by several URLs) is stored once. Each URL keeps its ETag and
+    Last-Modified for conditional requests, and a "final" flag for pages that will never change
+    again (finished games).
+
+    Safe to share between scraper threads.
+    """
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(self.path, check_same_thread=False)
+        self.connection.executescript(SCHEMA)
+
+    @classmethod
+    def from_settings(cls):
+        """Opens the cache at settings.SCRAPER_CACHE_PATH, or returns None if caching is disabled."""
+        path = getattr(settings, "SCRAPER_CACHE_PATH", None)
+        return cls(path) if path else None
+
+    def close(self):
+        self.connection.close()
+
+    def get(self, url):
+        with self.lock:
+            row = self.connection.execute(
+                """
+                SELECT pages.url, bodies.body, pages.sha256, pages.etag, pages.last_modified, pages.final
+                FROM pages JOIN bodies ON bodies.sha256 = pages.sha256
+                WHERE pages.url = ?
+                """,
+                (url,),
+            ).fetchone()
+        if row is None:
+            return None
+        return CachedPage(row[0], bytes(row[1]), row[2], row[3], row[4], bool(row[5]))
+
+    def store(self, url, content, etag=None, last_modified=None):
+        """Stores a downloaded body for url and returns its hash."""
+        digest = sha256(content)
+        with self.lock, self.connection:
+            self.connection.execute("INSERT OR IGNORE INTO bodies (sha256, body) VALUES (?, ?)", (digest, content))
+            self.connection.execute(
+                """
+                INSERT INTO pages (url, sha256, etag, last_modified, fetched_at) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    sha256 = excluded.sha256, etag = excluded.etag,
+                    last_modified = excluded.last_modified, fetched_at = excluded.fetched_at
+                """,
+                (url, digest, etag, last_modified, datetime.now(timezone.utc).isoformat()),
+            )
+        return digest
+
+    def mark_final(self, url):
+        """Marks a page as never changing again, so it is served from the cache without a request."""
+        with self.lock, self.connection:
+            self.connection.execute("UPDATE pages SET final = 1 WHERE url = ?", (url,))
+
+    def fetch(self, session, url, **kwargs):
+        """
+        GETs url through the cache and returns (status code, body bytes).
+
+        Final pages are returned without a request. Other cached pages are revalidated with
+        If-None-Match / If-Modified-Since, and a 304 returns the cached body.
+        """
+        cached = self.get(url)
+        if cached and cached.final:
+            return 200, cached.body
+
+        headers = {}
+        if cached and cached.etag:
+            headers["If-None-Match"] = cached.etag
+        if cached and cached.last_modified:
+            headers["If-Modified-Since"] = cached.last_modified
+
+        response = session.get(url, headers=headers, **kwargs)
+        if response.status_code == 304 and cached:
+            return 200, cached.body
+        if response.status_code == 200:
+            self.store(url, response.content, response.headers.get("ETag"), response.headers.get("Last-Modified"))
+        return response.status_code, response.content
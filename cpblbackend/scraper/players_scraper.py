@@ -1,18 +1,39 @@
-import requests
+import hashlib
 import re
 from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from fantasy.models import Player, Team
 from django.core.files.base import ContentFile
-import os
+from django.db import transaction
+from fantasy.invalidation import players_changed
+from scraper.http_session import get_http_session
+from scraper.page_cache import PageCache
 
 BASE_URL = "https://en.cpbl.com.tw"
 PLAYERS_URL = "https://en.cpbl.com.tw/player"
 
-def get_player_links():
+# Profile fields owned by the profile scraper; eligibility and images are written separately
+PROFILE_FIELDS = [
+    "name", "indigenous_name", "number", "team", "position", "bats", "throws",
+    "height", "weight", "birthdate", "debut_date", "nationality",
+]
+
+def fetch(url, cache=None):
+    """
+    GETs url with the pooled session, through the page cache (conditional requests) when one is given.
+    Returns (status code, body bytes).
+    """
+    session = get_http_session()
+    if cache:
+        return cache.fetch(session, url, timeout=30)
+    response = session.get(url, timeout=30)
+    return response.status_code, response.content
+
+def get_player_links(cache=None):
     """Scrape player profile links from a team roster page."""
-    response = requests.get(PLAYERS_URL)
-    soup = BeautifulSoup(response.text, "html.parser")
+    _, content = fetch(PLAYERS_URL, cache)
+    soup = BeautifulSoup(content, "html.parser")
 
     players = []
     for team in soup.find_all("div", class_="PlayersList"):
@@ -38,14 +59,17 @@ def normalize_position(position_text):
     }
     return position_map.get(position_text, position_text)
 
-def parse_player_profile(player_name, profile_url):
-    """Scrape player details from their profile page."""
-    response = requests.get(profile_url)
-    soup = BeautifulSoup(response.text, "html.parser")
+def parse_player_profile(player_name, profile_url, cache=None):
+    """
+    Scrape player details from their profile page.
+
+    Only does network and parsing, so it is safe to run in worker threads: the team is
+    returned by name and the profile image as raw bytes, for save_players to resolve.
+    """
+    _, content = fetch(profile_url, cache)
+    soup = BeautifulSoup(content, "html.parser")
 
     team_name = soup.select_one(".team").text.strip()
-    # Ensure the team exists in the database
-    team, created = Team.objects.get_or_create(name=team_name)
     
     # Extract Indigenous Name (if present)
     if "（" in player_name and "）" in player_name:
@@ -91,9 +115,9 @@ def parse_player_profile(player_name, profile_url):
                 img_url = BASE_URL + img_url
                 
             try:
-                img_response = requests.get(img_url)
-                if img_response.status_code == 200:
-                    player_image = ContentFile(img_response.content)
+                status, img_content = fetch(img_url, cache)
+                if status == 200:
+                    player_image = img_content
             except Exception as e:
                 print(f"Error downloading image for {name}: {e}")
     
@@ -101,7 +125,7 @@ def parse_player_profile(player_name, profile_url):
         "name": name,
         "indigenous_name": indigenous_name,
         "number": number,
-        "team": team,
+        "team": team_name,
         "position": position,
         "bats": bats,
         "throws": throws,
@@ -114,29 +138,107 @@ def parse_player_profile(player_name, profile_url):
         "profile_image": player_image  # Add the image
     }
 
-def save_player_to_db(player_data):
-    """Save player details to the database."""
-    # Extract the image from player data
-    player_image = player_data.pop("profile_image", None)
-    
-    # Create or update player record
-    player, created = Player.objects.update_or_create(
-        acnt=player_data["acnt"],
-        defaults=player_data
-    )
-    
-    # Save image if available
-    if player_image:
-        player.profile_image.save(f"{player.acnt}.png", player_image, save=True)
-        
-    return player
-
-def scrape_players():
-
-    players = get_player_links()
+def delete_images(names):
+    storage = Player._meta.get_field('profile_image').storage
+    for name in names:
+        storage.delete(name)
+
+def save_players(players_data):
+    """
+    Save a batch of parsed player profiles to the database.
+
+    Profiles are upserted with one statement. A profile image is only written to storage
+    when its content hash differs from the stored one; the previous file is deleted once
+    the transaction commits, so a rollback never leaves rows pointing at a deleted file.
+    """
+    if not players_data:
+        return []
+
+    team_names = {data["team"] for data in players_data}
+    team_ids = {}
+    for team_id, name in Team.objects.filter(name__in=team_names).values_list('id', 'name'):
+        team_ids.setdefault(name, team_id)
+    for name in team_names - team_ids.keys():
+        team_ids[name] = Team.objects.create(name=name).id
+
+    profiles = {data["acnt"]: data for data in players_data}
+    with transaction.atomic():
+        players = Player.objects.bulk_create(
+            [
+                Player(**{field: data[field] for field in PROFILE_FIELDS if field != "team"},
+                       acnt=acnt, team_id=team_ids[data["team"]])
+                for acnt, data in profiles.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['acnt'],
+            update_fields=PROFILE_FIELDS,
+        )
+
+        stored_images = {
+            acnt: (image, image_hash)
+            for acnt, image, image_hash in Player.objects.filter(acnt__in=profiles).values_list(
+                'acnt', 'profile_image', 'profile_image_hash'
+            )
+        }
+        changed_images = []
+        replaced = []
+        for player in players:
+            content = profiles[player.acnt]["profile_image"]
+            if not content:
+                continue
+            image, image_hash = stored_images[player.acnt]
+            digest = hashlib.sha256(content).hexdigest()
+            if digest == image_hash:
+                continue
+
+            # Named by content, so the new file never collides with the one it replaces
+            player.profile_image.save(f"{player.acnt}-{digest[:12]}.png", ContentFile(content), save=False)
+            player.profile_image_hash = digest
+            changed_images.append(player)
+            if image:
+                replaced.append(image)
+
+        Player.objects.bulk_update(changed_images, ['profile_image', 'profile_image_hash'])
+        # Old files go only once the rows pointing at the new ones are committed
+        if replaced:
+            transaction.on_commit(lambda: delete_images(replaced))
+
+        players_changed([player.id for player in players])
 
-    for name, profile_url in players:
-        print(f"Scraping {name} - {profile_url}")
-        player_data = parse_player_profile(name, profile_url)
-        save_player_to_db(player_data)
+    return players
 
+def scrape_players(workers=8, batch_size=50):
+    """
+    Scrape every player profile, fetching up to `workers` profiles at once with the pooled
+    session and saving them in batches of batch_size.
+    """
+    get_http_session(pool_size=workers)
+    cache = PageCache.from_settings()
+    try:
+        players = get_player_links(cache)
+
+        batch = []
+        saved = 0
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                executor.submit(parse_player_profile, name, profile_url, cache): (name, profile_url)
+                for name, profile_url in players
+            }
+            for future in as_completed(futures):
+                name, profile_url = futures[future]
+                try:
+                    batch.append(future.result())
+                except Exception as e:
+                    print(f"Error scraping {name} - {profile_url}: {e}")
+                    continue
+                print(f"Scraped {name} - {profile_url}")
+
+                if len(batch) >= batch_size:
+                    saved += len(save_players(batch))
+                    batch = []
+
+        saved += len(save_players(batch))
+    finally:
+        if cache:
+            cache.close()
+    print(f"Saved {saved} of {len(players)} players")
@@ -1,6 +1,7 @@
 // get csrf
 
-import { baseLink } from './models';
+import axios from 'axios';
+import { Page, baseLink } from './models';
 
 // Function to get CSRF token and set it as a header
 export const getCsrfToken = async () => {
@@ -30,3 +31,14 @@ export const getCsrfToken = async () => {
   }
 };
 
+// List endpoints are paginated: follow the next links and return every row
+export const fetchAllPages = async <T>(url: string): Promise<T[]> => {
+  const rows: T[] = [];
+  let next: string | null = url;
+  while (next) {
+    const response = await axios.get<Page<T>>(next);
+    rows.push(...response.data.results);
+    next = response.data.next;
+  }
+  return rows;
+};
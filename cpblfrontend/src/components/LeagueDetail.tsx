@@ -2,6 +2,7 @@ import React, { useState, useEffect, useContext } from "react";
 import axios from "axios";
 import { Link, useParams, useNavigate } from "react-router-dom";
 import { FantasyLeague, FantasyTeam, User, baseLink } from "../models";
+import { fetchAllPages } from "../axiosConfig";
 import { useAuth } from "../context/AuthContext";
 
 function LeagueDetail() {
@@ -30,8 +31,8 @@ function LeagueDetail() {
             const leagueResponse = await axios.get<FantasyLeague>(`${baseLink}api/fantasy-leagues/${leagueId}/`);
             setLeague(leagueResponse.data);
             
-            const teamsResponse = await axios.get<FantasyTeam[]>(`${baseLink}api/fantasy-teams/?league=${leagueId}`);
-            setTeams(teamsResponse.data);
+            const teamRows = await fetchAllPages<FantasyTeam>(`${baseLink}api/fantasy-teams/?league=${leagueId}&omit=roster`);
+            setTeams(teamRows);
 
             const userIds = new Set<number>();
             
@@ -41,7 +42,7 @@ function LeagueDetail() {
             }
             
             // Add team owner IDs
-            teamsResponse.data.forEach(team => {
+            teamRows.forEach(team => {
                 if (team.owner) {
                     userIds.add(team.owner);
                 }
@@ -50,10 +51,10 @@ function LeagueDetail() {
             // Only fetch data for these specific users
             if (userIds.size > 0) {
                 const userIdsParam = Array.from(userIds).join(',');
-                const usersResponse = await axios.get<User[]>(`${baseLink}api/users/?ids=${userIdsParam}`);
+                const userRows = await fetchAllPages<User>(`${baseLink}api/users/?ids=${userIdsParam}`);
                 
                 // Convert users array to a map/dictionary for easier lookup
-                const usersMap = usersResponse.data.reduce((acc, user) => {
+                const usersMap = userRows.reduce((acc, user) => {
                     acc[user.id] = user;
                     return acc;
                 }, {} as {[key: number]: User});
@@ -1,15 +1,15 @@
 import React, { useState, useEffect } from "react";
-import axios, { AxiosResponse } from "axios";
 import { Link } from "react-router-dom";
 import { FantasyLeague, baseLink } from "../models";
+import { fetchAllPages } from "../axiosConfig";
 
 function LeagueList() {
   const [leagues, setLeagues] = useState<FantasyLeague[]>([]);
   
   
   useEffect(() => {
-    axios.get<FantasyLeague[]>(baseLink + "api/fantasy-leagues/")
-      .then((response: AxiosResponse<FantasyLeague[]>) => setLeagues(response.data))
+    fetchAllPages<FantasyLeague>(baseLink + "api/fantasy-leagues/")
+      .then((rows: FantasyLeague[]) => setLeagues(rows))
       .catch((error) => console.error(error));
   }, []);
   
@@ -1,7 +1,7 @@
 import { useState, useEffect } from 'react';
-import axios from 'axios';
 import { Link } from 'react-router-dom';
 import { Player, GameStats, Game, baseLink } from '../models';
+import { fetchAllPages } from '../axiosConfig';
 
 // Define an interface for our aggregated batting statistics
 interface PlayerBattingStats {
@@ -76,24 +76,26 @@ function PlayerStats() {
         setLoading(true);
         
         // Fetch all needed data
-        const playersResponse = await axios.get<Player[]>(`${baseLink}api/players/`);
-        const gamesResponse = await axios.get<Game[]>(`${baseLink}api/games/`);
-        const statsResponse = await axios.get<GameStats[]>(`${baseLink}api/game-stats/`);
+        const [playerRows, gameRows, statRows] = await Promise.all([
+          fetchAllPages<Player>(`${baseLink}api/players/?omit=eligible_positions&page_size=1000`),
+          fetchAllPages<Game>(`${baseLink}api/games/?page_size=1000`),
+          fetchAllPages<GameStats>(`${baseLink}api/game-stats/?page_size=1000`),
+        ]);
         
-        setPlayers(playersResponse.data);
+        setPlayers(playerRows);
         
         // Convert games array to a map for easier lookup
-        const gamesMap = gamesResponse.data.reduce((acc, game) => {
+        const gamesMap = gameRows.reduce((acc, game) => {
           acc[game.id] = game;
           return acc;
         }, {} as Record<number, Game>);
         
         setGames(gamesMap);
-        setGameStats(statsResponse.data);
+        setGameStats(statRows);
         
         // Extract available years from games
         const years = new Set<string>();
-        gamesResponse.data.forEach(game => {
+        gameRows.forEach(game => {
           if (game.date) {
             const year = new Date(game.date).getFullYear().toString();
             years.add(year);
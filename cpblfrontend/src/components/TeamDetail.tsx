@@ -2,6 +2,7 @@ import React, { useState, useEffect } from "react";
 import axios from "axios";
 import { Link, useParams } from "react-router-dom";
 import { FantasyTeam, FantasyRoster, Player, baseLink } from "../models";
+import { fetchAllPages } from "../axiosConfig";
 import PlayerCard from "./PlayerCard";
 
 function TeamDetail() {
@@ -17,11 +18,11 @@ function TeamDetail() {
         const teamResponse = await axios.get<FantasyTeam>(`${baseLink}api/fantasy-teams/${teamId}/`);
         setTeam(teamResponse.data);
         
-        const rosterResponse = await axios.get<FantasyRoster[]>(`${baseLink}api/fantasy-rosters/?fantasy_team=${teamId}`);
-        setRosters(rosterResponse.data);
+        const rosterRows = await fetchAllPages<FantasyRoster>(`${baseLink}api/fantasy-rosters/?fantasy_team=${teamId}`);
+        setRosters(rosterRows);
         
         // Fetch player details for each roster entry
-        for (const roster of rosterResponse.data) {
+        for (const roster of rosterRows) {
           const playerResponse = await axios.get<Player>(`${baseLink}api/players/${roster.player}/`);
           setPlayers(prev => ({ ...prev, [roster.player]: playerResponse.data }));
         }
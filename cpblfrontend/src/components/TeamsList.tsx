@@ -1,6 +1,7 @@
 import React, { useState, useEffect } from "react";
-import axios, { AxiosResponse } from "axios";
+import axios from "axios";
 import { FantasyTeam, FantasyRoster, Player, baseLink } from "../models";
+import { fetchAllPages } from "../axiosConfig";
 
 function TeamsList() {
   const [teams, setTeams] = useState<FantasyTeam[]>([]);
@@ -8,8 +9,8 @@ function TeamsList() {
   const [players, setPlayers] = useState<Record<number, Player>>({});
 
   useEffect(() => {
-    axios.get<FantasyTeam[]>(baseLink + "api/fantasy-teams/")
-      .then((response: AxiosResponse<FantasyTeam[]>) => setTeams(response.data))
+    fetchAllPages<FantasyTeam>(baseLink + "api/fantasy-teams/?omit=roster,total_stats")
+      .then((rows: FantasyTeam[]) => setTeams(rows))
       .catch((error) => console.error(error));
   }, []);
 
@@ -27,9 +28,9 @@ function TeamsList() {
   const fetchRosters = async (teamId: number) => {
     if (!rosters[teamId]) {
       try {
-        const response = await axios.get<FantasyRoster[]>(baseLink + `api/fantasy-rosters/?fantasy_team_id=${teamId}`);
-        setRosters(prev => ({ ...prev, [teamId]: response.data }));
-        response.data.forEach(roster => fetchPlayer(roster.player));
+        const rows = await fetchAllPages<FantasyRoster>(baseLink + `api/fantasy-rosters/?fantasy_team_id=${teamId}`);
+        setRosters(prev => ({ ...prev, [teamId]: rows }));
+        rows.forEach(roster => fetchPlayer(roster.player));
       } catch (error) {
         console.error("Error fetching rosters:", error);
       }
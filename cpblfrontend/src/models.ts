@@ -1,8 +1,17 @@
+// Fantasy totals keep batting and pitching apart: a pitcher's H or SO never counts towards
+// the batting categories. A role is missing when no one played it. AVG is in batter,
+// ERA and WHIP in pitcher, 0 when there are no AB or IP.
+export interface RoleStats {
+  batter?: { [key: string]: number };
+  pitcher?: { [key: string]: number };
+}
+
 export interface FantasyTeam {
   id: number;
   name: string;
   owner: number;
   league: number;
+  total_stats?: RoleStats;
 }
 
 export interface FantasyRoster {
@@ -11,6 +20,7 @@ export interface FantasyRoster {
   start_date: string;
   end_date: string | null;
   position: string | null;
+  stats?: RoleStats;
 }
 
 export interface Player {
@@ -58,4 +68,10 @@ export interface Game {
   home_team: number;
   away_team: number;
 }
+// One page of a list endpoint (keyset paginated)
+export interface Page<T> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
 export const baseLink = "http://localhost:8000/";